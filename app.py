@@ -9,15 +9,29 @@ Module layout:
   utils.py          — Helpers, validation, decorators, logging
   state.py          — DB wrappers (seen events, status, queue, etc.)
   notifications.py  — Email & Telegram sending
+  message_templates.py — Notification templates, render cache & timings
   events.py         — API fetching, background checker, watchdog
+  events_async.py   — Optional asyncio engine for fetch + notification I/O
+  scheduler.py      — Priority queue of timed background jobs
+  dispatcher.py     — Outbox relay delivering new-event notifications
+  retry_queue.py    — Email retry heap mirrored to the email_queue table
+  ratelimit.py      — GCRA rate limiter (per route class, memory or shared DB)
+  subscribers.py    — In-memory Telegram subscriber registry (send waves)
+  startup.py        — Cold-start profile: import times, readiness, init stage graph, TTFB
+  snapshot.py       — Warm-restart state snapshot (loaded before the DB)
+  metrics.py        — Counters, gauges & latency histograms (/metrics)
+  profiler.py       — Per-request timing, slow-request log, sampled cProfile
+  logsink.py        — NDJSON log files with rotation, gzip and a streaming reader
+  telegram_bot.py   — Bot command handlers, worker queue, getUpdates long polling
   routes_pages.py   — HTML page routes (/, /login, /dashboard, etc.)
   routes_api.py     — API routes (/api/*)
-  db.py             — Database layer (Turso + SQLite fallback)
+  db.py             — Database layer (Turso + SQLite fallback, per-statement timing)
 =============================================================================
 """
 
 import os
 import threading
+import time
 from datetime import datetime, timezone
 
 # Load .env file so credentials are available before anything else
@@ -28,6 +42,10 @@ except ImportError:
     pass  # python-dotenv not installed, rely on system env vars
 
 # ── Core config & Flask app ──────────────────────────────────────────────
+from flask import request
+
+import startup
+import config
 from config import (
     app, CONFIG, DATA_DIR, API_URL, EVENT_STATS,
     TELEGRAM_ADMIN_CHAT_ID, TELEGRAM_CHAT_IDS,
@@ -41,12 +59,18 @@ from state import (
     load_logs, load_recipient_status, load_event_stats,
     load_admin_audit_on_startup, get_all_recipients,
 )
+import snapshot
 
 # ── Notification layer ──────────────────────────────────────────────────
 import notifications  # noqa: F401  — ensures module is loaded
 
 # ── Background threads ─────────────────────────────────────────────────
 from events import start_background_checker, start_watchdog
+from dispatcher import start_dispatcher
+from ratelimit import LIMITER
+from events_async import ENGINE
+from telegram_bot import POLLER, ingest_mode
+from subscribers import SUBSCRIBERS
 
 # ── Routes (registering on the Flask app via decorators on import) ──────
 import routes_pages  # noqa: F401
@@ -57,6 +81,12 @@ import routes_api    # noqa: F401
 def health_check():
     return 'ok', 200
 
+
+@app.after_request
+def _record_first_response(response):
+    startup.record_first_response(request.path)  # Time to first byte (no-op after the first)
+    return response
+
 # ── Database ────────────────────────────────────────────────────────────
 from db import (
     get_connection, get_db_status, migrate_from_json,
@@ -65,88 +95,86 @@ from db import (
 )
 
 
-# ===== DEFERRED INITIALIZATION (runs in background thread) =====
-def _init_db_and_state():
-    """All DB-dependent startup work. Runs entirely in a background thread
-    so gunicorn can bind the port immediately. The app serves with safe
-    defaults until this completes."""
-    try:
-        load_logs()
-        load_recipient_status()
-        load_event_stats()
-        load_admin_audit_on_startup()
-
-        # Restore runtime counters from DB so they survive restarts
-        from state import load_status as _load_status
-        try:
-            _saved_status = _load_status()
-            for _key in ('total_checks', 'total_new_events', 'emails_sent'):
-                _val = _saved_status.get(_key)
-                if _val is not None:
-                    try:
-                        CONFIG[_key] = int(_val)
-                    except (ValueError, TypeError):
-                        pass
-            console_log(
-                f"📊 Restored counters: checks={CONFIG['total_checks']}, "
-                f"events={CONFIG['total_new_events']}, emails={CONFIG['emails_sent']}",
-                "debug",
-            )
-        except Exception as _e:
-            console_log(f"⚠️ Could not restore counters from DB: {_e}", "warning")
-
-        # Database initialization
-        try:
-            _db_conn = get_connection()
-            _db_info = get_db_status()
-            console_log(f"\U0001f5c4\ufe0f Database: {_db_info.get('backend', 'unknown')} - Connected", "success")
-        except Exception as _db_err:
-            console_log(f"\u26a0\ufe0f Database init failed: {_db_err} - falling back to JSON", "error")
-
-        # Load notification toggle settings from DB into CONFIG
-        try:
-            all_settings = db_get_all_notification_settings()
-            for key, enabled in all_settings.items():
-                CONFIG[key] = enabled
-        except Exception:
-            pass  # Defaults already set in CONFIG
-
-        # One-time migration from JSON to DB
-        try:
-            _migration_marker = os.path.join(DATA_DIR, '.migrated_to_db')
-            if not os.path.exists(_migration_marker):
-                _summary = migrate_from_json(DATA_DIR)
-                if _summary.get('migrated'):
-                    console_log(f"\U0001f4e6 JSON->DB migration complete: {_summary['migrated']}", "success")
-                    with open(_migration_marker, 'w') as _f:
-                        _f.write(datetime.now(timezone.utc).isoformat())
-        except Exception as _mig_err:
-            console_log(f"\u26a0\ufe0f Migration check failed: {_mig_err}", "warning")
-
-        # Seed env-configured Telegram chat IDs into the DB
-        try:
-            _seeded = 0
-            for _raw_id in (TELEGRAM_CHAT_IDS or '').split(','):
-                _cid = _raw_id.strip()
-                if _cid and validate_chat_id(_cid):
-                    if db_add_subscriber(_cid, 'Env Config', added_by='env'):
-                        _seeded += 1
-            if TELEGRAM_ADMIN_CHAT_ID and validate_chat_id(TELEGRAM_ADMIN_CHAT_ID):
-                if db_add_subscriber(TELEGRAM_ADMIN_CHAT_ID, 'Admin', added_by='env'):
-                    _seeded += 1
-            if _seeded:
-                console_log(f"\U0001f4f1 Seeded {_seeded} Telegram subscriber(s) from env", "success")
-        except Exception as _seed_err:
-            console_log(f"\u26a0\ufe0f Telegram subscriber seeding failed: {_seed_err}", "warning")
-
-        console_log("✅ Background DB initialization complete", "success")
-    except Exception as _fatal:
-        console_log(f"🚨 DB init thread crashed: {_fatal}", "error")
+# ===== DEFERRED INITIALIZATION STAGES (run in background threads) =====
+# Each stage is one piece of DB-dependent or background startup work. The
+# app serves with safe defaults (or the state snapshot) until they finish.
+
+def _connect_db():
+    get_connection()
+    _db_info = get_db_status()
+    console_log(f"\U0001f5c4\ufe0f Database: {_db_info.get('backend', 'unknown')} - Connected", "success")
+
+
+def _restore_counters():
+    """Restore runtime counters from DB so they survive restarts."""
+    from state import load_status as _load_status
+    snapshot.reconcile_counters(_load_status())  # Higher of snapshot / DB
+    console_log(
+        f"📊 Restored counters: checks={CONFIG['total_checks']}, "
+        f"events={CONFIG['total_new_events']}, emails={CONFIG['emails_sent']}",
+        "debug",
+    )
+
+
+def _load_notification_settings():
+    """Load notification toggle settings from DB into CONFIG."""
+    for key, enabled in db_get_all_notification_settings().items():
+        CONFIG[key] = enabled
+
+
+def _migrate_json():
+    """One-time migration from JSON to DB."""
+    _migration_marker = os.path.join(DATA_DIR, '.migrated_to_db')
+    if not os.path.exists(_migration_marker):
+        _summary = migrate_from_json(DATA_DIR)
+        if _summary.get('migrated'):
+            console_log(f"\U0001f4e6 JSON->DB migration complete: {_summary['migrated']}", "success")
+            with open(_migration_marker, 'w') as _f:
+                _f.write(datetime.now(timezone.utc).isoformat())
+
+
+def _seed_subscribers():
+    """Seed env-configured Telegram chat IDs into the DB."""
+    _seeded = 0
+    for _raw_id in (TELEGRAM_CHAT_IDS or '').split(','):
+        _cid = _raw_id.strip()
+        if _cid and validate_chat_id(_cid):
+            if db_add_subscriber(_cid, 'Env Config', added_by='env'):
+                _seeded += 1
+    if TELEGRAM_ADMIN_CHAT_ID and validate_chat_id(TELEGRAM_ADMIN_CHAT_ID):
+        if db_add_subscriber(TELEGRAM_ADMIN_CHAT_ID, 'Admin', added_by='env'):
+            _seeded += 1
+    SUBSCRIBERS.invalidate()
+    if _seeded:
+        console_log(f"\U0001f4f1 Seeded {_seeded} Telegram subscriber(s) from env", "success")
+
+
+def _reconcile_seen_ids():
+    """Seen IDs seeded from the snapshot must still exist in this DB."""
+    _dropped = snapshot.reconcile_seen_ids()
+    if _dropped:
+        console_log(f"💾 {_dropped} snapshot seen ID(s) not in the DB — dropped", "warning")
+
+
+def _state_loaded(started: float):
+    snapshot.mark_reconciled(started)
+    startup.milestone('state_loaded')
+    console_log("✅ Background DB initialization complete", "success")
+
+
+def _start_async_engine():
+    ENGINE.start()
+    console_log("⚡ Async engine started", "success")
+
+
+def _start_watchdog():
+    start_watchdog()
+    startup.milestone('background_started')
 
 
 def _setup_telegram_webhook():
     """Register the Telegram webhook so the bot can receive /start, /subscribe, etc."""
-    from config import TELEGRAM_BOT_TOKEN as _token
+    from config import TELEGRAM_BOT_TOKEN as _token, TELEGRAM_API_BASE as _api_base
     render_url = os.environ.get('RENDER_EXTERNAL_URL', '')
     if not _token or not render_url:
         console_log("⚠️ Telegram webhook skipped (no token or RENDER_EXTERNAL_URL)", "debug")
@@ -155,7 +183,7 @@ def _setup_telegram_webhook():
     try:
         import requests as _req
         resp = _req.post(
-            f"https://api.telegram.org/bot{_token}/setWebhook",
+            f"{_api_base}/bot{_token}/setWebhook",
             json={'url': webhook_url, 'allowed_updates': ['message']},
             timeout=15,
         )
@@ -168,38 +196,82 @@ def _setup_telegram_webhook():
         console_log(f"⚠️ Telegram webhook setup error: {_e}", "warning")
 
 
+def _on_stage_error(name: str, error: Exception):
+    console_log(f"🚨 Startup stage '{name}' failed: {error}", "error")
+
+
+def _build_startup_graph() -> startup.StartupGraph:
+    """Declare the init stages and what each has to wait for.
+
+    Stages that touch the database share the ``'db'`` resource, so they
+    run one at a time on the shared connection; everything else (the
+    Telegram webhook call, the async engine) overlaps with them. The JSON
+    migration runs before the loads so they see migrated rows, and the
+    checker starts only once every piece of state it reads is loaded.
+    """
+    started = time.perf_counter()
+    graph = startup.StartupGraph(on_error=_on_stage_error)
+
+    # ---- 1. DB + state ----
+    graph.stage('db_connect', _connect_db, resource='db')
+    graph.stage('json_migration', _migrate_json, after=('db_connect',), resource='db')
+    migrated = ('json_migration',)
+    graph.stage('activity_logs', load_logs, after=migrated, resource='db')
+    graph.stage('recipients', lambda: load_recipient_status(refresh=True),  # Replaces the snapshot copy
+                after=migrated, resource='db')
+    graph.stage('event_stats', load_event_stats, after=migrated, resource='db')
+    graph.stage('admin_audit', load_admin_audit_on_startup, after=migrated, resource='db')
+    graph.stage('counters', _restore_counters, after=migrated, resource='db')
+    graph.stage('notification_settings', _load_notification_settings, after=migrated, resource='db')
+    graph.stage('subscribers', _seed_subscribers, after=migrated, resource='db')
+    graph.stage('seen_ids', _reconcile_seen_ids, after=migrated, resource='db')
+    graph.stage('state_loaded', lambda: _state_loaded(started), after=(
+        'activity_logs', 'recipients', 'event_stats', 'admin_audit', 'counters',
+        'notification_settings', 'subscribers', 'seen_ids'))
+
+    # ---- 2. Shared rate-limit sync, async engine, notification dispatcher, checker & watchdog ----
+    graph.stage('rate_limiter', LIMITER.start, after=('db_connect',))
+    checker_after = ('state_loaded',)
+    if config.ASYNC_ENGINE:
+        graph.stage('async_engine', _start_async_engine)
+        checker_after += ('async_engine',)
+    graph.stage('dispatcher', start_dispatcher, after=checker_after)
+    graph.stage('checker', start_background_checker, after=checker_after)
+    graph.stage('watchdog', _start_watchdog, after=('checker',))
+
+    # ---- 3. Telegram bot ingestion: webhook (no DB) or long polling ----
+    if ingest_mode() == 'polling':
+        graph.stage('telegram', POLLER.start, after=('subscribers',))
+    else:
+        graph.stage('telegram', _setup_telegram_webhook)
+    return graph
+
+
 # ==========================================================================
-# ALL BACKGROUND WORK — deferred until 5s after import so the server is
-# already bound and serving before any DB / network call runs.
+# ALL BACKGROUND WORK — deferred until server.py reports the port is bound
+# (startup.SERVER_READY), so the server is serving before any DB / network
+# call runs.
 # ==========================================================================
 def _deferred_startup():
     """Runs in a daemon thread AFTER the WSGI server is already listening."""
-    import time as _time
-    _time.sleep(5)  # Give the server time to bind the port
-
-    # ---- 1. DB + State init ----
-    try:
-        _init_db_and_state()
-    except Exception as _e:
-        console_log(f"🚨 DB init failed: {_e}", "error")
+    if not startup.wait_until_serving():
+        console_log(f"⚠️ Server not listening after {startup.SERVER_READY_TIMEOUT}s — starting background work anyway", "warning")
 
-    # ---- 2. Background checker & watchdog ----
     try:
-        start_background_checker()
-    except Exception as _e:
-        console_log(f"🚨 Background checker failed to start: {_e}", "error")
-    try:
-        start_watchdog()
-    except Exception as _e:
-        console_log(f"🚨 Watchdog failed to start: {_e}", "error")
+        graph = _build_startup_graph()
+        startup.run_graph(graph)
+    except Exception as _fatal:
+        console_log(f"🚨 Deferred startup crashed: {_fatal}", "error")
+        return
+    startup.milestone('startup_complete')
+    report = graph.report()
+    console_log(f"🚀 Startup complete in {startup.elapsed_ms():.0f}ms "
+                f"(init {report['wall_ms']:.0f}ms, critical path: {' → '.join(report['critical_path'])})", "success")
 
-    # ---- 3. Telegram webhook (another 5s delay) ----
-    _time.sleep(5)
-    try:
-        _setup_telegram_webhook()
-    except Exception as _e:
-        console_log(f"⚠️ Telegram webhook setup error: {_e}", "warning")
 
+# ===== WARM START: last snapshot before any DB call (dashboard data on first request) =====
+snapshot.load_snapshot()
+startup.milestone('snapshot_loaded')
 
 # ===== STARTUP CONSOLE MESSAGES (no DB calls — instant) =====
 console_log("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━", "info")
@@ -209,6 +281,7 @@ console_log(f"📡 API Endpoint: {API_URL}", "debug")
 console_log(f"⏰ Check Interval: {CONFIG['check_interval_minutes']} minutes", "debug")
 console_log(f"💓 Heartbeat: Every {CONFIG['heartbeat_hours']} hours", "debug")
 console_log(f"📱 Telegram Admin: {'Configured' if TELEGRAM_ADMIN_CHAT_ID else 'Not set'}", "debug")
+console_log(f"📥 Telegram bot ingestion: {ingest_mode()}", "debug")
 console_log(f"📧 Email: {'ON' if CONFIG.get('email_notifications_enabled', True) else 'OFF'}", "debug")
 console_log(f"📡 Telegram: {'ON' if CONFIG.get('telegram_notifications_enabled', True) else 'OFF'}", "debug")
 
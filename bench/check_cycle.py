@@ -0,0 +1,142 @@
+"""
+=============================================================================
+🌐 DUBAI FLEA MARKET TRACKER — Benchmark: event check cycle at scale
+=============================================================================
+Runs the real ``check_for_events`` against the local fake WordPress API
+(bench/fake_wordpress.py) with a throwaway local SQLite DATA_DIR, for
+growing catalog / seen-events history sizes.
+
+For each size the catalog has N products and the N newest are already in
+``seen_events`` (the steady state), then three cycles run:
+
+  idle   — nothing changed since the last fetch
+  new    — ``--new`` products were published since the last fetch
+  idle   — nothing changed again (conditional GET can answer 304)
+
+Reported per cycle: wall time, peak Python memory (tracemalloc, so wall
+times include its overhead), SQL write statements, and the fake's answer.
+Outbox delivery is not started; this measures detection only.
+
+Usage:
+  python bench/check_cycle.py [--sizes 100,10000,100000,1000000] [--new 3]
+                              [--latency-ms 0] [--error-rate 0] [--no-etag]
+=============================================================================
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'bench'))
+
+from fake_wordpress import FakeWordPress  # noqa: E402
+
+WRITE_VERBS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+class WriteCounter:
+    """Counts SQL write statements through sqlite3's trace callback."""
+
+    def __init__(self, conn):
+        self.count = 0
+        conn.set_trace_callback(self._trace)
+
+    def _trace(self, sql: str) -> None:
+        if sql.lstrip().upper().startswith(WRITE_VERBS):
+            self.count += 1
+
+
+def seed_history(size: int) -> None:
+    """Replace seen_events with the ``size`` newest catalog products."""
+    from db import get_connection
+
+    conn = get_connection()
+    conn.execute("DELETE FROM seen_events")
+    conn.execute("DELETE FROM outbox")
+    batch = []
+    for pid in range(1, size + 1):
+        product = FakeWordPress.product(pid)
+        batch.append((pid, product['title']['rendered'], product['link'], product['date'],
+                      '2026-01-01T00:00:00Z'))
+        if len(batch) == 50_000:
+            conn.executemany("INSERT INTO seen_events (event_id, title, link, date_posted, first_seen_at) "
+                             "VALUES (?, ?, ?, ?, ?)", batch)
+            batch.clear()
+    if batch:
+        conn.executemany("INSERT INTO seen_events (event_id, title, link, date_posted, first_seen_at) "
+                         "VALUES (?, ?, ?, ?, ?)", batch)
+    conn.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='100,10000,100000,1000000', help='Catalog / history sizes')
+    parser.add_argument('--new', type=int, default=3, help='Products published before the "new" cycle')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--no-etag', action='store_true')
+    args = parser.parse_args()
+
+    fake = FakeWordPress(latency=args.latency_ms / 1000, error_rate=args.error_rate,
+                         etag=not args.no_etag, seed=1).start()
+
+    # Configure before the app modules read their settings
+    os.environ.update({
+        'API_URL': fake.api_url,
+        'TELEGRAM_BOT_TOKEN': '',
+        'TURSO_DATABASE_URL': '',
+        'DATA_DIR': tempfile.mkdtemp(prefix='dfm-bench-'),
+    })
+
+    import events
+    from config import CONFIG
+    from db import get_connection
+    from utils import flush_console_output
+
+    CONFIG['email_notifications_enabled'] = False
+    events.wake_dispatcher = lambda *a, **k: None  # Detection only — no outbox relay
+    writes = WriteCounter(get_connection())
+
+    print(f"Check cycle vs fake WordPress API, {args.latency_ms:.0f}ms latency, "
+          f"ETag {'off' if args.no_etag else 'on'}")
+    print(f"  {'size':>8}  {'cycle':<6} {'wall ms':>9} {'peak MB':>8} {'writes':>7}  {'new':>4}  answer")
+    for size in sizes_from(args.sizes):
+        fake.size = size
+        # console_log lines are printed later by the flusher thread: write
+        # them out before leaving each redirect so they don't hit the table
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed_history(size)
+            flush_console_output()
+        for cycle in ('idle', 'new', 'idle'):
+            if cycle == 'new':
+                fake.add_products(args.new)
+            fake.reset()
+            writes.count = 0
+            with contextlib.redirect_stdout(io.StringIO()):
+                tracemalloc.start()
+                start = time.perf_counter()
+                result = events.check_for_events()
+                elapsed = time.perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                flush_console_output()
+            found = result['new_events_found'] if result else '-'
+            print(f"  {size:>8}  {cycle:<6} {elapsed * 1000:9.1f} {peak / 1e6:8.1f} {writes.count:>7}  "
+                  f"{found:>4}  {fake.stats()}")
+
+    fake.stop()
+
+
+def sizes_from(text: str) -> list:
+    return [int(s) for s in text.split(',') if s.strip()]
+
+
+if __name__ == '__main__':
+    main()
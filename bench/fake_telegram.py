@@ -0,0 +1,229 @@
+"""
+=============================================================================
+🌐 DUBAI FLEA MARKET TRACKER — Fake Telegram Bot API
+=============================================================================
+A local stand-in for api.telegram.org, for load and integration tests.
+Point the app at it with ``TELEGRAM_API_BASE=http://127.0.0.1:<port>``.
+
+Methods: sendMessage, setWebhook, deleteWebhook, getWebhookInfo,
+getUpdates (long polling) and getMe. Any bot token is accepted.
+
+Fault injection:
+  latency       — seconds added to every sendMessage
+  rate_limit    — fraction of sendMessage calls answered 429 + retry_after
+  retry_after   — the retry_after value sent with those 429s
+  blocked       — chat IDs answered 403 "bot was blocked by the user"
+
+Use in-process:
+
+    fake = FakeTelegram(latency=0.02, rate_limit=0.01).start()
+    os.environ['TELEGRAM_API_BASE'] = fake.base_url
+    ...
+    fake.push_update('/status', chat_id=123)   # served by getUpdates
+    fake.stats()                               # counts by method/outcome
+
+or standalone:  python bench/fake_telegram.py --port 8081 --latency-ms 50
+=============================================================================
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeTelegram:
+    """In-memory Bot API served over HTTP on a background thread."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 rate_limit: float = 0.0, retry_after: int = 1, blocked=(), seed: int | None = None):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.blocked = {str(c) for c in blocked}
+        self.webhook_url = ''
+        self.sent = []  # (chat_id, text)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._updates = []
+        self._next_update_id = 1
+        self._new_update = threading.Condition(self._lock)
+        self._counts = {}
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'FakeTelegram':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name='fake-telegram')
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    # ----- Test helpers -----
+
+    def push_update(self, text: str, chat_id: int = 1000, first_name: str = 'Tester') -> int:
+        """Queue an incoming message for getUpdates. Returns its update_id."""
+        with self._new_update:
+            update_id = self._next_update_id
+            self._next_update_id += 1
+            self._updates.append({
+                'update_id': update_id,
+                'message': {'message_id': update_id, 'date': int(time.time()),
+                            'chat': {'id': chat_id, 'type': 'private'},
+                            'from': {'id': chat_id, 'first_name': first_name},
+                            'text': text},
+            })
+            self._new_update.notify_all()
+        return update_id
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+            self.sent.clear()
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    # ----- Bot API methods: return (http_status, body) -----
+
+    def _send_message(self, params: dict) -> tuple:
+        if self.latency:
+            time.sleep(self.latency)
+        chat_id = str(params.get('chat_id', ''))
+        if not chat_id or not params.get('text'):
+            self._count('sendMessage.400')
+            return 400, {'ok': False, 'error_code': 400, 'description': 'Bad Request: message text is empty'}
+        if chat_id in self.blocked:
+            self._count('sendMessage.403')
+            return 403, {'ok': False, 'error_code': 403, 'description': 'Forbidden: bot was blocked by the user'}
+        if self.rate_limit and self._random.random() < self.rate_limit:
+            self._count('sendMessage.429')
+            return 429, {'ok': False, 'error_code': 429,
+                         'description': f'Too Many Requests: retry after {self.retry_after}',
+                         'parameters': {'retry_after': self.retry_after}}
+        with self._lock:
+            self.sent.append((chat_id, params['text']))
+        self._count('sendMessage.200')
+        return 200, {'ok': True, 'result': {'message_id': len(self.sent), 'chat': {'id': chat_id},
+                                            'date': int(time.time()), 'text': params['text']}}
+
+    def _get_updates(self, params: dict) -> tuple:
+        if self.webhook_url:
+            self._count('getUpdates.409')
+            return 409, {'ok': False, 'error_code': 409,
+                         'description': "Conflict: can't use getUpdates method while webhook is active"}
+        offset = int(params.get('offset') or 0)
+        limit = int(params.get('limit') or 100)
+        deadline = time.monotonic() + float(params.get('timeout') or 0)
+        with self._new_update:
+            if offset:
+                self._updates = [u for u in self._updates if u['update_id'] >= offset]  # Confirmed
+            while not self._updates and time.monotonic() < deadline:
+                self._new_update.wait(deadline - time.monotonic())
+            result = self._updates[:limit]
+        self._count('getUpdates.200')
+        return 200, {'ok': True, 'result': result}
+
+    def _set_webhook(self, params: dict) -> tuple:
+        self.webhook_url = params.get('url', '')
+        self._count('setWebhook.200')
+        return 200, {'ok': True, 'result': True, 'description': 'Webhook was set'}
+
+    def _delete_webhook(self, params: dict) -> tuple:
+        self.webhook_url = ''
+        if params.get('drop_pending_updates'):
+            with self._lock:
+                self._updates.clear()
+        self._count('deleteWebhook.200')
+        return 200, {'ok': True, 'result': True, 'description': 'Webhook was deleted'}
+
+    def _webhook_info(self, params: dict) -> tuple:
+        with self._lock:
+            pending = len(self._updates)
+        return 200, {'ok': True, 'result': {'url': self.webhook_url, 'pending_update_count': pending}}
+
+    def _get_me(self, params: dict) -> tuple:
+        return 200, {'ok': True, 'result': {'id': 1, 'is_bot': True, 'first_name': 'Fake', 'username': 'fake_bot'}}
+
+    def _handler(self):
+        fake = self
+        methods = {
+            'sendMessage': self._send_message, 'getUpdates': self._get_updates,
+            'setWebhook': self._set_webhook, 'deleteWebhook': self._delete_webhook,
+            'getWebhookInfo': self._webhook_info, 'getMe': self._get_me,
+        }
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, like the real API
+
+            def _dispatch(self, params: dict):
+                method = self.path.split('?')[0].rsplit('/', 1)[-1]
+                if not self.path.startswith('/bot') or method not in methods:
+                    fake._count('unknown.404')
+                    status, body = 404, {'ok': False, 'error_code': 404, 'description': 'Not Found'}
+                else:
+                    status, body = methods[method](params)
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                try:
+                    params = json.loads(raw) if raw else {}
+                except ValueError:
+                    params = {}
+                self._dispatch(params)
+
+            def do_GET(self):
+                from urllib.parse import parse_qsl, urlparse
+                self._dispatch(dict(parse_qsl(urlparse(self.path).query)))
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a fake Telegram Bot API server.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--rate-limit', type=float, default=0, help='Fraction of sendMessage answered 429')
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--blocked', default='', help='Comma-separated chat IDs answered 403')
+    args = parser.parse_args()
+
+    fake = FakeTelegram(args.host, args.port, latency=args.latency_ms / 1000, rate_limit=args.rate_limit,
+                        retry_after=args.retry_after, blocked=[c for c in args.blocked.split(',') if c])
+    fake.start()
+    print(f"Fake Telegram Bot API on {fake.base_url}  (TELEGRAM_API_BASE={fake.base_url})")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"  {fake.stats()}")
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == '__main__':
+    main()
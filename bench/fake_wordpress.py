@@ -0,0 +1,207 @@
+"""
+=============================================================================
+🌐 DUBAI FLEA MARKET TRACKER — Fake WordPress Product API
+=============================================================================
+A local stand-in for the dubai-fleamarket.com WP REST product feed, for
+fetcher and check-cycle benchmarks. Point the app at it with
+``API_URL=http://127.0.0.1:<port>/wp-json/wp/v2/product?per_page=20``.
+
+The catalog is synthetic: products ``1..size``, newest (highest ID) first
+like WordPress' default ``orderby=date``. Nothing is materialised, so a
+catalog of millions costs no memory.
+
+Supports ``page`` / ``per_page`` with X-WP-Total / X-WP-TotalPages headers,
+and ETag / If-None-Match (304 until the catalog changes).
+
+Fault injection:
+  latency     — seconds added to every request
+  error_rate  — fraction of requests answered 500
+
+Use in-process:
+
+    fake = FakeWordPress(size=10_000, latency=0.05).start()
+    os.environ['API_URL'] = fake.api_url
+    ...
+    fake.add_products(3)   # three new listings appear on page 1
+    fake.stats()           # counts by status
+
+or standalone:  python bench/fake_wordpress.py --port 8082 --size 100000
+=============================================================================
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+PRODUCT_PATH = '/wp-json/wp/v2/product'
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeWordPress:
+    """Synthetic product catalog served over HTTP on a background thread."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, size: int = 100, latency: float = 0.0,
+                 error_rate: float = 0.0, etag: bool = True, seed: int | None = None):
+        self.size = size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.etag = etag
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.base_url}{PRODUCT_PATH}?per_page=20"
+
+    def start(self) -> 'FakeWordPress':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name='fake-wordpress')
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    # ----- Test helpers -----
+
+    def add_products(self, count: int = 1) -> list:
+        """Publish ``count`` new products. Returns their IDs."""
+        with self._lock:
+            first = self.size + 1
+            self.size += count
+        return list(range(first, first + count))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    # ----- Catalog -----
+
+    @staticmethod
+    def product(product_id: int) -> dict:
+        """The synthetic product with ``product_id`` (deterministic)."""
+        posted = (EPOCH + timedelta(minutes=product_id)).strftime('%Y-%m-%dT%H:%M:%S')
+        slug = f'flea-market-{product_id}'
+        return {
+            'id': product_id,
+            'date': posted,
+            'date_gmt': posted,
+            'modified': posted,
+            'slug': slug,
+            'status': 'publish',
+            'type': 'product',
+            'link': f'https://dubai-fleamarket.com/product/{slug}/',
+            'title': {'rendered': f'Flea Market #{product_id} &#8211; Bench Venue'},
+        }
+
+    def _page(self, params: dict) -> tuple:
+        """Return ``(status, headers, body)`` for a product listing request."""
+        per_page = min(100, max(1, int(params.get('per_page') or 10)))
+        page = max(1, int(params.get('page') or 1))
+        size = self.size
+        total_pages = max(1, -(-size // per_page))
+        headers = {'X-WP-Total': str(size), 'X-WP-TotalPages': str(total_pages)}
+        if page > total_pages:
+            return 400, headers, {'code': 'rest_post_invalid_page_number',
+                                  'message': 'The page number requested is larger than the number of pages available.',
+                                  'data': {'status': 400}}
+        newest = size - (page - 1) * per_page
+        ids = range(newest, max(0, newest - per_page), -1)
+        return 200, headers, [self.product(i) for i in ids]
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _reply(self, status: int, headers: dict, data: bytes = b''):
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                if data:
+                    self.wfile.write(data)
+
+            def do_GET(self):
+                if fake.latency:
+                    time.sleep(fake.latency)
+                url = urlparse(self.path)
+                if url.path.rstrip('/') != PRODUCT_PATH:
+                    fake._count('404')
+                    return self._reply(404, {'Content-Type': 'application/json'},
+                                       b'{"code":"rest_no_route","data":{"status":404}}')
+                if fake.error_rate and fake._random.random() < fake.error_rate:
+                    fake._count('500')
+                    return self._reply(500, {'Content-Type': 'application/json'},
+                                       b'{"code":"internal_server_error","data":{"status":500}}')
+
+                status, headers, body = fake._page(dict(parse_qsl(url.query)))
+                data = json.dumps(body).encode()
+                headers['Content-Type'] = 'application/json; charset=UTF-8'
+                if fake.etag and status == 200:
+                    etag = f'"{hashlib.md5(data).hexdigest()}"'
+                    headers['ETag'] = etag
+                    if self.headers.get('If-None-Match') == etag:
+                        fake._count('304')
+                        return self._reply(304, {'ETag': etag})
+                fake._count(str(status))
+                self._reply(status, headers, data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a fake WordPress product API.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8082)
+    parser.add_argument('--size', type=int, default=100, help='Products in the catalog')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0, help='Fraction of requests answered 500')
+    parser.add_argument('--no-etag', action='store_true')
+    parser.add_argument('--new-every', type=float, default=0, help='Publish one product every N seconds')
+    args = parser.parse_args()
+
+    fake = FakeWordPress(args.host, args.port, size=args.size, latency=args.latency_ms / 1000,
+                         error_rate=args.error_rate, etag=not args.no_etag)
+    fake.start()
+    print(f"Fake WordPress API on {fake.base_url}  (API_URL={fake.api_url})")
+    try:
+        while True:
+            time.sleep(args.new_every or 10)
+            if args.new_every:
+                fake.add_products(1)
+            print(f"  {fake.size} products  {fake.stats()}")
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == '__main__':
+    main()
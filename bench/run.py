@@ -0,0 +1,320 @@
+"""
+=============================================================================
+🌐 DUBAI FLEA MARKET TRACKER — Benchmark Suite & Regression Gate
+=============================================================================
+Runs every registered scenario against a throwaway local SQLite DATA_DIR
+and the local fakes (bench/fake_wordpress.py, bench/fake_telegram.py),
+then writes machine-readable results and compares them with a stored
+baseline.
+
+Per scenario: ops/s, mean / p50 / p99 latency (ms) and Python allocations
+per op (tracemalloc peak, KB — measured in a separate pass so the timings
+are not slowed by tracing; queued log lines are flushed before each traced
+op, so the log flusher thread's batch for earlier ops is not counted). The timed ops run in ``--rounds`` rounds; p50
+is the best round's median, which keeps fsync and scheduler noise out of
+the gate, while p99 covers every op.
+
+Usage:
+  python bench/run.py                      # run all, compare to bench/baseline.json
+  python bench/run.py --only check_for_events.idle,log_activity
+  python bench/run.py --save-baseline      # record this machine's baseline
+  python bench/run.py --scale 0.2          # fewer ops (quick smoke run)
+
+Exit status is 1 when a scenario's p50 regressed by more than --threshold
+(default 50%; timings on shared hosts swing by a third run to run) or its
+allocations by more than --alloc-threshold (default 10%; these are nearly
+deterministic). Baselines are machine-specific: record one on the machine
+that runs the gate.
+
+Add a scenario with the ``@scenario`` decorator: it receives nothing and
+returns the zero-argument callable that performs ONE op.
+=============================================================================
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(ROOT, 'bench')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_telegram import FakeTelegram    # noqa: E402
+from fake_wordpress import FakeWordPress  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, 'results', 'latest.json')
+
+HISTORY_SIZE = 10_000   # seen_events rows for the check / load scenarios
+SUBSCRIBER_COUNT = 100  # Telegram fan-out size
+ALLOC_OPS = 20          # Ops traced for allocation numbers
+
+SCENARIOS = {}  # name -> (setup, ops)
+FAKES = {}
+
+
+def scenario(name: str, ops: int = 200):
+    """Register ``setup`` as a benchmark scenario running ``ops`` timed ops."""
+    def decorator(setup):
+        SCENARIOS[name] = (setup, ops)
+        return setup
+    return decorator
+
+
+# =========================================================================
+# ENVIRONMENT
+# =========================================================================
+
+def _configure() -> None:
+    """Start the fakes and point the app at them (before any app import)."""
+    FAKES['wordpress'] = FakeWordPress(size=HISTORY_SIZE).start()
+    FAKES['telegram'] = FakeTelegram().start()
+    os.environ.update({
+        'API_URL': FAKES['wordpress'].api_url,
+        'TELEGRAM_API_BASE': FAKES['telegram'].base_url,
+        'TELEGRAM_BOT_TOKEN': 'bench',
+        'TELEGRAM_ADMIN_CHAT_ID': '100000000',
+        'TELEGRAM_CHAT_IDS': '',
+        'TELEGRAM_WAVE_PAUSE': '0',
+        'RATE_LIMIT_ADMIN': '1000000/60',
+        'SECRET_KEY': 'bench',
+        'TURSO_DATABASE_URL': '',
+        'DATA_DIR': tempfile.mkdtemp(prefix='dfm-bench-'),
+    })
+
+
+# =========================================================================
+# SCENARIOS
+# =========================================================================
+
+@scenario('check_for_events.idle')
+def _():
+    import events
+    from check_cycle import seed_history
+    from config import CONFIG
+
+    CONFIG['email_notifications_enabled'] = False
+    events.wake_dispatcher = lambda *a, **k: None  # Detection only
+    FAKES['wordpress'].size = HISTORY_SIZE
+    seed_history(HISTORY_SIZE)
+    return events.check_for_events
+
+
+@scenario('check_for_events.new', ops=100)
+def _():
+    import events
+    fake = FAKES['wordpress']
+
+    def op():
+        fake.add_products(1)
+        events.check_for_events()
+    return op
+
+
+@scenario('db_load_seen_events', ops=50)
+def _():
+    from check_cycle import seed_history
+    from db import db_load_seen_events
+
+    seed_history(HISTORY_SIZE)
+    return db_load_seen_events
+
+
+@scenario('record_stat', ops=500)
+def _():
+    from state import record_stat
+    return lambda: record_stat('checks', 1)
+
+
+@scenario('log_activity', ops=500)
+def _():
+    from utils import log_activity
+    return lambda: log_activity("🔍 Benchmark activity entry", "info")
+
+
+@scenario('api.status_full')
+def _():
+    import routes_api  # noqa: F401  — registers the routes
+    import routes_pages  # noqa: F401
+    from config import app
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['admin_logged_in'] = True
+
+    def op():
+        response = client.get('/api/status-full')
+        assert response.status_code == 200, response.status_code
+    return op
+
+
+@scenario('telegram.fanout', ops=20)
+def _():
+    from notifications import send_telegram_new_events
+    from telegram_fanout import EVENTS, seed_subscribers
+
+    seed_subscribers(SUBSCRIBER_COUNT)
+    return lambda: send_telegram_new_events(EVENTS)
+
+
+# =========================================================================
+# RUNNER
+# =========================================================================
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _drain_logs() -> None:
+    """Write out console / log-sink lines queued by earlier ops now, so the
+    background flusher does not do it inside the next op's traced window."""
+    from utils import flush_console_output
+    from logsink import LOG_SINK
+    flush_console_output()
+    LOG_SINK.flush()
+
+
+def run_scenario(name: str, scale: float = 1.0, rounds: int = 3) -> dict:
+    setup, ops = SCENARIOS[name]
+    ops = max(5, int(ops * scale))
+    per_round = max(1, ops // rounds)
+    with contextlib.redirect_stdout(io.StringIO()):
+        op = setup()
+        for _ in range(min(5, ops)):  # Warm caches, connections, lazy imports
+            op()
+
+        timings, medians = [], []
+        for _ in range(rounds):
+            round_timings = []
+            for _ in range(per_round):
+                start = time.perf_counter()
+                op()
+                round_timings.append((time.perf_counter() - start) * 1000)
+            medians.append(statistics.median(round_timings))
+            timings += round_timings
+
+        allocations = []
+        tracemalloc.start()
+        for _ in range(min(ALLOC_OPS, ops)):
+            _drain_logs()
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            op()
+            allocations.append(tracemalloc.get_traced_memory()[1] - before)
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'ops': len(timings),
+        'ops_per_s': round(len(timings) / (sum(timings) / 1000), 1),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'p50_ms': round(min(medians), 3),
+        'p99_ms': round(_percentile(timings, 99), 3),
+        'alloc_kb': round(statistics.fmean(allocations) / 1024, 1),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float, alloc_threshold: float) -> list:
+    """Return ``[(scenario, metric, baseline, current, change), ...]`` beyond the thresholds."""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric, limit in (('p50_ms', threshold), ('alloc_kb', alloc_threshold)):
+            old, new = base.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if change > limit:
+                regressions.append((name, metric, old, new, change))
+    return regressions
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', default='', help='Comma-separated scenario names')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply every scenario\'s op count')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--rounds', type=int, default=3, help='Timed rounds per scenario')
+    parser.add_argument('--threshold', type=float, default=0.5, help='Allowed p50 slowdown (0.5 = 50%%)')
+    parser.add_argument('--alloc-threshold', type=float, default=0.1, help='Allowed allocation growth')
+    parser.add_argument('--save-baseline', action='store_true', help='Write results as the new baseline')
+    parser.add_argument('--list', action='store_true')
+    args = parser.parse_args()
+
+    if args.list:
+        print('\n'.join(SCENARIOS))
+        return 0
+    names = [n.strip() for n in args.only.split(',') if n.strip()] or list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    _configure()
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f).get('scenarios', {})
+
+    print(f"  {'scenario':<24} {'ops/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'alloc KB':>9}  vs baseline p50")
+    results = {}
+    for name in names:
+        results[name] = r = run_scenario(name, args.scale, max(1, args.rounds))
+        base = baseline.get(name, {}).get('p50_ms')
+        delta = f"{(r['p50_ms'] - base) / base:+.0%}" if base else 'n/a'
+        print(f"  {name:<24} {r['ops_per_s']:>9} {r['p50_ms']:>9} {r['p99_ms']:>9} {r['alloc_kb']:>9}  {delta}")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'scale': args.scale,
+            'rounds': args.rounds,
+        },
+        'scenarios': results,
+    }
+    path = args.baseline if args.save_baseline else args.output
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {os.path.relpath(path, ROOT)}")
+
+    for fake in FAKES.values():
+        fake.stop()
+
+    if args.save_baseline or not baseline:
+        return 0
+    regressions = compare(results, baseline, args.threshold, args.alloc_threshold)
+    for name, metric, old, new, change in regressions:
+        print(f"❌ REGRESSION {name}: {metric} {old} → {new} ({change:+.0%})")
+    if not regressions:
+        print(f"✅ No regressions (p50 within {args.threshold:.0%}, allocations within {args.alloc_threshold:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+=============================================================================
+🌐 DUBAI FLEA MARKET TRACKER — Benchmark: Telegram new-event fan-out
+=============================================================================
+Runs the real new-event fan-out against the local fake Bot API
+(bench/fake_telegram.py) for several subscriber counts. Each run seeds
+the subscriber table in a throwaway DATA_DIR:
+
+  threaded — ``send_telegram_new_events`` (chat by chat within each wave)
+  async    — ``send_telegram_new_events_async`` on the asyncio engine
+             (aiohttp if installed, else requests on the loop's thread pool)
+
+Both paths go through the subscriber registry, wave splitting, 429
+retry_after handling and the batched last_notified_at flush. The wave
+pause is set to 0 so the numbers show send throughput, not the pacing.
+
+Usage:
+  python bench/telegram_fanout.py [--sizes 10,100,10000] [--paths threaded,async]
+                                  [--latency-ms 5] [--rate-limit 0.01] [--blocked-ratio 0.02]
+=============================================================================
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'bench'))
+
+from fake_telegram import FakeTelegram  # noqa: E402
+
+ADMIN_CHAT_ID = '100000000'
+EVENTS = [{'id': 1, 'title': 'Benchmark Flea Market', 'link': 'https://example.com/e/1',
+           'date': '2026-01-01T10:00:00'}]
+
+
+def seed_subscribers(count: int) -> None:
+    """Replace the subscriber table with ``count`` chats (the admin is one of them)."""
+    from db import get_connection
+    from subscribers import SUBSCRIBERS
+
+    conn = get_connection()
+    conn.execute("DELETE FROM telegram_subscribers")
+    conn.executemany(
+        "INSERT INTO telegram_subscribers (chat_id, display_name, is_active, added_by, added_at) "
+        "VALUES (?, ?, 1, 'bench', '2026-01-01T00:00:00Z')",
+        [(str(100000001 + i), f'bench-{i}') for i in range(count - 1)],
+    )
+    conn.commit()
+    SUBSCRIBERS.invalidate()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10,100,10000', help='Comma-separated subscriber counts')
+    parser.add_argument('--paths', default='threaded,async', help='threaded, async or both')
+    parser.add_argument('--latency-ms', type=float, default=5)
+    parser.add_argument('--rate-limit', type=float, default=0, help='Fraction of sendMessage answered 429')
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--blocked-ratio', type=float, default=0, help='Fraction of chats answered 403')
+    parser.add_argument('--wave-size', type=int, default=25)
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    paths = [p.strip() for p in args.paths.split(',') if p.strip()]
+    blocked = [str(100000001 + i) for i in range(max(sizes))
+               if args.blocked_ratio and i % max(1, round(1 / args.blocked_ratio)) == 0]
+
+    fake = FakeTelegram(latency=args.latency_ms / 1000, rate_limit=args.rate_limit,
+                        retry_after=args.retry_after, blocked=blocked, seed=1).start()
+
+    # Configure before the app modules read their settings
+    os.environ.update({
+        'TELEGRAM_BOT_TOKEN': 'bench',
+        'TELEGRAM_API_BASE': fake.base_url,
+        'TELEGRAM_ADMIN_CHAT_ID': ADMIN_CHAT_ID,
+        'TELEGRAM_CHAT_IDS': '',
+        'TELEGRAM_WAVE_SIZE': str(args.wave_size),
+        'TELEGRAM_WAVE_PAUSE': '0',
+        'TURSO_DATABASE_URL': '',
+        'DATA_DIR': tempfile.mkdtemp(prefix='dfm-bench-'),
+    })
+
+    from notifications import send_telegram_new_events
+    from events_async import ENGINE, aiohttp, send_telegram_new_events_async
+
+    runners = {
+        'threaded': lambda: send_telegram_new_events(EVENTS),
+        'async': lambda: ENGINE.run(send_telegram_new_events_async(EVENTS)),
+    }
+
+    print(f"Telegram fan-out, {args.latency_ms:.0f}ms fake API latency, wave size {args.wave_size}, "
+          f"async client: {'aiohttp' if aiohttp else 'requests (thread pool)'}")
+    print(f"  {'chats':>6}  {'path':<9} {'wall ms':>9} {'msg/s':>9}  {'200':>6} {'429':>5} {'403':>5}")
+    for size in sizes:
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed_subscribers(size)
+        for path in paths:
+            fake.reset()
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                runners[path]()
+                elapsed = time.perf_counter() - start
+            stats = fake.stats()
+            ok = stats.get('sendMessage.200', 0)
+            print(f"  {size:>6}  {path:<9} {elapsed * 1000:9.0f} {ok / elapsed:9.1f}  "
+                  f"{ok:>6} {stats.get('sendMessage.429', 0):>5} {stats.get('sendMessage.403', 0):>5}")
+
+    ENGINE.stop()
+    fake.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -14,11 +14,13 @@ MUTATED (dict/list ops) can safely use either import style.
 import os
 import secrets
 import threading
-from collections import defaultdict
+from collections import deque
 from datetime import datetime, timezone, timedelta
 
 from flask import Flask
 
+from metrics import InstrumentedLock
+
 # Load .env file so credentials are available
 try:
     from dotenv import load_dotenv
@@ -45,8 +47,18 @@ app.permanent_session_lifetime = timedelta(hours=int(os.environ.get('ADMIN_SESSI
 
 # ===== Environment Variables =====
 ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', '')
-API_URL = "https://dubai-fleamarket.com/wp-json/wp/v2/product?per_page=20"
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')  # Bearer token for /metrics scrapers (admins need none)
+CONSOLE_LOG_LEVEL = os.environ.get('CONSOLE_LOG_LEVEL', 'debug').lower()  # debug | info | warning | error
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', '500'))  # Requests slower than this are flagged
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))  # Fraction of requests run under cProfile (kept only if slow)
+API_URL = os.environ.get('API_URL', "https://dubai-fleamarket.com/wp-json/wp/v2/product?per_page=20")  # WP REST product feed (point at bench/fake_wordpress.py for load tests)
 DATA_DIR = os.environ.get('DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
+LOG_DIR = os.environ.get('LOG_DIR', os.path.join(DATA_DIR, 'logs'))  # NDJSON log sink; '' disables
+LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', str(5 * 1024 * 1024)))  # Rotate the active log at this size
+LOG_ROTATE_HOURS = float(os.environ.get('LOG_ROTATE_HOURS', '24'))  # ...or at this age
+LOG_KEEP_SEGMENTS = max(1, int(os.environ.get('LOG_KEEP_SEGMENTS', '30')))  # Gzipped segments kept
+STATE_SNAPSHOT_PATH = os.environ.get('STATE_SNAPSHOT_PATH', os.path.join(DATA_DIR, 'state_snapshot.json'))  # Warm-restart snapshot; '' disables
+SNAPSHOT_INTERVAL_MINUTES = float(os.environ.get('SNAPSHOT_INTERVAL_MINUTES', '5'))
 
 # Telegram Bot (FREE - unlimited messages, instant push notifications)
 # Create bot: @BotFather on Telegram, get token
@@ -55,6 +67,16 @@ DATA_DIR = os.environ.get('DATA_DIR', os.path.dirname(os.path.abspath(__file__))
 TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN', '')
 TELEGRAM_CHAT_IDS = os.environ.get('TELEGRAM_CHAT_IDS', '')       # Comma-separated for NEW EVENTS
 TELEGRAM_ADMIN_CHAT_ID = os.environ.get('TELEGRAM_ADMIN_CHAT_ID', '')  # Admin only
+TELEGRAM_WAVE_SIZE = int(os.environ.get('TELEGRAM_WAVE_SIZE', '25'))  # Chats per send wave
+TELEGRAM_WAVE_PAUSE = float(os.environ.get('TELEGRAM_WAVE_PAUSE', '1.0'))  # Seconds between waves (Bot API ~30 msg/s)
+TELEGRAM_COMMAND_WORKERS = int(os.environ.get('TELEGRAM_COMMAND_WORKERS', '2'))  # Bot command handler threads
+TELEGRAM_COMMAND_QUEUE_SIZE = int(os.environ.get('TELEGRAM_COMMAND_QUEUE_SIZE', '100'))  # Pending commands before 503
+# How bot commands arrive: 'webhook' (needs a public URL), 'polling' (getUpdates
+# long polling, works without one) or 'auto' (webhook if RENDER_EXTERNAL_URL is set)
+TELEGRAM_INGEST = os.environ.get('TELEGRAM_INGEST', 'webhook').lower()
+TELEGRAM_POLL_TIMEOUT = int(os.environ.get('TELEGRAM_POLL_TIMEOUT', '25'))  # Long-poll seconds per getUpdates
+TELEGRAM_POLL_LIMIT = int(os.environ.get('TELEGRAM_POLL_LIMIT', '100'))  # Max updates per batch (Bot API max 100)
+TELEGRAM_API_BASE = os.environ.get('TELEGRAM_API_BASE', 'https://api.telegram.org').rstrip('/')  # Override for local fakes
 
 # Gmail SMTP (may be blocked on some cloud hosts like Render free tier)
 SMTP_SERVER = "smtp.gmail.com"
@@ -66,6 +88,11 @@ TO_EMAIL = os.environ.get('TO_EMAIL', '')
 # Force IPv4 for SMTP connections (fixes "Network is unreachable" on some cloud hosts)
 SMTP_USE_IPV4 = os.environ.get('SMTP_USE_IPV4', 'true').lower() == 'true'
 
+# Optional asyncio engine (events_async.py) for fetching and notification fan-out.
+# Off by default; uses aiohttp when installed, otherwise the loop's thread pool.
+ASYNC_ENGINE = os.environ.get('ASYNC_ENGINE', 'false').lower() == 'true'
+ASYNC_FANOUT_CONCURRENCY = int(os.environ.get('ASYNC_FANOUT_CONCURRENCY', '20'))  # In-flight sends per wave
+
 # ===== Runtime Configuration =====
 CONFIG = {
     'check_interval_minutes': int(os.environ.get('CHECK_INTERVAL', '15')),
@@ -109,16 +136,20 @@ LAST_GMAIL_CONFIG_LOG_AT = None  # Throttle "Gmail not configured" log
 CHECK_HISTORY = []
 MAX_CHECK_HISTORY = 50
 
-SYSTEM_CONSOLE = []
 MAX_CONSOLE_LOGS = 200
+SYSTEM_CONSOLE = deque(maxlen=MAX_CONSOLE_LOGS)  # (epoch, type, msg), newest last — read via utils.get_console_logs()
 
 EMAIL_QUEUE = []
 MAX_EMAIL_QUEUE = 50
 EMAIL_RETRY_INTERVALS = [30, 60, 120, 240]  # Minutes: 30min, 1hr, 2hr, 4hr
+EMAIL_RETRY_JITTER = float(os.environ.get('EMAIL_RETRY_JITTER', '0.2'))  # ±20% spread per retry
 MAX_EMAIL_AGE_HOURS = 24
 
 EVENT_STATS = {'daily': {}, 'hourly': {}}  # In-memory cache
 
+RECIPIENT_STATUS = None  # {email: {'enabled': bool}} — loaded once, written through
+RECIPIENT_CACHE_STATS = {'db_loads': 0, 'cache_hits': 0, 'last_prep_ms': 0.0, 'avg_prep_ms': 0.0, 'preps': 0}
+
 API_DIAGNOSTICS = {
     'last_request_time': None,
     'last_response_time_ms': 0,
@@ -127,22 +158,42 @@ API_DIAGNOSTICS = {
     'last_events_count': 0,
     'total_api_calls': 0,
     'failed_api_calls': 0,
+    'not_modified_responses': 0,
     'avg_response_time_ms': 0,
     'last_error': None,
     'last_successful_call': None
 }
 
 # ===== Security: Rate Limiting =====
-rate_limit_data = defaultdict(list)
 RATE_LIMIT_WINDOW = 60
 RATE_LIMIT_MAX_REQUESTS = 100  # Increased from 30 — dashboard polls frequently
-BLOCKED_IPS = set()
 BLOCK_DURATION = 300
+RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', '10000'))  # Bounds memory under IP spraying
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory').lower()  # 'memory' or 'db' (shared)
+RATE_LIMIT_SYNC_SECONDS = float(os.environ.get('RATE_LIMIT_SYNC_SECONDS', '2'))
+
+
+def _parse_rate(env_name: str, default: str) -> tuple:
+    """Parse a '<requests>/<seconds>' limit such as '100/60'."""
+    try:
+        requests_, seconds = os.environ.get(env_name, default).split('/')
+        return max(1, int(requests_)), max(1, int(seconds))
+    except ValueError:
+        requests_, seconds = default.split('/')
+        return int(requests_), int(seconds)
+
+
+# Per route class: (max requests, window seconds)
+RATE_LIMITS = {
+    'public': _parse_rate('RATE_LIMIT_PUBLIC', f'{RATE_LIMIT_MAX_REQUESTS}/{RATE_LIMIT_WINDOW}'),
+    'admin': _parse_rate('RATE_LIMIT_ADMIN', f'{RATE_LIMIT_MAX_REQUESTS}/{RATE_LIMIT_WINDOW}'),
+    'webhook': _parse_rate('RATE_LIMIT_WEBHOOK', '600/60'),
+}
 
 # ===== Threading =====
 checker_thread = None
 stop_checker = threading.Event()
-_data_lock = threading.RLock()
+_data_lock = InstrumentedLock('data', reentrant=True)  # console_log / log_activity
 
 # ===== Recursion Guard =====
 _admin_alert_in_progress = False
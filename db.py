@@ -14,15 +14,22 @@ Security:
 =============================================================================
 """
 
+import hashlib
 import os
+import re
 import socket
 import sqlite3
 import secrets
 import threading
+import time
+from collections import deque
 from datetime import datetime, timezone, timedelta
+from functools import lru_cache, wraps
 
 from typing import Any
 
+from metrics import DB_QUERY_SECONDS, DB_ERRORS, DB_SLOW_QUERIES, InstrumentedLock, record_db_call
+
 # ---------- Lazy libsql import (deferred to first get_connection() call) ----------
 # libsql_experimental is a C extension that can hang on import in some
 # environments. Loading it lazily ensures gunicorn's worker can boot and
@@ -79,7 +86,168 @@ LOCAL_DB_PATH = os.path.join(DATA_DIR, 'local_data.db')
 _conn = None
 _using_turso = False
 _db_initialized = False
-_conn_lock = threading.Lock()
+_conn_lock = InstrumentedLock('db_connection')
+# Writers share one connection (one transaction at a time): every db_* function
+# that writes holds this from its first statement to its commit (@_writes).
+# A plain RLock: it is taken on every write, and per-site stats would all
+# point at the decorator anyway.
+_write_lock = threading.RLock()
+
+# ---------- Statement instrumentation ----------
+# Statements slower than this are logged. A Turso round trip alone is often
+# close to 100ms, so the remote default is higher.
+SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', '300' if TURSO_DATABASE_URL else '100'))
+SLOW_QUERY_LOG_INTERVAL = 60  # Seconds between console lines for the same statement shape
+MAX_FINGERPRINTS = 200  # Distinct statement shapes tracked; the rest share one '<other>' row
+MAX_SLOW_QUERIES = 50   # Slow statements kept (newest first)
+
+_query_stats = {}  # fingerprint -> [count, total_s, max_s, errors]
+_slow_queries = deque(maxlen=MAX_SLOW_QUERIES)
+_slow_logged = {}  # fingerprint -> [last console line (monotonic), slow runs since]
+_stats_lock = threading.Lock()
+
+_SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+_SQL_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SQL_PARAM_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SQL_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=512)
+def fingerprint_sql(sql: str) -> str:
+    """
+    Normalize a statement into its shape: literals become ``?``, whitespace
+    collapses, and placeholder lists of any length become ``(?+)`` so a
+    chunked ``IN (...)`` query shows up as one row.
+    """
+    shape = _SQL_STRING.sub('?', sql)
+    shape = _SQL_NUMBER.sub('?', shape)
+    shape = _SQL_SPACE.sub(' ', shape).strip()
+    shape = _SQL_PARAM_LIST.sub('(?+)', shape)
+    return shape[:300]
+
+
+def _redact_params(params) -> list:
+    """Parameter types only (plus string length) — never the values."""
+    if not params:
+        return []
+    if isinstance(params, dict):
+        params = params.values()
+    return [f"str({len(p)})" if isinstance(p, str) else type(p).__name__
+            for p in list(params)[:20]]
+
+
+def _record_statement(sql: str, params, seconds: float, failed: bool, batch: int = 0) -> None:
+    shape = fingerprint_sql(sql)
+    with _stats_lock:
+        stats = _query_stats.get(shape)
+        if stats is None:
+            if len(_query_stats) >= MAX_FINGERPRINTS:
+                shape = '<other>'
+                stats = _query_stats.setdefault(shape, [0, 0.0, 0.0, 0])
+            else:
+                stats = _query_stats[shape] = [0, 0.0, 0.0, 0]
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds)
+        stats[3] += failed
+        if seconds * 1000 < SLOW_QUERY_MS:
+            return
+        _slow_queries.appendleft({
+            'at': _now_iso(),
+            'sql': shape,
+            'ms': round(seconds * 1000, 1),
+            'params': _redact_params(params) if not batch else [f"{batch} rows"],
+            'failed': failed,
+        })
+        # One console line per statement shape per interval; the rest are counted
+        logged = _slow_logged.setdefault(shape, [float('-inf'), 0])
+        logged[1] += 1
+        now = time.monotonic()
+        if now - logged[0] < SLOW_QUERY_LOG_INTERVAL:
+            repeats = 0
+        else:
+            repeats, logged[0], logged[1] = logged[1], now, 0
+    DB_SLOW_QUERIES.inc()
+    if not repeats:
+        return
+    from utils import console_log  # Late import: utils imports db
+    more = f" ({repeats} slow runs since the last report)" if repeats > 1 else ""
+    console_log(f"🐢 Slow query ({seconds * 1000:.0f}ms): {shape[:80]}{more}", "warning")
+
+
+class InstrumentedConnection:
+    """
+    Wraps the sqlite3 / libsql connection and times every statement.
+    ``execute`` covers the whole round trip on Turso; for local SQLite,
+    rows fetched after the first step are not included.
+    """
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def execute(self, sql: str, params=()):
+        start = time.perf_counter()
+        failed = False
+        try:
+            return self._raw.execute(sql, params)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            _record_statement(sql, params, time.perf_counter() - start, failed)
+
+    def executemany(self, sql: str, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        start = time.perf_counter()
+        failed = False
+        try:
+            return self._raw.executemany(sql, seq_of_params)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            _record_statement(sql, None, time.perf_counter() - start, failed,
+                              batch=len(seq_of_params))
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            return self._raw.commit()
+        finally:
+            _record_statement('COMMIT', None, time.perf_counter() - start, False)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+def get_query_stats(top: int = 10) -> dict:
+    """Per-fingerprint totals (slowest total time first) and the slow-query log."""
+    with _stats_lock:
+        rows = [{
+            'sql': shape,
+            'count': count,
+            'total_ms': round(total * 1000, 1),
+            'avg_ms': round(total * 1000 / count, 2),
+            'max_ms': round(peak * 1000, 1),
+            'errors': errors,
+        } for shape, (count, total, peak, errors) in _query_stats.items()]
+        slow = list(_slow_queries)
+    rows.sort(key=lambda r: r['total_ms'], reverse=True)
+    return {
+        'slow_threshold_ms': SLOW_QUERY_MS,
+        'statements': sum(r['count'] for r in rows),
+        'total_ms': round(sum(r['total_ms'] for r in rows), 1),
+        'fingerprints': len(rows),
+        'top': rows[:top],
+        'slow_queries': slow,
+    }
+
+
+def reset_query_stats() -> None:
+    with _stats_lock:
+        _query_stats.clear()
+        _slow_queries.clear()
+        _slow_logged.clear()
 
 
 def _now_iso() -> str:
@@ -92,6 +260,29 @@ def _now_formatted() -> str:
     return datetime.now(timezone.utc).strftime('%b %d, %Y at %I:%M %p')
 
 
+def _writes(fn):
+    """
+    Run a writing db_* function under ``_write_lock`` and roll back on error.
+
+    All threads share one connection, so without this another thread's
+    ``commit()`` could commit half of this function's writes, and a
+    ``rollback()`` here could discard someone else's.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with _write_lock:
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                if _conn is not None:
+                    try:
+                        _conn.rollback()
+                    except Exception:
+                        pass
+                raise
+    return wrapper
+
+
 def get_connection():
     """
     Get or create a database connection.
@@ -116,9 +307,9 @@ def get_connection():
         # ---- Try Turso cloud first (with timeout to prevent hanging on Render) ----
         if TURSO_DATABASE_URL and TURSO_AUTH_TOKEN:
             try:
-                _conn = _connect_turso_with_timeout(
+                _conn = InstrumentedConnection(_connect_turso_with_timeout(
                     TURSO_DATABASE_URL, TURSO_AUTH_TOKEN, timeout_sec=10
-                )
+                ))
                 _using_turso = True
                 _init_tables(_conn)
                 _db_initialized = True
@@ -133,7 +324,7 @@ def get_connection():
 
         # ---- Fallback: local SQLite ----
         try:
-            _conn = sqlite3.connect(LOCAL_DB_PATH, check_same_thread=False)
+            _conn = InstrumentedConnection(sqlite3.connect(LOCAL_DB_PATH, check_same_thread=False))
             _conn.execute("PRAGMA journal_mode=WAL")  # Better concurrent access
             _conn.execute("PRAGMA busy_timeout=5000")  # Wait 5s if locked
             _using_turso = False
@@ -158,7 +349,8 @@ def get_db_status() -> dict:
         tables = {}
         for table in ['seen_events', 'tracker_status', 'activity_logs',
                        'email_history', 'email_queue', 'event_stats',
-                       'telegram_subscribers', 'notification_settings']:
+                       'telegram_subscribers', 'notification_settings',
+                       'outbox', 'rate_limits']:
             try:
                 row = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
                 tables[table] = row[0] if row else 0
@@ -170,6 +362,7 @@ def get_db_status() -> dict:
             'backend': 'Turso (LibSQL Cloud)' if _using_turso else 'Local SQLite',
             'turso_configured': bool(TURSO_DATABASE_URL and TURSO_AUTH_TOKEN),
             'tables': tables,
+            'queries': get_query_stats(top=10),
             'db_path': TURSO_DATABASE_URL.split('@')[-1] if _using_turso and '@' in TURSO_DATABASE_URL else (LOCAL_DB_PATH if not _using_turso else TURSO_DATABASE_URL)
         }
     except Exception as e:
@@ -256,6 +449,28 @@ def _init_tables(conn):
             updated_at TEXT DEFAULT (datetime('now'))
         )""",
 
+        """CREATE TABLE IF NOT EXISTS outbox (
+            id TEXT PRIMARY KEY,
+            batch_id TEXT NOT NULL,
+            channel TEXT NOT NULL,
+            target TEXT DEFAULT '',
+            payload TEXT NOT NULL,
+            status TEXT DEFAULT 'pending',
+            attempts INTEGER DEFAULT 0,
+            last_error TEXT DEFAULT '',
+            created_at TEXT DEFAULT (datetime('now')),
+            updated_at TEXT DEFAULT (datetime('now'))
+        )""",
+
+        """CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox (status, created_at)""",
+
+        """CREATE TABLE IF NOT EXISTS rate_limits (
+            slot TEXT PRIMARY KEY,
+            tat REAL DEFAULT 0,
+            blocked_until REAL DEFAULT 0,
+            updated_at REAL DEFAULT 0
+        )""",
+
         """CREATE TABLE IF NOT EXISTS admin_audit (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             timestamp TEXT DEFAULT (datetime('now')),
@@ -324,6 +539,7 @@ def db_load_seen_events() -> dict:
     return {'event_ids': ids, 'event_details': details}
 
 
+@_writes
 def db_save_seen_event(event_id: int, title: str = '', link: str = '',
                        date_posted: str = '', first_seen: str = '') -> None:
     """Insert a single seen event. Ignores if already exists."""
@@ -339,6 +555,7 @@ def db_save_seen_event(event_id: int, title: str = '', link: str = '',
     conn.commit()
 
 
+@_writes
 def db_save_seen_events_bulk(seen_data: dict) -> None:
     """
     Save a full seen_data dict (compatible with old JSON format).
@@ -371,6 +588,7 @@ def db_check_event_exists(event_id: int) -> bool:
     return row is not None
 
 
+@_writes
 def db_remove_latest_event() -> dict | None:
     """Remove the most recently seen event. Returns the removed event or None."""
     conn = get_connection()
@@ -388,6 +606,43 @@ def db_remove_latest_event() -> dict | None:
     return None
 
 
+def db_get_recent_seen_events(limit: int = 5) -> list:
+    """Most recently seen events first (for bot replies — avoids a full table load)."""
+    conn = get_connection()
+    rows = conn.execute(
+        "SELECT event_id, title, link, date_posted, first_seen_at "
+        "FROM seen_events ORDER BY first_seen_at DESC, rowid DESC LIMIT ?",
+        (limit,)
+    ).fetchall()
+    return [
+        {
+            'id': r[0],
+            'title': r[1] or '',
+            'link': r[2] or '',
+            'date_posted': r[3] or '',
+            'first_seen': r[4] or ''
+        }
+        for r in rows
+    ]
+
+
+def db_filter_seen_event_ids(event_ids) -> set:
+    """Return which of ``event_ids`` are already in seen_events (primary-key lookups)."""
+    ids = [eid for eid in event_ids if isinstance(eid, int) and eid > 0]
+    if not ids:
+        return set()
+    conn = get_connection()
+    seen = set()
+    for i in range(0, len(ids), 500):  # Stay under SQLite's bound-parameter limit
+        chunk = ids[i:i + 500]
+        rows = conn.execute(
+            f"SELECT event_id FROM seen_events WHERE event_id IN ({','.join('?' * len(chunk))})",
+            chunk
+        ).fetchall()
+        seen.update(row[0] for row in rows)
+    return seen
+
+
 def db_get_seen_event_count() -> int:
     """Get total number of seen events."""
     conn = get_connection()
@@ -408,6 +663,7 @@ def db_get_status(key: str, default=None) -> str | None:
     return row[0] if row else default
 
 
+@_writes
 def db_set_status(key: str, value) -> None:
     """Set a status value."""
     conn = get_connection()
@@ -433,6 +689,7 @@ def db_load_status() -> dict:
     return result
 
 
+@_writes
 def db_save_status(status: dict) -> None:
     """Save a dict of status values."""
     conn = get_connection()
@@ -449,6 +706,7 @@ def db_save_status(status: dict) -> None:
 # ACTIVITY LOGS
 # =========================================================================
 
+@_writes
 def db_add_log(message: str, level: str = 'info') -> None:
     """Add an activity log entry. Auto-prunes to 500 entries max."""
     conn = get_connection()
@@ -487,6 +745,7 @@ def db_get_logs(limit: int = 50) -> list:
     ]
 
 
+@_writes
 def db_clear_logs() -> None:
     """Clear all activity logs."""
     conn = get_connection()
@@ -498,6 +757,7 @@ def db_clear_logs() -> None:
 # EMAIL HISTORY
 # =========================================================================
 
+@_writes
 def db_add_email_history(recipient: str, recipient_masked: str,
                          subject: str, success: bool,
                          error_msg: str = '') -> None:
@@ -548,13 +808,14 @@ def db_get_email_history(limit: int = 50) -> list:
 # EMAIL QUEUE
 # =========================================================================
 
+@_writes
 def db_add_to_queue(subject: str, body: str, recipient: str,
-                    priority: str = 'normal') -> str:
+                    priority: str = 'normal', next_retry: str | None = None) -> str:
     """Add a failed email to the retry queue. Returns the queue item ID."""
     item_id = secrets.token_hex(8)
     now = datetime.now(timezone.utc)
-    # First retry in 30 minutes
-    next_retry = (now + timedelta(minutes=30)).isoformat()
+    # First retry in 30 minutes unless the caller scheduled it
+    next_retry = next_retry or (now + timedelta(minutes=30)).isoformat()
 
     conn = get_connection()
     conn.execute(
@@ -612,6 +873,7 @@ def db_get_queue_item(item_id: str) -> dict | None:
     return None
 
 
+@_writes
 def db_update_queue_item(item_id: str, attempts: int, next_retry: str,
                          last_error: str = '') -> None:
     """Update retry info for a queue item."""
@@ -623,6 +885,7 @@ def db_update_queue_item(item_id: str, attempts: int, next_retry: str,
     conn.commit()
 
 
+@_writes
 def db_remove_from_queue(item_id: str) -> bool:
     """Remove an item from the queue. Returns True if removed."""
     conn = get_connection()
@@ -631,6 +894,7 @@ def db_remove_from_queue(item_id: str) -> bool:
     return cursor.rowcount > 0 if hasattr(cursor, 'rowcount') else True
 
 
+@_writes
 def db_clear_queue() -> int:
     """Clear the entire queue. Returns number of items cleared."""
     conn = get_connection()
@@ -661,6 +925,7 @@ def db_get_queue_high_priority_count() -> int:
 # EVENT STATS
 # =========================================================================
 
+@_writes
 def db_record_stat(stat_type: str, period: str, field: str, value: int = 1) -> None:
     """
     Record/increment a statistic.
@@ -706,6 +971,7 @@ def db_get_stats(stat_type: str = 'daily', limit: int = 30) -> list:
     ]
 
 
+@_writes
 def db_prune_stats() -> None:
     """Remove old stats: keep 30 days of daily, 48 hours of hourly."""
     conn = get_connection()
@@ -737,6 +1003,7 @@ def db_get_notification_setting(key: str) -> bool:
     return bool(row[0]) if row else True
 
 
+@_writes
 def db_set_notification_setting(key: str, enabled: bool) -> None:
     """Set a notification setting."""
     conn = get_connection()
@@ -786,6 +1053,7 @@ def mask_chat_id(chat_id: str) -> str:
     return f"****{chat_id[-4:]}"
 
 
+@_writes
 def db_add_subscriber(chat_id: str, display_name: str = '',
                       added_by: str = 'admin') -> bool:
     """Add a Telegram subscriber. Returns True if added (not duplicate)."""
@@ -812,6 +1080,7 @@ def db_add_subscriber(chat_id: str, display_name: str = '',
         return False
 
 
+@_writes
 def db_remove_subscriber(chat_id: str) -> bool:
     """Remove a Telegram subscriber."""
     conn = get_connection()
@@ -823,6 +1092,7 @@ def db_remove_subscriber(chat_id: str) -> bool:
     return cursor.rowcount > 0 if hasattr(cursor, 'rowcount') else True
 
 
+@_writes
 def db_toggle_subscriber(chat_id: str) -> bool | None:
     """Toggle subscriber active status. Returns new state or None if not found."""
     conn = get_connection()
@@ -877,6 +1147,7 @@ def db_get_active_subscriber_ids() -> list:
     return [r[0] for r in rows]
 
 
+@_writes
 def db_update_subscriber_notified(chat_id: str) -> None:
     """Update the last_notified_at timestamp for a subscriber."""
     conn = get_connection()
@@ -887,6 +1158,19 @@ def db_update_subscriber_notified(chat_id: str) -> None:
     conn.commit()
 
 
+@_writes
+def db_mark_subscribers_notified(updates: list) -> None:
+    """Bulk-set last_notified_at from ``[(chat_id, iso_timestamp), ...]`` in one commit."""
+    if not updates:
+        return
+    conn = get_connection()
+    conn.executemany(
+        "UPDATE telegram_subscribers SET last_notified_at = ? WHERE chat_id = ?",
+        [(ts, cid.strip()) for cid, ts in updates]
+    )
+    conn.commit()
+
+
 def db_get_subscriber_count(active_only: bool = False) -> int:
     """Get subscriber count."""
     conn = get_connection()
@@ -899,10 +1183,187 @@ def db_get_subscriber_count(active_only: bool = False) -> int:
     return row[0] if row else 0
 
 
+# =========================================================================
+# OUTBOX (new-event deliveries, written atomically with seen_events)
+# =========================================================================
+
+def _outbox_row_id(batch_id: str, channel: str, target: str) -> str:
+    """Deterministic row ID so re-inserting the same delivery is a no-op."""
+    return hashlib.sha1(f"{batch_id}|{channel}|{target}".encode()).hexdigest()[:16]
+
+
+@_writes
+def db_save_seen_events_with_outbox(seen_data: dict, batch_id: str, payload: str,
+                                    deliveries: list) -> int:
+    """
+    Insert seen events and their pending deliveries in ONE transaction.
+
+    ``deliveries`` is a list of ``(channel, target)`` tuples. Either every
+    row is committed or none is, so an event is never marked seen without
+    its notifications being queued (and vice versa) — ``@_writes`` keeps
+    other threads' commits and rollbacks out of the transaction. Returns
+    the number of outbox rows written.
+    """
+    conn = get_connection()
+    now = _now_iso()
+    written = 0
+    for event in seen_data.get('event_details', []):
+        eid = event.get('id')
+        if not isinstance(eid, int) or eid <= 0:
+            continue
+        conn.execute(
+            "INSERT OR IGNORE INTO seen_events (event_id, title, link, date_posted, first_seen_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (eid,
+             (event.get('title') or '')[:500],
+             (event.get('link') or '')[:2000],
+             (event.get('date_posted') or '')[:100],
+             event.get('first_seen') or _now_formatted())
+        )
+    for channel, target in deliveries:
+        conn.execute(
+            "INSERT OR IGNORE INTO outbox (id, batch_id, channel, target, payload, status, "
+            "attempts, created_at, updated_at) VALUES (?, ?, ?, ?, ?, 'pending', 0, ?, ?)",
+            (_outbox_row_id(batch_id, channel, target), batch_id[:64], channel[:20],
+             target[:200], payload[:100000], now, now)
+        )
+        written += 1
+    conn.commit()
+    return written
+
+
+def db_get_pending_outbox(limit: int = 200) -> list:
+    """Get undelivered outbox rows, oldest first."""
+    limit = min(limit, 1000)
+    conn = get_connection()
+    rows = conn.execute(
+        "SELECT id, batch_id, channel, target, payload, attempts, created_at FROM outbox "
+        "WHERE status = 'pending' ORDER BY created_at ASC LIMIT ?",
+        (limit,)
+    ).fetchall()
+    return [
+        {'id': r[0], 'batch_id': r[1], 'channel': r[2], 'target': r[3],
+         'payload': r[4], 'attempts': r[5], 'created_at': r[6]}
+        for r in rows
+    ]
+
+
+@_writes
+def db_claim_outbox_row(row_id: str) -> bool:
+    """Atomically move a row from 'pending' to 'sending'. False if already claimed."""
+    conn = get_connection()
+    cursor = conn.execute(
+        "UPDATE outbox SET status = 'sending', attempts = attempts + 1, updated_at = ? "
+        "WHERE id = ? AND status = 'pending'",
+        (_now_iso(), row_id)
+    )
+    conn.commit()
+    return cursor.rowcount > 0 if hasattr(cursor, 'rowcount') else True
+
+
+@_writes
+def db_finish_outbox_row(row_id: str, status: str, last_error: str = '') -> None:
+    """Set a claimed row's final status ('done', 'failed', or back to 'pending')."""
+    conn = get_connection()
+    conn.execute(
+        "UPDATE outbox SET status = ?, last_error = ?, updated_at = ? WHERE id = ?",
+        (status[:20], last_error[:500], _now_iso(), row_id)
+    )
+    if status != 'pending':
+        # Prune finished rows — keep max 500
+        conn.execute("""
+            DELETE FROM outbox WHERE status IN ('done', 'failed') AND id NOT IN (
+                SELECT id FROM outbox WHERE status IN ('done', 'failed')
+                ORDER BY updated_at DESC LIMIT 500
+            )
+        """)
+    conn.commit()
+
+
+@_writes
+def db_reset_stuck_outbox() -> int:
+    """Return rows left in 'sending' by a crashed process to 'pending'."""
+    conn = get_connection()
+    cursor = conn.execute(
+        "UPDATE outbox SET status = 'pending', updated_at = ? WHERE status = 'sending'",
+        (_now_iso(),)
+    )
+    conn.commit()
+    return cursor.rowcount if hasattr(cursor, 'rowcount') and cursor.rowcount > 0 else 0
+
+
+def db_get_outbox_counts() -> dict:
+    """Get outbox row counts grouped by status."""
+    conn = get_connection()
+    rows = conn.execute(
+        "SELECT status, COUNT(*) FROM outbox GROUP BY status"
+    ).fetchall()
+    return {r[0]: r[1] for r in rows}
+
+
+# =========================================================================
+# RATE LIMITS (shared limiter state across processes)
+# =========================================================================
+
+@_writes
+def db_rate_limit_push(updates: list, now: float) -> None:
+    """
+    Merge a batch of local limiter updates into the shared table.
+
+    ``updates`` is a list of ``(slot, consumed_seconds, blocked_until)``.
+    Each upsert is atomic: the stored arrival time advances from
+    ``max(stored, now)`` by ``consumed_seconds``, so concurrent processes
+    add up instead of overwriting each other.
+    """
+    if not updates:
+        return
+    conn = get_connection()
+    conn.executemany(
+        "INSERT INTO rate_limits (slot, tat, blocked_until, updated_at) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(slot) DO UPDATE SET "
+        "tat = MAX(rate_limits.tat, excluded.updated_at) + (excluded.tat - excluded.updated_at), "
+        "blocked_until = MAX(rate_limits.blocked_until, excluded.blocked_until), "
+        "updated_at = excluded.updated_at",
+        [(slot[:300], now + consumed, blocked_until, now) for slot, consumed, blocked_until in updates]
+    )
+    conn.commit()
+
+
+def db_rate_limit_fetch(slots: list, now: float) -> dict:
+    """Get ``{slot: (tat, blocked_until)}`` for ``slots`` plus every active block."""
+    conn = get_connection()
+    result = {}
+    for i in range(0, len(slots), 500):
+        chunk = slots[i:i + 500]
+        rows = conn.execute(
+            f"SELECT slot, tat, blocked_until FROM rate_limits WHERE slot IN ({','.join('?' * len(chunk))})",
+            chunk
+        ).fetchall()
+        result.update({r[0]: (r[1], r[2]) for r in rows})
+    rows = conn.execute(
+        "SELECT slot, tat, blocked_until FROM rate_limits WHERE blocked_until > ? LIMIT 10000",
+        (now,)
+    ).fetchall()
+    result.update({r[0]: (r[1], r[2]) for r in rows})
+    return result
+
+
+@_writes
+def db_rate_limit_prune(now: float) -> int:
+    """Delete rows whose bucket has refilled and whose block has expired."""
+    conn = get_connection()
+    cursor = conn.execute(
+        "DELETE FROM rate_limits WHERE tat < ? AND blocked_until < ?", (now, now)
+    )
+    conn.commit()
+    return cursor.rowcount if hasattr(cursor, 'rowcount') and cursor.rowcount > 0 else 0
+
+
 # =========================================================================
 # ADMIN AUDIT LOG
 # =========================================================================
 
+@_writes
 def db_add_audit_log(action: str, details: str = '', ip: str = '') -> None:
     """Record an admin action for auditing."""
     conn = get_connection()
@@ -1070,3 +1531,37 @@ def migrate_from_json(data_dir: str) -> dict:
             summary['errors'].append(f"admin_audit.json: {str(e)[:100]}")
 
     return summary
+
+
+# =========================================================================
+# METRICS — time every public db_* call (dfm_db_query_seconds{function})
+# =========================================================================
+
+_call_depth = threading.local()  # Nested db_* calls count once per request
+
+
+def _timed(fn):
+    name = fn.__name__
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        depth = getattr(_call_depth, 'value', 0)
+        _call_depth.value = depth + 1
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            DB_ERRORS.inc(function=name)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            _call_depth.value = depth
+            DB_QUERY_SECONDS.observe(elapsed, function=name)
+            if not depth:
+                record_db_call(elapsed)
+    return wrapper
+
+
+for _name, _fn in list(globals().items()):
+    if _name.startswith('db_') and callable(_fn):
+        globals()[_name] = _timed(_fn)
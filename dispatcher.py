@@ -0,0 +1,233 @@
+"""
+=============================================================================
+🌐 DUBAI FLEA MARKET TRACKER — Notification Dispatcher (Outbox Relay)
+=============================================================================
+Decouples new-event detection from delivery. ``check_for_events`` writes
+newly seen events AND one ``outbox`` row per pending delivery (the Telegram
+fan-out, plus one row per email recipient) in a single transaction, then
+wakes this relay and returns.
+
+The relay claims pending rows (``pending`` → ``sending`` is a conditional
+UPDATE, so a row is only ever delivered by one claimer) and fans them out
+in parallel on a small worker pool. A crash mid-send leaves at most the
+rows that were in flight to be retried on restart — never a whole batch
+re-notified, and never an event marked seen with its alert lost.
+
+With ``ASYNC_ENGINE`` on, a Telegram row's fan-out runs concurrently on the
+asyncio engine (events_async.py) instead of chat-by-chat on the worker.
+=============================================================================
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import config
+from utils import console_log, log_activity, mask_email, parse_iso_timestamp
+from notifications import (
+    send_telegram_new_events, send_email, build_new_event_email,
+    notify_admin_alert, telegram_event_alerts_ready,
+)
+from events_async import ENGINE, send_telegram_new_events_async
+from db import (
+    db_get_pending_outbox, db_claim_outbox_row, db_finish_outbox_row,
+    db_reset_stuck_outbox, db_get_outbox_counts,
+)
+from metrics import QUEUE_DEPTH
+
+NOTIFY_WORKERS = int(os.environ.get('NOTIFY_WORKERS', '4'))
+OUTBOX_POLL_SECONDS = 30       # Safety-net poll for rows left pending
+OUTBOX_MAX_ATTEMPTS = 3        # Telegram retries before a row is marked failed
+
+DISPATCH_STATS = {
+    'batches_delivered': 0,
+    'rows_delivered': 0,
+    'rows_failed': 0,
+    'rows_retried': 0,
+    'rows_recovered': 0,
+    'last_detection_ms': None,   # check start → outbox committed
+    'last_delivery_ms': None,    # outbox committed → all rows of batch finished
+    'avg_delivery_ms': 0,
+    'last_channel_ms': {},
+    'last_delivered_at': None,
+}
+
+_wake = threading.Event()
+_batch_committed_at = {}  # batch_id -> time.monotonic() when the outbox was written
+_pool = None
+_relay_thread = None
+_start_lock = threading.Lock()
+
+QUEUE_DEPTH.set_function(lambda: db_get_outbox_counts().get('pending', 0), queue='outbox_pending')
+
+
+def wake_dispatcher(batch_id: str | None = None, detection_ms: int | None = None) -> None:
+    """Tell the relay a new outbox batch is ready (returns immediately)."""
+    if batch_id:
+        _batch_committed_at[batch_id] = time.monotonic()
+    if detection_ms is not None:
+        DISPATCH_STATS['last_detection_ms'] = detection_ms
+    start_dispatcher()
+    _wake.set()
+
+
+def _deliver_row(row: dict, events: list) -> tuple:
+    """Deliver one outbox row. Returns (final_status, error, elapsed_ms)."""
+    start = time.monotonic()
+    if row['channel'] == 'telegram':
+        if not telegram_event_alerts_ready():
+            # Switched off (or unconfigured) after the row was queued: not a failure
+            return 'done', 'Skipped: Telegram alerts off', int((time.monotonic() - start) * 1000)
+        if config.ASYNC_ENGINE:
+            sent = ENGINE.run(send_telegram_new_events_async(events))
+        else:
+            sent = send_telegram_new_events(events)
+        if sent:
+            status, error = 'done', ''
+        elif row['attempts'] >= OUTBOX_MAX_ATTEMPTS:
+            status, error = 'failed', f"Telegram failed after {row['attempts']} attempt(s)"
+        else:
+            status, error = 'pending', 'Telegram failed, will retry'
+    elif row['channel'] == 'email':
+        subject, body = build_new_event_email(events)
+        if send_email(subject, body, row['target'], priority='high'):
+            status, error = 'done', ''
+        else:
+            # send_email already handed it to the email retry queue
+            status, error = 'failed', 'Queued for email retry'
+    else:
+        status, error = 'failed', f"Unknown channel: {row['channel']}"
+    return status, error, int((time.monotonic() - start) * 1000)
+
+
+def _batch_age_ms(batch_id: str, created_at: str) -> int:
+    committed = _batch_committed_at.pop(batch_id, None)
+    if committed is not None:
+        return int((time.monotonic() - committed) * 1000)
+    try:
+        return int((datetime.now(timezone.utc) - parse_iso_timestamp(created_at)).total_seconds() * 1000)
+    except Exception:
+        return 0
+
+
+def _relay_once() -> int:
+    """Claim and deliver every pending outbox row. Returns rows processed."""
+    rows = [row for row in db_get_pending_outbox() if db_claim_outbox_row(row['id'])]
+    if not rows:
+        return 0
+
+    payloads = {}
+    futures = []
+    for row in rows:
+        row['attempts'] += 1  # count the claim we just made
+        if row['batch_id'] not in payloads:
+            try:
+                payloads[row['batch_id']] = json.loads(row['payload'])
+            except (TypeError, ValueError):
+                payloads[row['batch_id']] = None
+        events = payloads[row['batch_id']]
+        if events is None:
+            db_finish_outbox_row(row['id'], 'failed', 'Unreadable payload')
+            continue
+        futures.append((row, _pool.submit(_deliver_row, row, events)))
+
+    console_log(f"📨 Outbox relay: delivering {len(futures)} row(s) across "
+                f"{len(payloads)} batch(es)", "info")
+
+    batches = {}
+    channel_ms = {}
+    for row, future in futures:
+        try:
+            status, error, elapsed_ms = future.result()
+        except Exception as e:
+            status, error, elapsed_ms = 'pending', str(e), 0
+        db_finish_outbox_row(row['id'], status, error)
+        channel_ms[row['channel']] = max(channel_ms.get(row['channel'], 0), elapsed_ms)
+
+        batch = batches.setdefault(row['batch_id'],
+                                   {'created_at': row['created_at'], 'failed': [], 'retrying': False})
+        if status == 'done':
+            DISPATCH_STATS['rows_delivered'] += 1
+        elif status == 'pending':
+            DISPATCH_STATS['rows_retried'] += 1
+            batch['retrying'] = True
+        else:
+            DISPATCH_STATS['rows_failed'] += 1
+            batch['failed'].append(row)
+
+    for batch_id, batch in batches.items():
+        if not batch['retrying']:
+            _record_batch(batch_id, batch['created_at'], channel_ms)
+        failed_telegram = [r for r in batch['failed'] if r['channel'] == 'telegram']
+        failed_email = [r for r in batch['failed'] if r['channel'] == 'email']
+        if failed_telegram:
+            notify_admin_alert("Telegram failed for new events. Email fallback attempted.", "Failover Notice")
+        if failed_email:
+            console_log(f"📬 Email delivery deferred for: "
+                        f"{', '.join(mask_email(r['target']) for r in failed_email)}", "warning")
+            notify_admin_alert(f"Email failed for {len(failed_email)} recipient(s) during new event alert.",
+                               "Email Delivery Issues")
+    return len(futures)
+
+
+def _record_batch(batch_id: str, created_at: str, channel_ms: dict) -> None:
+    delivery_ms = _batch_age_ms(batch_id, created_at)
+    delivered = DISPATCH_STATS['batches_delivered'] + 1
+    DISPATCH_STATS['batches_delivered'] = delivered
+    DISPATCH_STATS['last_delivery_ms'] = delivery_ms
+    DISPATCH_STATS['avg_delivery_ms'] = int(
+        (DISPATCH_STATS['avg_delivery_ms'] * (delivered - 1) + delivery_ms) / delivered
+    )
+    DISPATCH_STATS['last_channel_ms'] = dict(channel_ms)
+    DISPATCH_STATS['last_delivered_at'] = datetime.now(timezone.utc).isoformat()
+    console_log(f"📨 Notification batch {batch_id} delivered in {delivery_ms}ms", "success")
+
+
+def _relay_loop() -> None:
+    """Drain the outbox whenever woken (or every OUTBOX_POLL_SECONDS)."""
+    try:
+        recovered = db_reset_stuck_outbox()
+        if recovered:
+            DISPATCH_STATS['rows_recovered'] += recovered
+            log_activity(f"📨 Recovered {recovered} in-flight outbox row(s)", "warning")
+    except Exception as e:
+        console_log(f"⚠️ Could not reset in-flight outbox rows: {e}", "warning")
+
+    _wake.set()  # drain anything left pending by a previous run
+    while True:
+        _wake.wait(timeout=OUTBOX_POLL_SECONDS)
+        _wake.clear()
+        try:
+            _relay_once()
+        except Exception as e:
+            console_log(f"❌ Outbox relay error: {str(e)[:80]}", "error")
+            log_activity(f"Notification dispatch failed: {str(e)[:50]}", "error")
+
+
+def start_dispatcher() -> None:
+    """Start the relay thread and worker pool (idempotent)."""
+    global _pool, _relay_thread
+    with _start_lock:
+        if _relay_thread is not None and _relay_thread.is_alive():
+            return
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=NOTIFY_WORKERS, thread_name_prefix='notify')
+        _relay_thread = threading.Thread(target=_relay_loop, daemon=True, name='dispatcher')
+        _relay_thread.start()
+
+
+def get_dispatch_stats() -> dict:
+    """Relay metrics for diagnostics (detection vs delivery latency)."""
+    try:
+        outbox = db_get_outbox_counts()
+    except Exception:
+        outbox = {}
+    return {
+        **DISPATCH_STATS,
+        'workers': NOTIFY_WORKERS,
+        'running': _relay_thread is not None and _relay_thread.is_alive(),
+        'outbox': outbox,
+    }
@@ -8,10 +8,11 @@ import threading
 import time
 import requests
 from datetime import datetime, timezone, timedelta
+from urllib.parse import urlparse
 
 import config
 from config import (
-    CONFIG, API_URL, API_DIAGNOSTICS,
+    CONFIG, API_DIAGNOSTICS,
     CHECK_HISTORY, MAX_CHECK_HISTORY,
     stop_checker,
 )
@@ -21,96 +22,155 @@ from utils import (
     format_timestamp, parse_iso_timestamp,
 )
 from state import (
-    load_seen_events, save_seen_events,
+    filter_seen_event_ids, get_seen_event_count, save_seen_events_with_outbox,
     load_status, save_status, record_stat,
     should_send_daily_summary, mark_daily_summary_sent,
-    load_email_queue,
+    load_email_queue, prune_event_stats,
 )
 from notifications import (
-    send_new_event_email, send_heartbeat,
+    send_heartbeat,
     send_daily_summary_email, process_email_queue,
-    notify_admin_alert,
+    notify_admin_alert, telegram_event_alerts_ready,
 )
+from scheduler import Scheduler, SingleFlight
+from dispatcher import wake_dispatcher
+from retry_queue import EMAIL_RETRY_QUEUE
+from snapshot import save_snapshot
+from metrics import FETCH_SECONDS, CHECK_CYCLE_SECONDS, NEW_EVENTS, QUEUE_DEPTH
 
 
-def fetch_events() -> list | None:
-    """Fetch events from API with detailed diagnostics."""
-    start_time = time.time()
-    API_DIAGNOSTICS['last_request_time'] = datetime.now(timezone.utc).isoformat()
-    API_DIAGNOSTICS['total_api_calls'] = API_DIAGNOSTICS.get('total_api_calls', 0) + 1
+# Last 200 response, for conditional GETs (If-None-Match → 304 Not Modified)
+_last_response = {'url': None, 'etag': None, 'events': None}
 
-    console_log("📡 Initiating API request to dubai-fleamarket.com...", "api")
-    console_log(f"   └─ URL: {API_URL}", "debug")
-    console_log("   └─ Method: GET | Timeout: 15s", "debug")
 
-    try:
-        response = requests.get(API_URL, timeout=15)
-        elapsed_ms = int((time.time() - start_time) * 1000)
+def conditional_headers() -> dict:
+    """If-None-Match header for the current API_URL, if a cached response has an ETag."""
+    if _last_response['etag'] and _last_response['url'] == config.API_URL:
+        return {'If-None-Match': _last_response['etag']}
+    return {}
 
-        API_DIAGNOSTICS['last_response_time_ms'] = elapsed_ms
-        API_DIAGNOSTICS['last_status_code'] = response.status_code
-        API_DIAGNOSTICS['last_response_size'] = len(response.content)
 
-        # Update average response time
-        total_calls = API_DIAGNOSTICS['total_api_calls']
-        prev_avg = API_DIAGNOSTICS.get('avg_response_time_ms', 0)
-        API_DIAGNOSTICS['avg_response_time_ms'] = int(((prev_avg * (total_calls - 1)) + elapsed_ms) / total_calls)
+def remember_api_response(etag: str | None, data) -> None:
+    _last_response.update(url=config.API_URL, etag=etag, events=data if etag else None)
 
-        console_log("✅ API Response received", "success")
-        console_log(f"   └─ Status: {response.status_code} | Time: {elapsed_ms}ms | Size: {len(response.content)} bytes", "debug")
 
-        response.raise_for_status()
+def accept_not_modified() -> list:
+    """Handle a 304: the feed is unchanged, so reuse the cached event list."""
+    API_DIAGNOSTICS['not_modified_responses'] += 1
+    console_log("📦 API unchanged since last fetch (304) — reusing cached events", "info")
+    return accept_api_data(_last_response['events'] or [])
 
-        data = response.json()
-        events_count = len(data) if isinstance(data, list) else 0
-        API_DIAGNOSTICS['last_events_count'] = events_count
-        API_DIAGNOSTICS['last_successful_call'] = datetime.now(timezone.utc).isoformat()
-        API_DIAGNOSTICS['last_error'] = None
 
-        console_log(f"📦 Parsed {events_count} events from API response", "info")
+def record_api_response(status_code: int, size: int, elapsed_ms: int) -> None:
+    """Update API diagnostics for a response that arrived (any status)."""
+    API_DIAGNOSTICS['last_response_time_ms'] = elapsed_ms
+    API_DIAGNOSTICS['last_status_code'] = status_code
+    API_DIAGNOSTICS['last_response_size'] = size
+
+    # Update average response time
+    total_calls = API_DIAGNOSTICS['total_api_calls']
+    prev_avg = API_DIAGNOSTICS.get('avg_response_time_ms', 0)
+    API_DIAGNOSTICS['avg_response_time_ms'] = int(((prev_avg * (total_calls - 1)) + elapsed_ms) / total_calls)
+    FETCH_SECONDS.observe(elapsed_ms / 1000, outcome=str(status_code))
+
+    console_log("✅ API Response received", "success")
+    console_log(f"   └─ Status: {status_code} | Time: {elapsed_ms}ms | Size: {size} bytes", "debug")
+
+
+def accept_api_data(data) -> list:
+    """Record a successful parse and return the event list."""
+    events_count = len(data) if isinstance(data, list) else 0
+    API_DIAGNOSTICS['last_events_count'] = events_count
+    API_DIAGNOSTICS['last_successful_call'] = datetime.now(timezone.utc).isoformat()
+    API_DIAGNOSTICS['last_error'] = None
+
+    console_log(f"📦 Parsed {events_count} events from API response", "info")
+
+    # Log event titles for debugging
+    if events_count > 0:
+        for i, event in enumerate(data[:3]):  # Show first 3 events
+            title = event.get('title', {}).get('rendered', 'Unknown')[:40]
+            console_log(f"   └─ Event {i+1}: {title}...", "debug")
+        if events_count > 3:
+            console_log(f"   └─ ... and {events_count - 3} more events", "debug")
+
+    return data
+
+
+def record_api_failure(last_error: str, console_msg: str, activity_msg: str) -> None:
+    API_DIAGNOSTICS['failed_api_calls'] = API_DIAGNOSTICS.get('failed_api_calls', 0) + 1
+    API_DIAGNOSTICS['last_error'] = last_error
+    console_log(console_msg, "error")
+    log_activity(activity_msg, "error")
+
+
+def start_api_request() -> float:
+    API_DIAGNOSTICS['last_request_time'] = datetime.now(timezone.utc).isoformat()
+    API_DIAGNOSTICS['total_api_calls'] = API_DIAGNOSTICS.get('total_api_calls', 0) + 1
+
+    console_log(f"📡 Initiating API request to {urlparse(config.API_URL).netloc}...", "api")
+    console_log(f"   └─ URL: {config.API_URL}", "debug")
+    console_log("   └─ Method: GET | Timeout: 15s", "debug")
+    return time.time()
+
 
-        # Log event titles for debugging
-        if events_count > 0:
-            for i, event in enumerate(data[:3]):  # Show first 3 events
-                title = event.get('title', {}).get('rendered', 'Unknown')[:40]
-                console_log(f"   └─ Event {i+1}: {title}...", "debug")
-            if events_count > 3:
-                console_log(f"   └─ ... and {events_count - 3} more events", "debug")
+def fetch_events() -> list | None:
+    """Fetch events from API with detailed diagnostics."""
+    start_time = start_api_request()
 
-        return data
+    try:
+        response = requests.get(config.API_URL, headers=conditional_headers(), timeout=15)
+        elapsed_ms = int((time.time() - start_time) * 1000)
+        record_api_response(response.status_code, len(response.content), elapsed_ms)
+        if response.status_code == 304:
+            return accept_not_modified()
+        response.raise_for_status()
+        data = response.json()
+        remember_api_response(response.headers.get('ETag'), data)
+        return accept_api_data(data)
 
     except requests.exceptions.Timeout:
         elapsed_ms = int((time.time() - start_time) * 1000)
-        API_DIAGNOSTICS['failed_api_calls'] = API_DIAGNOSTICS.get('failed_api_calls', 0) + 1
-        API_DIAGNOSTICS['last_error'] = 'Timeout after 15s'
-        console_log(f"⏱️ API request timed out after {elapsed_ms}ms", "error")
-        log_activity("API request timed out", "error")
+        FETCH_SECONDS.observe(elapsed_ms / 1000, outcome='timeout')
+        record_api_failure('Timeout after 15s', f"⏱️ API request timed out after {elapsed_ms}ms",
+                            "API request timed out")
         return None
 
     except requests.exceptions.ConnectionError as e:
-        elapsed_ms = int((time.time() - start_time) * 1000)
-        API_DIAGNOSTICS['failed_api_calls'] = API_DIAGNOSTICS.get('failed_api_calls', 0) + 1
-        API_DIAGNOSTICS['last_error'] = 'Connection failed'
-        console_log(f"🔌 Connection error: {str(e)[:50]}", "error")
-        log_activity(f"Connection error: {str(e)[:30]}", "error")
+        FETCH_SECONDS.observe(time.time() - start_time, outcome='connection_error')
+        record_api_failure('Connection failed', f"🔌 Connection error: {str(e)[:50]}",
+                            f"Connection error: {str(e)[:30]}")
         return None
 
     except Exception as e:
-        elapsed_ms = int((time.time() - start_time) * 1000)
-        API_DIAGNOSTICS['failed_api_calls'] = API_DIAGNOSTICS.get('failed_api_calls', 0) + 1
-        API_DIAGNOSTICS['last_error'] = str(e)[:100]
-        console_log(f"❌ API Error: {str(e)[:80]}", "error")
-        log_activity(f"Failed to fetch events: {e}", "error")
+        record_api_failure(str(e)[:100], f"❌ API Error: {str(e)[:80]}",
+                            f"Failed to fetch events: {e}")
         return None
 
 
-def check_for_events() -> None:
-    """Main event checking logic with detailed console logging."""
+def _fetch_for_check() -> list | None:
+    """Fetch through the asyncio engine when enabled, else on this thread."""
+    if config.ASYNC_ENGINE:
+        # Late import to break circular dependency (events_async → notifications → ...)
+        from events_async import ENGINE, fetch_events_async
+        try:
+            return ENGINE.run(fetch_events_async(), timeout=30)
+        except Exception as e:
+            console_log(f"⚠️ Async fetch failed, falling back to threaded fetch: {str(e)[:60]}", "warning")
+    return fetch_events()
+
+
+def check_for_events() -> dict | None:
+    """Main event checking logic with detailed console logging.
+
+    Returns the check history entry, or None if the API fetch failed.
+    """
     console_log("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━", "info")
     console_log("🔍 STARTING EVENT CHECK CYCLE", "info")
     console_log("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━", "info")
 
     log_activity("🔍 Starting event check...")
+    check_started = time.monotonic()
     CONFIG['last_check'] = datetime.now(timezone.utc).isoformat()
     CONFIG['total_checks'] += 1
 
@@ -119,23 +179,24 @@ def check_for_events() -> None:
     console_log(f"📊 Check #{CONFIG['total_checks']} initiated", "info")
     console_log(f"   └─ Interval: Every {CONFIG['check_interval_minutes']} minutes", "debug")
 
-    # Load existing seen events
-    console_log("📂 Loading seen events database...", "info")
-    seen_data = load_seen_events()
-    seen_ids = seen_data.get('event_ids', [])
-    console_log(f"   └─ Found {len(seen_ids)} previously seen events in database", "debug")
+    console_log("📂 Checking seen events database...", "info")
+    console_log(f"   └─ Found {get_seen_event_count()} previously seen events in database", "debug")
 
     # Fetch events from API
-    events = fetch_events()
+    events = _fetch_for_check()
     if events is None:
         console_log("❌ Event check failed - API returned no data", "error")
         log_activity("Failed to fetch events from API", "error")
-        return
+        CHECK_CYCLE_SECONDS.observe(time.monotonic() - check_started, outcome='fetch_failed')
+        return None
 
     log_activity(f"📡 Fetched {len(events)} events from API")
 
-    # Compare events
+    # Compare events — look up only the fetched IDs, so the cost does not
+    # grow with the seen-events history
     console_log("🔄 Comparing events with database...", "info")
+    seen_ids = filter_seen_event_ids([event.get('id') for event in events])
+    seen_data = {'event_ids': [], 'event_details': []}  # New events only
     new_events = []
     for event in events:
         event_id = event.get('id')
@@ -163,8 +224,9 @@ def check_for_events() -> None:
             }
             new_events.append(event_info)
 
+            seen_ids.add(event_id)
             seen_data['event_ids'].append(event_id)
-            seen_data.setdefault('event_details', []).append({
+            seen_data['event_details'].append({
                 **event_info,
                 'first_seen': datetime.now(timezone.utc).strftime('%b %d, %Y at %I:%M %p')
             })
@@ -182,19 +244,26 @@ def check_for_events() -> None:
     }
 
     if new_events:
-        CONFIG['total_new_events'] += len(new_events)
-        # Record new events statistic
-        record_stat('new_events', len(new_events))
         console_log(f"🎉 FOUND {len(new_events)} NEW EVENT(S)!", "success")
         log_activity(f"🆕 Found {len(new_events)} NEW event(s)!", "success")
 
-        console_log("📧 Sending email notifications...", "info")
-        send_new_event_email(new_events)
-
-        console_log("💾 Saving updated database...", "info")
-        save_seen_events(seen_data)
-        console_log("   └─ Database saved successfully", "debug")
-        check_result['emails_sent'] = True
+        # Seen events and their pending deliveries commit in one transaction;
+        # the dispatcher relays the outbox, so the check does not wait on sends
+        console_log("💾 Saving events and queueing notifications...", "info")
+        batch_id = save_seen_events_with_outbox(seen_data, new_events, telegram=telegram_event_alerts_ready())
+        detection_ms = int((time.monotonic() - check_started) * 1000)
+        check_result['detection_ms'] = detection_ms
+        if batch_id:
+            # Counted only once committed: a failed save finds them again next check
+            NEW_EVENTS.inc(len(new_events))
+            CONFIG['total_new_events'] += len(new_events)
+            record_stat('new_events', len(new_events))
+            console_log(f"   └─ Committed with outbox batch {batch_id}", "debug")
+            wake_dispatcher(batch_id, detection_ms)
+            check_result['emails_sent'] = True
+        else:
+            console_log("   └─ Save failed — events will be retried next check", "error")
+            check_result['emails_sent'] = False
     else:
         console_log("✨ No new events found - all events already seen", "info")
         log_activity("✨ No new events found")
@@ -216,6 +285,8 @@ def check_for_events() -> None:
     CONFIG['next_check'] = next_check_time.isoformat()
     console_log(f"⏰ Next check scheduled: {next_check_time.strftime('%H:%M:%S UTC')}", "info")
     console_log("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━", "info")
+    CHECK_CYCLE_SECONDS.observe(time.monotonic() - check_started, outcome='success')
+    return check_result
 
 
 def should_send_heartbeat() -> bool:
@@ -238,8 +309,220 @@ def should_send_heartbeat() -> bool:
         return True
 
 
+# ===== Scheduled Jobs =====
+
+JOB_CHECK = 'check'
+JOB_HEARTBEAT = 'heartbeat'
+JOB_DAILY_SUMMARY = 'daily_summary'
+JOB_QUEUE_RETRY = 'queue_retry'
+JOB_PRUNE = 'prune'
+JOB_SNAPSHOT = 'snapshot'
+
+QUEUE_RETRY_PAUSED_SECONDS = 15 * 60  # Re-check the retry queue while the tracker is paused
+PRUNE_INTERVAL_SECONDS = 6 * 3600
+RECOVERY_COOLDOWN_SECONDS = 300  # Back-off after repeated checker errors
+ERROR_NOTIFY_COOLDOWN = 300  # 5 minutes between error telegram notifications
+WATCHDOG_STABLE_SECONDS = 300  # A checker alive this long resets the restart back-off
+
+SCHEDULER = Scheduler(stop_checker)
+QUEUE_DEPTH.set_function(lambda: len(SCHEDULER.snapshot()), queue='scheduled_jobs')
+
+
+def _on_retry_queue_change(seconds_until_due: float | None) -> None:
+    """Pull the queue_retry job forward when an earlier email retry is queued."""
+    if seconds_until_due is not None:
+        SCHEDULER.schedule_earlier(JOB_QUEUE_RETRY, seconds_until_due)
+
+
+EMAIL_RETRY_QUEUE.set_listener(_on_retry_queue_change)
+
+# Every caller of run_check() that arrives while a check is in progress
+# shares that check's result instead of fetching again.
+CHECK_FLIGHT = SingleFlight()
+MANUAL_CHECK_STATS = {'requests': 0, 'coalesced': 0}
+
+# Manual check requests waiting for the checker to pick them up.
+# Every request that arrives before the checker runs joins the same check.
+_manual_check_lock = threading.Lock()
+_manual_check_pending = False
+_manual_check_callbacks = []
+
+
+def request_check(on_done=None) -> bool:
+    """Ask the background checker to run a check as soon as possible.
+
+    Instead of spawning a parallel check, the request is coalesced into the
+    checker's next run. ``on_done(result)`` is called from the checker thread
+    with the check result dict (or None if the check failed).
+    Returns True if the request joined one that was already pending.
+    """
+    global _manual_check_pending
+    # Requests arrive on concurrent waitress threads: the counters, the
+    # attach and the pending flag all change under one lock.
+    with _manual_check_lock:
+        MANUAL_CHECK_STATS['requests'] += 1
+        attached = CHECK_FLIGHT.attach(on_done or (lambda _result: None))
+        if attached:
+            coalesced = True
+        else:
+            coalesced = _manual_check_pending
+            _manual_check_pending = True
+            if on_done is not None:
+                _manual_check_callbacks.append(on_done)
+        if coalesced:
+            MANUAL_CHECK_STATS['coalesced'] += 1
+    if attached:
+        console_log("⚡ Manual check request attached to in-progress check", "debug")
+        return True
+    SCHEDULER.wake(JOB_CHECK)
+    if coalesced:
+        console_log("⚡ Manual check request merged into pending check", "debug")
+    return coalesced
+
+
+def run_check() -> dict | None:
+    """Run ``check_for_events`` through the single-flight guard.
+
+    Safe to call from any thread: if a check is already running, this
+    blocks until it finishes and returns its result instead of starting a
+    second fetch (which could double-count stats or double-notify).
+    """
+    return CHECK_FLIGHT.do(check_for_events)
+
+
+def get_check_coordination_stats() -> dict:
+    """Single-flight and manual-request coalescing metrics for diagnostics."""
+    return {
+        **CHECK_FLIGHT.snapshot(),
+        'manual_requests': MANUAL_CHECK_STATS['requests'],
+        'manual_coalesced': MANUAL_CHECK_STATS['coalesced'],
+        'manual_pending': _manual_check_pending,
+    }
+
+
+def _take_manual_check_requests() -> tuple:
+    """Claim all pending manual requests. Returns (was_requested, callbacks)."""
+    global _manual_check_pending
+    with _manual_check_lock:
+        requested = _manual_check_pending
+        callbacks = _manual_check_callbacks[:]
+        _manual_check_callbacks.clear()
+        _manual_check_pending = False
+    return requested, callbacks
+
+
+def _check_interval_seconds() -> int:
+    return CONFIG['check_interval_minutes'] * 60
+
+
+def _seconds_until_heartbeat() -> float:
+    """Seconds until the next heartbeat is due, based on the persisted last send."""
+    last_heartbeat = load_status().get('last_heartbeat')
+    if not last_heartbeat:
+        return 0
+    try:
+        since = (datetime.now(timezone.utc) - parse_iso_timestamp(last_heartbeat)).total_seconds()
+    except Exception:
+        return 0
+    return max(0.0, CONFIG['heartbeat_hours'] * 3600 - since)
+
+
+def _seconds_until_summary_hour() -> float:
+    """Seconds until the next occurrence of the configured daily summary hour."""
+    now = datetime.now(timezone.utc)
+    target = now.replace(hour=CONFIG.get('daily_summary_hour', 9), minute=0, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+def _schedule_next_check(delay_seconds: float) -> None:
+    SCHEDULER.schedule(JOB_CHECK, delay_seconds)
+    next_check_time = datetime.now(timezone.utc) + timedelta(seconds=delay_seconds)
+    CONFIG['next_check'] = next_check_time.isoformat()
+
+
+def _run_heartbeat_job() -> None:
+    """Send the heartbeat if due, then sleep until the next one is due."""
+    delay = _check_interval_seconds()
+    try:
+        if CONFIG['tracker_enabled'] and should_send_heartbeat():
+            log_activity("💓 Sending scheduled heartbeat...")
+            console_log("💓 Sending scheduled heartbeat email...", "info")
+            if send_heartbeat():
+                status = load_status()
+                status['last_heartbeat'] = datetime.now(timezone.utc).isoformat()
+                save_status(status)
+                CONFIG['next_heartbeat'] = (datetime.now(timezone.utc) + timedelta(hours=CONFIG['heartbeat_hours'])).isoformat()
+                log_activity("💓 Heartbeat sent!", "success")
+                console_log("✅ Heartbeat email sent successfully", "success")
+                delay = CONFIG['heartbeat_hours'] * 3600
+        elif CONFIG['tracker_enabled'] and CONFIG['heartbeat_enabled']:
+            # Not due yet — sleep exactly until it is (re-checked at least every interval)
+            delay = max(1.0, min(_seconds_until_heartbeat(), delay))
+    finally:
+        SCHEDULER.schedule(JOB_HEARTBEAT, delay)
+
+
+def _run_daily_summary_job() -> None:
+    """Send the daily summary if due, then sleep until the next summary hour."""
+    delay = min(_check_interval_seconds(), _seconds_until_summary_hour())
+    try:
+        if CONFIG['tracker_enabled'] and should_send_daily_summary():
+            log_activity("📊 Sending scheduled daily summary...")
+            console_log("📊 Sending scheduled daily summary...", "info")
+            if send_daily_summary_email():
+                mark_daily_summary_sent()
+                log_activity("📊 Daily summary sent", "success")
+                console_log("✅ Daily summary email sent", "success")
+                delay = _seconds_until_summary_hour()
+            else:
+                console_log("❌ Failed to send daily summary", "error")
+    finally:
+        SCHEDULER.schedule(JOB_DAILY_SUMMARY, delay)
+
+
+def _run_queue_retry_job() -> None:
+    """Retry the emails that are due; sleep until the next one otherwise."""
+    delay = QUEUE_RETRY_PAUSED_SECONDS
+    try:
+        if CONFIG['tracker_enabled']:
+            console_log("📬 Checking email retry queue...", "debug")
+            process_email_queue()
+            delay = EMAIL_RETRY_QUEUE.seconds_until_next()
+    finally:
+        _schedule_queue_retry(delay)
+
+
+def _schedule_queue_retry(delay: float | None) -> None:
+    if delay is None:
+        SCHEDULER.cancel(JOB_QUEUE_RETRY)  # Queue empty — add() reschedules it
+    else:
+        SCHEDULER.schedule(JOB_QUEUE_RETRY, delay)
+
+
+def _run_prune_job() -> None:
+    """Trim old hourly/daily statistics rows."""
+    try:
+        prune_event_stats()
+    finally:
+        SCHEDULER.schedule(JOB_PRUNE, PRUNE_INTERVAL_SECONDS)
+
+
+def _run_snapshot_job() -> None:
+    """Write the warm-restart state snapshot (snapshot.py)."""
+    try:
+        save_snapshot()
+    finally:
+        SCHEDULER.schedule(JOB_SNAPSHOT, config.SNAPSHOT_INTERVAL_MINUTES * 60)
+
+
 def background_checker():
-    """Background thread that runs the event checker with self-healing."""
+    """Background thread that runs all scheduled jobs with self-healing.
+
+    Sleeps until the earliest job deadline in ``SCHEDULER`` (or until woken
+    by ``request_check``) instead of polling.
+    """
     log_activity("🚀 Background checker started", "success")
     console_log("🚀 Background checker thread initialized", "success")
 
@@ -248,120 +531,101 @@ def background_checker():
 
     consecutive_errors = 0
     max_consecutive_errors = 5
-    check_interval_seconds = CONFIG['check_interval_minutes'] * 60
-    last_queue_check = datetime.now(timezone.utc)
-    queue_check_interval = timedelta(minutes=15)  # Process queue every 15 minutes
     last_error_notify_at = None  # Throttle error notifications
-    ERROR_NOTIFY_COOLDOWN = 300  # 5 minutes between error telegram notifications
 
-    while not stop_checker.is_set():
-        if CONFIG['tracker_enabled']:
+    # First check runs immediately; heartbeat and summary are evaluated right after it
+    SCHEDULER.schedule(JOB_CHECK, 0)
+    SCHEDULER.schedule(JOB_HEARTBEAT, 0)
+    SCHEDULER.schedule(JOB_DAILY_SUMMARY, 0)
+    _schedule_queue_retry(EMAIL_RETRY_QUEUE.seconds_until_next())
+    SCHEDULER.schedule(JOB_PRUNE, 60)
+    if config.STATE_SNAPSHOT_PATH:
+        SCHEDULER.schedule(JOB_SNAPSHOT, config.SNAPSHOT_INTERVAL_MINUTES * 60)
+
+    jobs = {
+        JOB_HEARTBEAT: _run_heartbeat_job,
+        JOB_DAILY_SUMMARY: _run_daily_summary_job,
+        JOB_QUEUE_RETRY: _run_queue_retry_job,
+        JOB_PRUNE: _run_prune_job,
+        JOB_SNAPSHOT: _run_snapshot_job,
+    }
+
+    while True:
+        job = SCHEDULER.next_due()
+        if job is None:
+            break
+
+        if job != JOB_CHECK:
             try:
-                check_for_events()
-                consecutive_errors = 0  # Reset error counter on success
-
-                if should_send_heartbeat():
-                    log_activity("💓 Sending scheduled heartbeat...")
-                    console_log("💓 Sending scheduled heartbeat email...", "info")
-                    if send_heartbeat():
-                        status = load_status()
-                        status['last_heartbeat'] = datetime.now(timezone.utc).isoformat()
-                        save_status(status)
-                        CONFIG['next_heartbeat'] = (datetime.now(timezone.utc) + timedelta(hours=CONFIG['heartbeat_hours'])).isoformat()
-                        log_activity("💓 Heartbeat sent!", "success")
-                        console_log("✅ Heartbeat email sent successfully", "success")
-
-                if should_send_daily_summary():
-                    log_activity("📊 Sending scheduled daily summary...")
-                    console_log("📊 Sending scheduled daily summary...", "info")
-                    if send_daily_summary_email():
-                        mark_daily_summary_sent()
-                        log_activity("📊 Daily summary sent", "success")
-                        console_log("✅ Daily summary email sent", "success")
-                    else:
-                        console_log("❌ Failed to send daily summary", "error")
-
-                # Process email queue periodically
-                now = datetime.now(timezone.utc)
-                if now - last_queue_check >= queue_check_interval:
-                    if config.EMAIL_QUEUE:
-                        console_log("📬 Checking email retry queue...", "debug")
-                        process_email_queue()
-                    last_queue_check = now
-
-            except RecursionError:
-                consecutive_errors += 1
-                log_activity(f"RecursionError in checker ({consecutive_errors}/{max_consecutive_errors})", "error")
-                console_log("❌ RecursionError caught — breaking recursion cycle", "error")
-                # Do NOT call notify_admin_alert here to avoid making it worse
-                # Just log and continue
-                if consecutive_errors >= max_consecutive_errors:
-                    console_log("🔄 Too many RecursionErrors, entering recovery mode (5 min cooldown)", "warning")
-                    stop_checker.wait(timeout=300)
-                    consecutive_errors = 0
+                jobs[job]()
             except Exception as e:
-                consecutive_errors += 1
-                error_msg = str(e)[:50]
-                import traceback
-                full_trace = traceback.format_exc()
-                log_activity(f"Error in checker ({consecutive_errors}/{max_consecutive_errors}): {error_msg}", "error")
-                console_log(f"⚠️ Checker error ({consecutive_errors}/{max_consecutive_errors}): {error_msg}", "error")
-                console_log(f"   └─ Exception type: {type(e).__name__}", "debug")
-                console_log("   └─ Full trace logged to console", "debug")
-                print(f"[FULL TRACEBACK]\n{full_trace}")
-
-                # Throttled error notification — max once per 5 minutes
-                now_ts = datetime.now(timezone.utc)
-                should_notify = True
-                if last_error_notify_at:
-                    elapsed = (now_ts - last_error_notify_at).total_seconds()
-                    should_notify = elapsed >= ERROR_NOTIFY_COOLDOWN
-
-                if should_notify:
-                    notify_admin_alert(
-                        f"⚠️ Checker Error ({consecutive_errors}/{max_consecutive_errors})\n"
-                        f"Type: {type(e).__name__}\n"
-                        f"Error: {error_msg}",
-                        "Checker Error Alert"
-                    )
-                    last_error_notify_at = now_ts
-                else:
-                    console_log("⚠️ Error notification throttled (cooldown active)", "debug")
-
-                # If too many consecutive errors, wait longer before retry
-                if consecutive_errors >= max_consecutive_errors:
-                    console_log("🔄 Too many errors, entering recovery mode (5 min cooldown)", "warning")
-                    console_log(f"   └─ Error threshold reached: {max_consecutive_errors} consecutive failures", "debug")
-                    log_activity("⚠️ Entering recovery mode due to repeated errors", "warning")
-                    stop_checker.wait(timeout=300)  # Wait 5 minutes
-                    consecutive_errors = 0  # Reset after cooldown
-                    console_log("🔄 Recovery cooldown complete, resuming normal operation", "info")
-
-        # Wait for next check with countdown logging
-        wait_start = datetime.now(timezone.utc)
-        elapsed = 0
-        logged_milestones = set()  # Track which milestones we've logged
-
-        while elapsed < check_interval_seconds and not stop_checker.is_set():
-            remaining = check_interval_seconds - elapsed
-
-            # Log countdown at certain intervals (check ranges to avoid missing exact values)
-            milestones = [
-                (600, 601, "10 minutes"),
-                (300, 301, "5 minutes"),
-                (120, 121, "2 minutes"),
-                (60, 61, "1 minute"),
-                (30, 31, "30 seconds"),
-                (10, 11, "10 seconds"),
-            ]
-
-            for low, high, label in milestones:
-                if low <= remaining < high and low not in logged_milestones:
-                    console_log(f"⏳ Next check in {label}...", "debug")
-                    logged_milestones.add(low)
-
-            stop_checker.wait(timeout=1)
-            elapsed = int((datetime.now(timezone.utc) - wait_start).total_seconds())
+                console_log(f"⚠️ Scheduled job '{job}' failed: {str(e)[:50]}", "error")
+            continue
+
+        manual, callbacks = _take_manual_check_requests()
+        result = None
+        next_delay = _check_interval_seconds()
+        try:
+            if CONFIG['tracker_enabled'] or manual:
+                result = run_check()
+            consecutive_errors = 0  # Reset error counter on success
+
+        except RecursionError:
+            consecutive_errors += 1
+            log_activity(f"RecursionError in checker ({consecutive_errors}/{max_consecutive_errors})", "error")
+            console_log("❌ RecursionError caught — breaking recursion cycle", "error")
+            # Do NOT call notify_admin_alert here to avoid making it worse
+            # Just log and continue
+            if consecutive_errors >= max_consecutive_errors:
+                console_log("🔄 Too many RecursionErrors, entering recovery mode (5 min cooldown)", "warning")
+                next_delay = RECOVERY_COOLDOWN_SECONDS
+                consecutive_errors = 0
+        except Exception as e:
+            consecutive_errors += 1
+            error_msg = str(e)[:50]
+            import traceback
+            full_trace = traceback.format_exc()
+            log_activity(f"Error in checker ({consecutive_errors}/{max_consecutive_errors}): {error_msg}", "error")
+            console_log(f"⚠️ Checker error ({consecutive_errors}/{max_consecutive_errors}): {error_msg}", "error")
+            console_log(f"   └─ Exception type: {type(e).__name__}", "debug")
+            console_log("   └─ Full trace logged to console", "debug")
+            print(f"[FULL TRACEBACK]\n{full_trace}")
+
+            # Throttled error notification — max once per 5 minutes
+            now_ts = datetime.now(timezone.utc)
+            should_notify = True
+            if last_error_notify_at:
+                elapsed = (now_ts - last_error_notify_at).total_seconds()
+                should_notify = elapsed >= ERROR_NOTIFY_COOLDOWN
+
+            if should_notify:
+                notify_admin_alert(
+                    f"⚠️ Checker Error ({consecutive_errors}/{max_consecutive_errors})\n"
+                    f"Type: {type(e).__name__}\n"
+                    f"Error: {error_msg}",
+                    "Checker Error Alert"
+                )
+                last_error_notify_at = now_ts
+            else:
+                console_log("⚠️ Error notification throttled (cooldown active)", "debug")
+
+            # If too many consecutive errors, wait longer before retry
+            if consecutive_errors >= max_consecutive_errors:
+                console_log("🔄 Too many errors, entering recovery mode (5 min cooldown)", "warning")
+                console_log(f"   └─ Error threshold reached: {max_consecutive_errors} consecutive failures", "debug")
+                log_activity("⚠️ Entering recovery mode due to repeated errors", "warning")
+                next_delay = RECOVERY_COOLDOWN_SECONDS
+                consecutive_errors = 0  # Reset after cooldown
+        finally:
+            _schedule_next_check(next_delay)
+            if _manual_check_pending:
+                # A request arrived mid-check; its wakeup was superseded above
+                SCHEDULER.wake(JOB_CHECK)
+            for callback in callbacks:
+                try:
+                    callback(result)
+                except Exception as cb_err:
+                    console_log(f"⚠️ Check callback failed: {str(cb_err)[:50]}", "warning")
 
     log_activity("Background checker stopped", "warning")
     console_log("⏹️ Background checker stopped", "warning")
@@ -373,41 +637,51 @@ def start_background_checker():
     """Start the background checker thread."""
     if config.checker_thread is None or not config.checker_thread.is_alive():
         stop_checker.clear()
-        config.checker_thread = threading.Thread(target=background_checker, daemon=True)
+        config.checker_thread = threading.Thread(target=background_checker, daemon=True, name='checker')
         config.checker_thread.start()
 
 
 def watchdog_thread():
-    """Watchdog that monitors and restarts the background checker if it dies."""
+    """Watchdog that restarts the background checker the moment it dies.
+
+    Blocks on ``join()`` of the checker thread rather than polling, and backs
+    off between restarts so a checker that crashes on startup can't spin. The
+    back-off starts over once a checker has run for WATCHDOG_STABLE_SECONDS.
+    """
     console_log("🐕 Watchdog thread started - monitoring background checker", "debug")
-    console_log("   └─ Check interval: 60 seconds", "debug")
 
     restart_count = 0
 
     while True:
         try:
-            time.sleep(60)  # Check every minute
-
-            is_alive = config.checker_thread is not None and config.checker_thread.is_alive()
-
-            if not is_alive:
-                restart_count += 1
-                console_log(f"🔄 WATCHDOG: Background checker not running (restart #{restart_count})", "warning")
-                console_log(f"   └─ Thread state: {'None' if config.checker_thread is None else 'Dead'}", "debug")
-                log_activity(f"🔄 Watchdog restarting background checker (attempt #{restart_count})", "warning")
-
-                # Reset timer values on restart
-                CONFIG['next_check'] = (datetime.now(timezone.utc) + timedelta(minutes=CONFIG['check_interval_minutes'])).isoformat()
-                CONFIG['next_heartbeat'] = (datetime.now(timezone.utc) + timedelta(hours=CONFIG['heartbeat_hours'])).isoformat()
-                console_log(f"   └─ Timers reset: next check in {CONFIG['check_interval_minutes']} min", "debug")
-
-                start_background_checker()
-                console_log("✅ WATCHDOG: Background checker restarted successfully", "success")
+            thread = config.checker_thread
+            if thread is not None and thread.is_alive():
+                watched_since = time.monotonic()
+                thread.join()  # Sleeps until the checker exits
+                if time.monotonic() - watched_since >= WATCHDOG_STABLE_SECONDS:
+                    restart_count = 0  # Ran fine for a while: an isolated crash, not a crash loop
+                if config.checker_thread is not thread:
+                    continue  # Someone else already restarted it
+
+            restart_count += 1
+            console_log(f"🔄 WATCHDOG: Background checker not running (restart #{restart_count})", "warning")
+            console_log(f"   └─ Thread state: {'None' if config.checker_thread is None else 'Dead'}", "debug")
+            log_activity(f"🔄 Watchdog restarting background checker (attempt #{restart_count})", "warning")
+            time.sleep(min(60, 2 ** min(restart_count, 6)))
+
+            # Reset timer values on restart
+            CONFIG['next_check'] = (datetime.now(timezone.utc) + timedelta(minutes=CONFIG['check_interval_minutes'])).isoformat()
+            CONFIG['next_heartbeat'] = (datetime.now(timezone.utc) + timedelta(hours=CONFIG['heartbeat_hours'])).isoformat()
+            console_log(f"   └─ Timers reset: next check in {CONFIG['check_interval_minutes']} min", "debug")
+
+            start_background_checker()
+            console_log("✅ WATCHDOG: Background checker restarted successfully", "success")
         except Exception as e:
             console_log(f"⚠️ Watchdog error: {str(e)[:50]}", "error")
+            time.sleep(60)
 
 
 def start_watchdog():
     """Start the watchdog thread."""
-    watchdog = threading.Thread(target=watchdog_thread, daemon=True)
+    watchdog = threading.Thread(target=watchdog_thread, daemon=True, name='watchdog')
     watchdog.start()
@@ -0,0 +1,314 @@
+"""
+=============================================================================
+🌐 DUBAI FLEA MARKET TRACKER — Async Engine (optional)
+=============================================================================
+One asyncio event loop on a single daemon thread ('async-engine') that runs
+the outbound I/O — the WordPress API fetch, the Telegram new-event fan-out
+and SMTP sends — without one blocked thread per request.
+
+Enabled with ``ASYNC_ENGINE=true``. The Scheduler in events.py still
+decides WHEN things run; only the I/O is handed to this loop:
+
+  * ``check_for_events`` fetches via ``fetch_events_async``
+  * the outbox relay delivers Telegram rows via
+    ``send_telegram_new_events_async`` (each wave is sent concurrently,
+    bounded by ``ASYNC_FANOUT_CONCURRENCY``, same waves and pauses as
+    the threaded path)
+
+Threads (Flask handlers, the scheduler, the relay) bridge in with
+``ENGINE.submit(coro)`` → ``concurrent.futures.Future`` or the blocking
+``ENGINE.run(coro, timeout)``.
+
+HTTP uses aiohttp when it is installed. Without it, each request runs
+``requests`` on the loop's default thread pool: still concurrent, just not
+truly non-blocking. smtplib has no async client here, so SMTP sends run on
+the thread pool with a small concurrency cap. They reuse ``send_email``,
+which keeps the email retry queue and history semantics.
+
+Benchmark against the threaded path: ``python bench/telegram_fanout.py``.
+=============================================================================
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import threading
+import time
+
+import requests
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None  # Optional — fall back to requests on the loop's thread pool
+
+import config
+from config import ASYNC_FANOUT_CONCURRENCY, TELEGRAM_WAVE_PAUSE
+from utils import console_log, log_activity
+from notifications import (
+    telegram_event_alerts_ready, finish_new_event_fanout,
+    telegram_send_url, telegram_send_payload, telegram_response_error,
+    telegram_retry_after, TELEGRAM_429_RETRIES,
+    send_email,
+)
+from message_templates import render_new_events_telegram
+from subscribers import SUBSCRIBERS
+from metrics import FETCH_SECONDS, TELEGRAM_SEND_SECONDS
+
+HTTP_TIMEOUT = 10      # Telegram request timeout (matches send_telegram)
+FETCH_TIMEOUT = 15     # API fetch timeout (matches fetch_events)
+SMTP_CONCURRENCY = 4   # Parallel SMTP sessions
+
+_TIMEOUT_ERRORS = (asyncio.TimeoutError, requests.exceptions.Timeout)
+_CONNECTION_ERRORS = (requests.exceptions.ConnectionError,) + (
+    (aiohttp.ClientConnectionError,) if aiohttp else ())
+
+
+class AsyncEngine:
+    """Owns the event loop thread and the shared HTTP session."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._stats = {
+            'submitted': 0, 'completed': 0, 'failed': 0,
+            'last_task_ms': None, 'max_task_ms': 0,
+        }
+
+    # ----- Lifecycle -----
+
+    def start(self) -> None:
+        """Start the loop thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name='async-engine')
+            self._thread.start()
+        self._ready.wait(timeout=5)
+
+    def _run(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            loop.run_until_complete(self._close_session())
+            loop.close()
+
+    def stop(self) -> None:
+        loop, thread = self._loop, self._thread
+        if loop is not None and thread is not None and thread.is_alive():
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=5)
+
+    # ----- Thread → loop bridge -----
+
+    def submit(self, coro) -> concurrent.futures.Future:
+        """Schedule ``coro`` on the engine loop from any thread."""
+        self.start()
+        started = time.perf_counter()
+        self._stats['submitted'] += 1
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        future.add_done_callback(lambda f: self._finished(f, started))
+        return future
+
+    def run(self, coro, timeout: float | None = None):
+        """Run ``coro`` on the engine loop and block the calling thread for its result."""
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("ENGINE.run() called on the engine loop — await the coroutine instead")
+        return self.submit(coro).result(timeout)
+
+    def _finished(self, future: concurrent.futures.Future, started: float) -> None:
+        elapsed_ms = int((time.perf_counter() - started) * 1000)
+        if future.cancelled() or future.exception() is not None:
+            self._stats['failed'] += 1
+        else:
+            self._stats['completed'] += 1
+        self._stats['last_task_ms'] = elapsed_ms
+        self._stats['max_task_ms'] = max(self._stats['max_task_ms'], elapsed_ms)
+
+    # ----- Shared aiohttp session (loop thread only) -----
+
+    async def session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=ASYNC_FANOUT_CONCURRENCY),
+            )
+        return self._session
+
+    async def _close_session(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def snapshot(self) -> dict:
+        return {
+            **self._stats,
+            'enabled': config.ASYNC_ENGINE,
+            'running': self._thread is not None and self._thread.is_alive(),
+            'http_client': 'aiohttp' if aiohttp else 'requests (thread pool)',
+            'fanout_concurrency': ASYNC_FANOUT_CONCURRENCY,
+        }
+
+
+ENGINE = AsyncEngine()
+
+
+# ===== HTTP =====
+
+async def _post_json(url: str, payload: dict, timeout: float = HTTP_TIMEOUT) -> tuple:
+    """POST JSON. Returns ``(status_code, error_json, text)`` (body only parsed on error)."""
+    if aiohttp is not None:
+        session = await ENGINE.session()
+        async with session.post(url, json=payload, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+            status = resp.status
+            text = await resp.text() if status != 200 else ''
+    else:
+        resp = await asyncio.to_thread(requests.post, url, json=payload, timeout=timeout)
+        status = resp.status_code
+        text = resp.text if status != 200 else ''
+    data = {}
+    if text:
+        try:
+            data = json.loads(text)
+        except ValueError:
+            pass
+    return status, data, text
+
+
+# ===== API fetch =====
+
+async def fetch_events_async() -> list | None:
+    """Async counterpart of ``events.fetch_events`` (same diagnostics)."""
+    # Late import to break circular dependency (events → events_async → events)
+    from events import (
+        fetch_events, start_api_request, record_api_response, accept_api_data, record_api_failure,
+        conditional_headers, remember_api_response, accept_not_modified,
+    )
+    if aiohttp is None:
+        return await asyncio.to_thread(fetch_events)
+
+    start_time = start_api_request()
+    try:
+        session = await ENGINE.session()
+        async with session.get(config.API_URL, headers=conditional_headers(),
+                               timeout=aiohttp.ClientTimeout(total=FETCH_TIMEOUT)) as resp:
+            content = await resp.read()
+            record_api_response(resp.status, len(content), int((time.time() - start_time) * 1000))
+            if resp.status == 304:
+                return accept_not_modified()
+            resp.raise_for_status()
+            etag = resp.headers.get('ETag')
+        data = json.loads(content)
+        remember_api_response(etag, data)
+        return accept_api_data(data)
+
+    except asyncio.TimeoutError:
+        elapsed_ms = int((time.time() - start_time) * 1000)
+        FETCH_SECONDS.observe(elapsed_ms / 1000, outcome='timeout')
+        record_api_failure('Timeout after 15s', f"⏱️ API request timed out after {elapsed_ms}ms",
+                           "API request timed out")
+        return None
+
+    except aiohttp.ClientConnectionError as e:
+        FETCH_SECONDS.observe(time.time() - start_time, outcome='connection_error')
+        record_api_failure('Connection failed', f"🔌 Connection error: {str(e)[:50]}",
+                           f"Connection error: {str(e)[:30]}")
+        return None
+
+    except Exception as e:
+        record_api_failure(str(e)[:100], f"❌ API Error: {str(e)[:80]}",
+                           f"Failed to fetch events: {e}")
+        return None
+
+
+# ===== Telegram =====
+
+async def send_telegram_async(message: str, chat_id: str) -> tuple:
+    """Send one Telegram message. Returns ``(ok, error)`` like ``send_telegram``."""
+    cid = str(chat_id).strip()
+    send_start = time.perf_counter()
+    outcome = 'cancelled'
+    try:
+        for attempt in range(TELEGRAM_429_RETRIES + 1):
+            status, data, text = await _post_json(telegram_send_url(), telegram_send_payload(message, cid))
+            wait = telegram_retry_after(status, data)
+            if wait is None or attempt == TELEGRAM_429_RETRIES:
+                break
+            await asyncio.sleep(wait)
+        error = telegram_response_error(cid, status, data, text)
+        outcome = 'ok' if error is None else str(status)
+        return error is None, error
+    except _TIMEOUT_ERRORS:
+        outcome = 'timeout'
+        console_log(f"⏱️ Telegram timeout for {cid[:10]}...", "warning")
+        return False, f"Request timed out ({HTTP_TIMEOUT}s)"
+    except _CONNECTION_ERRORS as e:
+        outcome = 'connection_error'
+        console_log(f"🔌 Telegram connection error for {cid[:10]}...", "warning")
+        return False, f"Connection error: {str(e)[:40]}"
+    except Exception as e:
+        outcome = 'error'
+        console_log(f"⚠️ Telegram exception: {str(e)[:50]}", "warning")
+        return False, str(e)[:50]
+    finally:
+        TELEGRAM_SEND_SECONDS.observe(time.perf_counter() - send_start, outcome=outcome)
+
+
+async def fan_out_telegram(message: str, chat_ids: list, concurrency: int | None = None) -> list:
+    """Send ``message`` to every chat concurrently. Returns ``[(chat_id, ok, error), ...]``."""
+    semaphore = asyncio.Semaphore(max(1, concurrency or ASYNC_FANOUT_CONCURRENCY))
+
+    async def one(cid):
+        async with semaphore:
+            ok, err = await send_telegram_async(message, cid)
+            return cid, ok, err
+
+    return await asyncio.gather(*(one(cid) for cid in chat_ids))
+
+
+async def send_telegram_new_events_async(events: list) -> bool:
+    """Async counterpart of ``notifications.send_telegram_new_events``."""
+    if not telegram_event_alerts_ready():
+        return False
+
+    message = render_new_events_telegram(events)
+    console_log(f"📱 Sending Telegram notification for {len(events)} event(s) (async)", "info")
+
+    waves = await asyncio.to_thread(SUBSCRIBERS.waves)  # May reload from the DB
+    total = sum(len(wave) for wave in waves)
+    delivered = []
+    last_error = None
+    for n, wave in enumerate(waves):
+        if n:
+            await asyncio.sleep(TELEGRAM_WAVE_PAUSE)  # Stay under the Bot API broadcast limit
+        for cid, ok, err in await fan_out_telegram(message, [sub.chat_id for sub in wave]):
+            if ok:
+                delivered.append(cid)
+            else:
+                last_error = err
+
+    if delivered:
+        config.CONFIG['telegram_messages_sent'] = config.CONFIG.get('telegram_messages_sent', 0) + len(delivered)
+        await asyncio.to_thread(log_activity, f"📱 Telegram sent to {len(delivered)}/{total} chat(s)", "success")
+    return await asyncio.to_thread(finish_new_event_fanout, delivered, total, last_error)
+
+
+# ===== Email =====
+
+async def send_emails_async(subject: str, body: str, recipients: list, priority: str = 'normal') -> int:
+    """Send one email per recipient in parallel. Returns the number sent."""
+    semaphore = asyncio.Semaphore(SMTP_CONCURRENCY)
+
+    async def one(recipient):
+        async with semaphore:
+            return await asyncio.to_thread(send_email, subject, body, recipient, priority=priority)
+
+    results = await asyncio.gather(*(one(r) for r in recipients))
+    return sum(1 for ok in results if ok)
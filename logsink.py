@@ -0,0 +1,238 @@
+"""
+=============================================================================
+🌐 DUBAI FLEA MARKET TRACKER — NDJSON Log Sink
+=============================================================================
+Long-term log history on disk instead of in the database: console,
+activity and admin-audit entries are written to ``LOG_DIR/app.ndjson``,
+one JSON object per line.
+
+  * ``write()`` only appends a tuple to a deque; JSON encoding and the
+    file write happen in ``flush()``, which the log flusher thread in
+    utils.py calls every 0.2s — one large write per flush
+  * the active file rotates when it reaches ``LOG_MAX_BYTES`` or is
+    ``LOG_ROTATE_HOURS`` old; rotated segments are gzipped
+    (``app-<UTC stamp>-<seq>.ndjson.gz``; left plain if gzip fails) and
+    only the newest ``LOG_KEEP_SEGMENTS`` are kept
+  * ``read()`` streams records oldest-first across the rotated segments
+    and the active file, skipping segments that end before ``since``
+    (``/api/export-logs`` streams from it)
+
+Set ``LOG_DIR`` to an empty string to disable the sink.
+
+Depends only on config so utils can import it.
+=============================================================================
+"""
+
+import glob
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import config
+
+ACTIVE_NAME = 'app.ndjson'
+SEGMENT_PREFIX = 'app-'
+MAX_PENDING = 20000  # Records waiting for flush(); oldest dropped if the disk stalls
+FLUSH_CHUNK = 256    # Records encoded per write — bounds the memory a flush of a backlog needs
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+class LogSink:
+    """Buffered NDJSON writer with size/age rotation and gzipped segments."""
+
+    def __init__(self, directory: str, max_bytes: int, rotate_seconds: float, keep_segments: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.keep_segments = keep_segments
+        self._pending = deque(maxlen=MAX_PENDING)
+        self._lock = threading.Lock()  # File handle, rotation and stats
+        self._file = None
+        self._size = 0
+        self._opened_at = 0.0
+        self._stats = {'records': 0, 'bytes': 0, 'flushes': 0, 'rotations': 0, 'errors': 0, 'last_error': None}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    @property
+    def active_path(self) -> str:
+        return os.path.join(self.directory, ACTIVE_NAME)
+
+    # ----- Writing -----
+
+    def write(self, kind: str, level: str, message: str, ts: float | None = None) -> None:
+        """Queue one record (``kind``: console, activity or audit). Never blocks."""
+        if self.directory:
+            self._pending.append((ts or time.time(), kind, level, message))
+
+    def flush(self) -> None:
+        """Encode pending records and append them (``FLUSH_CHUNK`` per write); rotate if due."""
+        if not self.directory:
+            return
+        with self._lock:
+            try:
+                wrote = False
+                while self._pending:
+                    lines = []
+                    while self._pending and len(lines) < FLUSH_CHUNK:
+                        ts, kind, level, message = self._pending.popleft()
+                        lines.append(json.dumps({'timestamp': _iso(ts), 'kind': kind, 'level': level,
+                                                 'message': message}, ensure_ascii=False))
+                    data = ('\n'.join(lines) + '\n').encode('utf-8')
+                    self._open()
+                    self._file.write(data)
+                    self._size += len(data)
+                    self._stats['records'] += len(lines)
+                    self._stats['bytes'] += len(data)
+                    wrote = True
+                if wrote:
+                    self._file.flush()
+                    self._stats['flushes'] += 1
+                if self._file is not None and (
+                        self._size >= self.max_bytes or time.time() - self._opened_at >= self.rotate_seconds):
+                    self._rotate()
+            except OSError as e:
+                self._stats['errors'] += 1
+                self._stats['last_error'] = str(e)[:200]
+                self._close()
+
+    def _open(self) -> None:
+        if self._file is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.active_path
+        self._file = open(path, 'ab')
+        self._size = self._file.tell()
+        # A file left by a previous process keeps its age across restarts
+        self._opened_at = os.path.getmtime(path) if self._size else time.time()
+
+    def _close(self) -> None:
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    def _rotate(self) -> None:
+        self._close()
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        # Sequence suffix keeps same-second rotations in order. Numbering goes
+        # past the highest existing one: reusing a number freed by pruning
+        # would sort the new segment oldest and prune it straight away.
+        prefix = f"{SEGMENT_PREFIX}{stamp}-"
+        taken = [os.path.basename(p)[len(prefix):len(prefix) + 3] for p in self.segments()
+                 if os.path.basename(p).startswith(prefix)]
+        n = max((int(t) for t in taken if t.isdigit()), default=-1) + 1
+        segment = os.path.join(self.directory, f"{prefix}{n:03d}.ndjson")
+        os.replace(self.active_path, segment)
+        self._size = 0
+        self._stats['rotations'] += 1
+        try:
+            with open(segment, 'rb') as src, gzip.open(segment + '.gz', 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+        except OSError as e:
+            # Keep the plain segment (segments() lists it too) and drop the partial .gz
+            self._stats['errors'] += 1
+            self._stats['last_error'] = f"gzip {os.path.basename(segment)}: {e}"[:200]
+            try:
+                os.remove(segment + '.gz')
+            except OSError:
+                pass
+        else:
+            os.remove(segment)
+        for old in self.segments()[:-self.keep_segments or None]:
+            os.remove(old)
+
+    # ----- Reading -----
+
+    def segments(self) -> list:
+        """Rotated segments, oldest first (names sort by rotation time).
+
+        Normally gzipped; a segment whose compression failed stays plain.
+        """
+        if not self.directory:
+            return []
+        pattern = os.path.join(self.directory, f"{SEGMENT_PREFIX}*.ndjson")
+        return sorted(glob.glob(pattern) + glob.glob(pattern + '.gz'))
+
+    def read(self, since: str | None = None, until: str | None = None,
+             kinds: set | None = None, levels: set | None = None):
+        """
+        Yield record dicts oldest-first. ``since`` / ``until`` are inclusive
+        ISO UTC prefixes compared as strings (``until='2026-10-19'`` keeps
+        the whole day).
+        """
+        if not self.directory:
+            return
+        self.flush()
+        paths = []
+        for path in self.segments():
+            # Segment names carry their rotation time: nothing inside is newer
+            stamp = os.path.basename(path)[len(SEGMENT_PREFIX):len(SEGMENT_PREFIX) + 16]
+            ended = f"{stamp[0:4]}-{stamp[4:6]}-{stamp[6:8]}T{stamp[9:11]}:{stamp[11:13]}:{stamp[13:15]}"
+            if since and ended < since[:19]:
+                continue
+            paths.append(path)
+        if os.path.exists(self.active_path):
+            paths.append(self.active_path)
+
+        for path in paths:
+            opener = gzip.open if path.endswith('.gz') else open
+            try:
+                with opener(path, 'rt', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue  # Partial line from a concurrent write
+                        ts = record.get('timestamp', '')
+                        if since and ts < since:
+                            continue
+                        if until and ts[:len(until)] > until:
+                            continue
+                        if kinds and record.get('kind') not in kinds:
+                            continue
+                        if levels and record.get('level') not in levels:
+                            continue
+                        yield record
+            except OSError:
+                continue  # Segment pruned by a rotation mid-read
+
+    # ----- Introspection -----
+
+    def snapshot(self) -> dict:
+        segments = self.segments()
+        with self._lock:
+            stats = dict(self._stats)
+            active_bytes = self._size
+        return {
+            'enabled': self.enabled,
+            'directory': self.directory,
+            'pending': len(self._pending),
+            'active_bytes': active_bytes,
+            'segments': len(segments),
+            'segment_bytes': sum(os.path.getsize(p) for p in segments if os.path.exists(p)),
+            'max_bytes': self.max_bytes,
+            'rotate_hours': round(self.rotate_seconds / 3600, 2),
+            'keep_segments': self.keep_segments,
+            **stats,
+        }
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self._close()
+
+
+LOG_SINK = LogSink(config.LOG_DIR, config.LOG_MAX_BYTES, config.LOG_ROTATE_HOURS * 3600, config.LOG_KEEP_SEGMENTS)
@@ -0,0 +1,371 @@
+"""
+=============================================================================
+🌐 DUBAI FLEA MARKET TRACKER — Notification Templates
+=============================================================================
+Every Telegram / email message body lives here as a module-level template,
+with the HTML-stripping regex compiled once at import.
+
+New-event messages are the hot path: one batch is rendered for the
+Telegram fan-out and again for every email recipient. Each event's
+fragment is cached (LRU) and the assembled message for a batch is cached
+for ``RENDER_CACHE_TTL`` seconds, so a batch renders once and the string is
+reused across subscribers and channels. The "Detected" timestamp is
+formatted once per minute.
+
+Render times go into a small histogram (``get_render_stats``) shown on
+the diagnostics page.
+
+Depends only on config and utils.
+=============================================================================
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from config import CONFIG
+from utils import format_multi_timezone
+
+TAG_RE = re.compile(r'<[^>]+>')
+
+RENDER_CACHE_SIZE = 256     # Cached event fragments / batch messages
+RENDER_CACHE_TTL = 60       # Seconds a rendered batch message is reused
+RENDER_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100)
+
+HEAVY_RULE = "━" * 22
+LIGHT_SEPARATOR = "\n   " + " ".join(["─"] * 9) + "\n"
+EMAIL_RULE = "=" * 60
+
+# ===== Templates =====
+
+TELEGRAM_NEW_EVENTS_HEADER = (
+    "\U0001f6a8 <b>NEW EVENT{plural_upper} DETECTED!</b>\n"
+    "\U0001f3af <b>{count} new Dubai Flea Market listing{plural} just went live!</b>\n"
+    + HEAVY_RULE + "\n"
+)
+TELEGRAM_EVENT_TITLE = "\n\U0001f4cd <b>Event {index}: {title}</b>\n"
+TELEGRAM_EVENT_POSTED = "   \U0001f4c5 Posted: {date_posted}\n"
+TELEGRAM_EVENT_CATEGORY = "   \U0001f3f7 Category: {categories}\n"
+TELEGRAM_EVENT_DESCRIPTION = "   \U0001f4dd {description}{ellipsis}\n"
+TELEGRAM_EVENT_LINK = "   \U0001f517 <a href=\"{link}\">Open Event Page</a>\n"
+TELEGRAM_NEW_EVENTS_FOOTER = (
+    "\n" + HEAVY_RULE + "\n"
+    "⏰ Detected: {detected}\n"
+    "\U0001f50d Next check: in ~{interval} min\n"
+    "\U0001f4f1 Tap a link above to view full details!\n\n"
+    "\U0001f916 <i>Dubai Flea Market Tracker</i>"
+)
+
+EMAIL_NEW_EVENTS_SUBJECT = "🎉 {count} New Dubai Flea Market Event(s)!"
+EMAIL_NEW_EVENTS_HEADER = "🎯 {count} new event(s) have been posted!\n\n"
+EMAIL_EVENT = "📍 {title}\n🔗 {link}\n📅 Posted: {date_posted}\n" + "-" * 50 + "\n\n"
+EMAIL_NEW_EVENTS_FOOTER = "\n🤖 Sent automatically by Dubai Flea Market Tracker\n⏰ {detected}"
+
+TELEGRAM_HEARTBEAT = """💓 <b>HEARTBEAT - Bot Status</b>
+━━━━━━━━━━━━━━━━━━━━━━
+
+✅ <b>Status:</b> RUNNING & HEALTHY
+
+📊 <b>Statistics:</b>
+   • Check #{total_checks}
+   • Events tracked: {seen_count}
+   • New events found: {total_new_events}
+   • Notifications sent: {emails_sent}
+
+⏰ <b>Timing:</b>
+   • Current: {now}
+   • Check interval: Every {check_interval_minutes} min
+   • Uptime: {uptime_hours}h {uptime_mins}m
+
+━━━━━━━━━━━━━━━━━━━━━━
+🟢 <i>All systems operational</i>
+🤖 <i>Dubai Flea Market Tracker</i>
+👤 <i>Admin-only message</i>"""
+
+TELEGRAM_DAILY_SUMMARY = """📊 <b>DAILY SUMMARY REPORT</b>
+━━━━━━━━━━━━━━━━━━━━━━
+📅 {date}
+⏰ {now}
+
+📈 <b>Today's Statistics:</b>
+   • Events on website: {event_count}
+   • Total events tracked: {seen_count}
+   • Checks performed: {total_checks}
+   • New events detected: {total_new_events}
+   • Notifications sent: {emails_sent}
+
+⏱️ <b>Bot Performance:</b>
+   • Status: ✅ Running normally
+   • Uptime: {uptime_days}d {uptime_hours}h
+   • Check interval: Every {check_interval_minutes} min
+   • Heartbeat: Every {heartbeat_hours}h
+
+━━━━━━━━━━━━━━━━━━━━━━
+🔗 <a href="https://dubai-fleamarket.com">View All Events →</a>
+
+🤖 <i>Dubai Flea Market Tracker</i>
+👤 <i>Admin-only daily summary</i>"""
+
+EMAIL_DAILY_SUMMARY_SUBJECT = "📊 Dubai Flea Market Daily Summary - {date}"
+EMAIL_DAILY_SUMMARY = """
+{rule}
+📊 DAILY SUMMARY - {date}
+⏰ {now}
+{rule}
+
+📈 STATISTICS:
+   • Total events on website: {event_count}
+   • Events already tracked: {seen_count}
+   • Total checks performed: {total_checks}
+   • New events found today: {total_new_events}
+   • Emails sent: {emails_sent}
+
+💡 The tracker is running normally!
+   You'll receive an instant notification when new events are posted.
+
+🔗 Check manually: https://dubai-fleamarket.com
+
+{rule}
+🤖 Sent by Dubai Flea Market Tracker
+⏰ {now}
+{rule}
+"""
+
+
+# ===== Render stats =====
+
+class RenderHistogram:
+    """Per-template render-time histogram (non-cumulative bucket counts, in ms)."""
+
+    def __init__(self, buckets: tuple):
+        self._buckets = buckets
+        self._lock = threading.Lock()
+        self._data = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def observe(self, name: str, ms: float) -> None:
+        with self._lock:
+            entry = self._data.get(name)
+            if entry is None:
+                entry = self._data[name] = {'count': 0, 'sum_ms': 0.0, 'max_ms': 0.0,
+                                            'buckets': [0] * (len(self._buckets) + 1)}
+            entry['count'] += 1
+            entry['sum_ms'] += ms
+            entry['max_ms'] = max(entry['max_ms'], ms)
+            for i, bound in enumerate(self._buckets):
+                if ms <= bound:
+                    entry['buckets'][i] += 1
+                    break
+            else:
+                entry['buckets'][-1] += 1
+
+    def snapshot(self) -> dict:
+        labels = [f"<={b}ms" for b in self._buckets] + [f">{self._buckets[-1]}ms"]
+        with self._lock:
+            templates = {
+                name: {
+                    'count': e['count'],
+                    'avg_ms': round(e['sum_ms'] / e['count'], 3) if e['count'] else 0,
+                    'max_ms': round(e['max_ms'], 3),
+                    'buckets': dict(zip(labels, e['buckets'])),
+                }
+                for name, e in self._data.items()
+            }
+        return {'cache_hits': self.cache_hits, 'cache_misses': self.cache_misses, 'templates': templates}
+
+
+RENDER_STATS = RenderHistogram(RENDER_BUCKETS_MS)
+
+_cache_lock = threading.Lock()
+_fragments = OrderedDict()  # (kind, event key) -> rendered fragment
+_messages = OrderedDict()   # (kind, batch key) -> (rendered_at, rendered)
+
+
+def _cache_get(cache: OrderedDict, key):
+    with _cache_lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+
+def _cache_put(cache: OrderedDict, key, value) -> None:
+    with _cache_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > RENDER_CACHE_SIZE:
+            cache.popitem(last=False)
+
+
+def clear_render_cache() -> None:
+    with _cache_lock:
+        _fragments.clear()
+        _messages.clear()
+
+
+# ===== Helpers =====
+
+def strip_tags(text, maxlen: int = 120) -> str:
+    """Strip HTML tags and truncate."""
+    if not text:
+        return ''
+    return TAG_RE.sub('', str(text)).strip()[:maxlen]
+
+
+@lru_cache(maxsize=64)
+def _multi_timezone_for_minute(minute: int) -> str:
+    return format_multi_timezone(datetime.fromtimestamp(minute * 60, tz=timezone.utc))
+
+
+def multi_timezone(now: datetime | None = None) -> str:
+    """``format_multi_timezone`` memoised per minute (it only shows hh:mm)."""
+    now = now or datetime.now(timezone.utc)
+    if now.tzinfo is None:
+        now = now.replace(tzinfo=timezone.utc)
+    return _multi_timezone_for_minute(int(now.timestamp() // 60))
+
+
+def _event_key(event: dict) -> tuple:
+    categories = event.get('categories') or event.get('tags') or ()
+    if isinstance(categories, list):
+        categories = tuple(str(c) for c in categories[:3])
+    return (event.get('id'), event.get('link'), event.get('title'), event.get('date_posted'),
+            event.get('description'), event.get('excerpt'), categories)
+
+
+def _telegram_event(event: dict, key: tuple) -> tuple:
+    """(title, detail lines) for one event — cached, the index is added later."""
+    cached = _cache_get(_fragments, ('telegram', key))
+    if cached is not None:
+        return cached
+    title = strip_tags(event.get('title', 'Untitled'), 80)
+    date_posted = strip_tags(event.get('date_posted', ''), 40)
+    desc = strip_tags(event.get('description') or event.get('excerpt') or '', 150)
+    categories = event.get('categories') or event.get('tags') or []
+    if isinstance(categories, list):
+        categories = ', '.join(str(c) for c in categories[:3])
+
+    parts = []
+    if date_posted:
+        parts.append(TELEGRAM_EVENT_POSTED.format(date_posted=date_posted))
+    if categories:
+        parts.append(TELEGRAM_EVENT_CATEGORY.format(categories=categories))
+    if desc:
+        overflow = len(TAG_RE.sub('', str(event.get('description') or '')).strip()) > 150
+        parts.append(TELEGRAM_EVENT_DESCRIPTION.format(description=desc, ellipsis='...' if overflow else ''))
+    parts.append(TELEGRAM_EVENT_LINK.format(link=event.get('link', '')))
+    fragment = (title, ''.join(parts))
+    _cache_put(_fragments, ('telegram', key), fragment)
+    return fragment
+
+
+def _cached_batch(kind: str, events: list, extra: tuple, render):
+    """Return the cached rendering of ``events`` or render, time and cache it."""
+    key = (kind, tuple(_event_key(e) for e in events)) + extra
+    cached = _cache_get(_messages, key)
+    if cached is not None and time.monotonic() - cached[0] < RENDER_CACHE_TTL:
+        RENDER_STATS.cache_hits += 1
+        return cached[1]
+    RENDER_STATS.cache_misses += 1
+    start = time.perf_counter()
+    rendered = render(key[1])
+    RENDER_STATS.observe(kind, (time.perf_counter() - start) * 1000)
+    _cache_put(_messages, key, (time.monotonic(), rendered))
+    return rendered
+
+
+def _timed(name: str, template: str, **fields) -> str:
+    start = time.perf_counter()
+    rendered = template.format(**fields)
+    RENDER_STATS.observe(name, (time.perf_counter() - start) * 1000)
+    return rendered
+
+
+# ===== New-event messages (cached per batch) =====
+
+def render_new_events_telegram(events: list, now: datetime | None = None) -> str:
+    """Telegram HTML for a batch of new events."""
+    interval = CONFIG.get('check_interval_minutes', 15)
+
+    def render(keys):
+        count = len(events)
+        parts = [TELEGRAM_NEW_EVENTS_HEADER.format(
+            count=count, plural='s' if count > 1 else '', plural_upper='S' if count > 1 else '')]
+        for i, (event, key) in enumerate(zip(events, keys), 1):
+            title, details = _telegram_event(event, key)
+            parts.append(TELEGRAM_EVENT_TITLE.format(index=i, title=title))
+            parts.append(details)
+            if i < count:
+                parts.append(LIGHT_SEPARATOR)
+        parts.append(TELEGRAM_NEW_EVENTS_FOOTER.format(detected=multi_timezone(now), interval=interval))
+        return ''.join(parts)
+
+    return _cached_batch('telegram_new_events', events, (interval,), render)
+
+
+def render_new_events_email(events: list, now: datetime | None = None) -> tuple:
+    """(subject, body) of the plain-text new-event email."""
+
+    def render(keys):
+        parts = [EMAIL_NEW_EVENTS_HEADER.format(count=len(events))]
+        for event, key in zip(events, keys):
+            fragment = _cache_get(_fragments, ('email', key))
+            if fragment is None:
+                fragment = EMAIL_EVENT.format(title=event['title'], link=event['link'],
+                                              date_posted=event['date_posted'])
+                _cache_put(_fragments, ('email', key), fragment)
+            parts.append(fragment)
+        parts.append(EMAIL_NEW_EVENTS_FOOTER.format(detected=multi_timezone(now)))
+        return EMAIL_NEW_EVENTS_SUBJECT.format(count=len(events)), ''.join(parts)
+
+    return _cached_batch('email_new_events', events, (), render)
+
+
+# ===== Status messages (live stats — rendered, not cached) =====
+
+def render_heartbeat_telegram(now: datetime, seen_count: int, uptime_hours: int, uptime_mins: int) -> str:
+    return _timed(
+        'telegram_heartbeat', TELEGRAM_HEARTBEAT,
+        total_checks=CONFIG['total_checks'], seen_count=seen_count,
+        total_new_events=CONFIG['total_new_events'], emails_sent=CONFIG['emails_sent'],
+        now=multi_timezone(now), check_interval_minutes=CONFIG['check_interval_minutes'],
+        uptime_hours=uptime_hours, uptime_mins=uptime_mins,
+    )
+
+
+def render_daily_summary_telegram(now: datetime, event_count: int, seen_count: int,
+                                  uptime_days: int, uptime_hours: int) -> str:
+    return _timed(
+        'telegram_daily_summary', TELEGRAM_DAILY_SUMMARY,
+        date=now.strftime('%A, %B %d, %Y'), now=multi_timezone(now),
+        event_count=event_count, seen_count=seen_count,
+        total_checks=CONFIG['total_checks'], total_new_events=CONFIG['total_new_events'],
+        emails_sent=CONFIG['emails_sent'], uptime_days=uptime_days, uptime_hours=uptime_hours,
+        check_interval_minutes=CONFIG['check_interval_minutes'], heartbeat_hours=CONFIG['heartbeat_hours'],
+    )
+
+
+def render_daily_summary_email(now: datetime, event_count: int, seen_count: int) -> tuple:
+    """(subject, body) of the daily summary email."""
+    subject = EMAIL_DAILY_SUMMARY_SUBJECT.format(date=now.strftime('%B %d, %Y'))
+    body = _timed(
+        'email_daily_summary', EMAIL_DAILY_SUMMARY,
+        rule=EMAIL_RULE, date=now.strftime('%A, %B %d, %Y'), now=multi_timezone(now),
+        event_count=event_count, seen_count=seen_count,
+        total_checks=CONFIG['total_checks'], total_new_events=CONFIG['total_new_events'],
+        emails_sent=CONFIG['emails_sent'],
+    )
+    return subject, body
+
+
+def get_render_stats() -> dict:
+    """Render-time histogram and cache counters for diagnostics."""
+    stats = RENDER_STATS.snapshot()
+    with _cache_lock:
+        stats['cached_fragments'] = len(_fragments)
+        stats['cached_messages'] = len(_messages)
+    return stats
@@ -0,0 +1,378 @@
+"""
+=============================================================================
+🌐 DUBAI FLEA MARKET TRACKER — Metrics Registry
+=============================================================================
+Counters, gauges and latency histograms, exposed in the Prometheus text
+format at ``/metrics`` (admin session or ``METRICS_TOKEN`` bearer token).
+
+Recording is cheap enough for hot paths: one lock, one bisect and two
+additions per observation. Histogram buckets are fixed at definition, so
+memory does not grow with traffic, only with distinct label values (keep
+those bounded: function names, outcomes, queue names — never chat IDs).
+
+Gauges that mirror existing state (queue depths, subscriber count) use
+``set_function`` and are read only when /metrics is scraped.
+
+``begin_db_scope`` / ``end_db_scope`` additionally total the DB calls made
+on the current thread (the request profiler uses them per request).
+
+``InstrumentedLock`` stands in for ``threading.Lock`` / ``RLock`` on shared
+serialization points: wait and hold times go to histograms per lock, and
+acquisitions, wait and max hold are kept per call site (``lock_stats()``).
+
+This module has no app imports, so any module (including db.py) can
+record into it.
+=============================================================================
+"""
+
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Seconds — from sub-millisecond DB calls up to slow SMTP handshakes
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Seconds — lock waits are usually microseconds
+LOCK_WAIT_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01,
+                     0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, '')) for n in self.labelnames)
+
+    def _labels(self, key: tuple, extra: str = '') -> str:
+        pairs = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def _samples(self) -> list:
+        """Return ``[(suffix, label_text, value), ...]`` for rendering."""
+        with self._lock:
+            return [('', self._labels(key), value) for key, value in sorted(self._values.items())]
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines += [f'{self.name}{suffix}{labels} {_format_value(value)}'
+                  for suffix, labels, value in self._samples()]
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down; optionally computed at scrape time."""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self._functions = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn, **labels) -> None:
+        """Read the value from ``fn()`` whenever metrics are rendered."""
+        with self._lock:
+            self._functions[self._key(labels)] = fn
+
+    def _samples(self) -> list:
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, fn in functions.items():
+            try:
+                values[key] = float(fn())
+            except Exception:
+                values.pop(key, None)  # Source unavailable (e.g. DB down) — omit
+        return [('', self._labels(key), value) for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    """Bucketed distribution (cumulative buckets, sum and count on render)."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (),
+                 buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the ``with`` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def summary(self, **labels) -> dict:
+        """``{'count', 'sum'}`` for one label set (diagnostics, tests)."""
+        with self._lock:
+            series = self._values.get(self._key(labels))
+            return {'count': series[2], 'sum': series[1]} if series else {'count': 0, 'sum': 0.0}
+
+    def _samples(self) -> list:
+        with self._lock:
+            snapshot = [(key, list(s[0]), s[1], s[2]) for key, s in sorted(self._values.items())]
+        samples = []
+        for key, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                samples.append(('_bucket', self._labels(key, f'le="{_format_value(bound)}"'), cumulative))
+            samples.append(('_sum', self._labels(key), total))
+            samples.append(('_count', self._labels(key), count))
+        return samples
+
+
+class Registry:
+    """Named metrics, rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: tuple, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (),
+                  buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(m.render() for m in metrics) + '\n'
+
+
+REGISTRY = Registry()
+
+# ===== Hot-path metrics =====
+
+FETCH_SECONDS = REGISTRY.histogram(
+    'dfm_api_fetch_seconds', 'WordPress API fetch latency by outcome (HTTP status, timeout, error)', ('outcome',))
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    'dfm_db_query_seconds', 'Database call latency by db.py function', ('function',))
+DB_ERRORS = REGISTRY.counter(
+    'dfm_db_errors_total', 'Database calls that raised, by db.py function', ('function',))
+DB_SLOW_QUERIES = REGISTRY.counter(
+    'dfm_db_slow_queries_total', 'SQL statements slower than SLOW_QUERY_MS')
+TELEGRAM_SEND_SECONDS = REGISTRY.histogram(
+    'dfm_telegram_send_seconds', 'Telegram sendMessage latency per chat by outcome', ('outcome',))
+SMTP_SEND_SECONDS = REGISTRY.histogram(
+    'dfm_smtp_send_seconds', 'SMTP send latency per attempt by outcome', ('outcome',))
+CHECK_CYCLE_SECONDS = REGISTRY.histogram(
+    'dfm_check_cycle_seconds', 'Event check cycle duration by outcome', ('outcome',))
+NEW_EVENTS = REGISTRY.counter(
+    'dfm_new_events_total', 'New events detected')
+QUEUE_DEPTH = REGISTRY.gauge(
+    'dfm_queue_depth', 'Items waiting in each background queue', ('queue',))
+LOCK_WAIT_SECONDS = REGISTRY.histogram(
+    'dfm_lock_wait_seconds', 'Time spent waiting to acquire shared locks', ('lock',), buckets=LOCK_WAIT_BUCKETS)
+LOCK_HOLD_SECONDS = REGISTRY.histogram(
+    'dfm_lock_hold_seconds', 'Time shared locks are held per acquisition', ('lock',), buckets=LOCK_WAIT_BUCKETS)
+
+# ===== Instrumented locks =====
+
+LOCKS = {}  # name -> InstrumentedLock
+
+
+class InstrumentedLock:
+    """
+    ``threading.Lock`` (or ``RLock`` with ``reentrant=True``) that records
+    wait and hold times. Per call site it keeps acquisitions, total / max
+    wait and total / max hold; re-entering an RLock the thread already
+    owns is not counted. The per-site table is only written while the
+    lock is held, so it needs no lock of its own.
+    """
+
+    def __init__(self, name: str, reentrant: bool = False):
+        self.name = name
+        self._lock = threading.RLock() if reentrant else threading.Lock()
+        self._reentrant = reentrant
+        self._owner = None
+        self._depth = 0
+        self._site = None
+        self._held_since = 0.0
+        self._sites = {}  # (code, lineno) -> [acquisitions, wait_s, max_wait_s, hold_s, max_hold_s]
+        LOCKS[name] = self
+
+    def _acquire(self, site, blocking: bool = True, timeout: float = -1) -> bool:
+        if self._reentrant and self._owner == threading.get_ident():
+            self._lock.acquire()
+            self._depth += 1
+            return True
+        start = time.perf_counter()
+        if not self._lock.acquire(blocking, timeout):
+            return False
+        acquired = time.perf_counter()
+        waited = acquired - start
+        self._owner = threading.get_ident()
+        self._depth = 1
+        self._site = site
+        self._held_since = acquired
+        stats = self._sites.get(site)
+        if stats is None:
+            stats = self._sites[site] = [0, 0.0, 0.0, 0.0, 0.0]
+        stats[0] += 1
+        stats[1] += waited
+        if waited > stats[2]:
+            stats[2] = waited
+        LOCK_WAIT_SECONDS.observe(waited, lock=self.name)
+        return True
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        frame = sys._getframe(1)
+        return self._acquire((frame.f_code, frame.f_lineno), blocking, timeout)
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            held = time.perf_counter() - self._held_since
+            stats = self._sites[self._site]
+            stats[3] += held
+            if held > stats[4]:
+                stats[4] = held
+            self._owner = None
+            LOCK_HOLD_SECONDS.observe(held, lock=self.name)
+        self._lock.release()
+
+    def __enter__(self):
+        frame = sys._getframe(1)
+        self._acquire((frame.f_code, frame.f_lineno))
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+    def snapshot(self) -> dict:
+        """Per-site totals, most total wait first (times in ms)."""
+        with self._lock:
+            sites = [(code, line, list(s)) for (code, line), s in self._sites.items()]
+        rows = [{
+            'site': f"{os.path.basename(code.co_filename)}:{code.co_name}:{line}",
+            'acquisitions': n,
+            'wait_total_ms': round(wait * 1000, 3),
+            'wait_avg_ms': round(wait * 1000 / n, 4) if n else 0.0,
+            'wait_max_ms': round(max_wait * 1000, 3),
+            'hold_total_ms': round(hold * 1000, 3),
+            'hold_max_ms': round(max_hold * 1000, 3),
+        } for code, line, (n, wait, max_wait, hold, max_hold) in sites]
+        rows.sort(key=lambda r: r['wait_total_ms'], reverse=True)
+        return {
+            'acquisitions': sum(r['acquisitions'] for r in rows),
+            'wait_total_ms': round(sum(r['wait_total_ms'] for r in rows), 3),
+            'hold_total_ms': round(sum(r['hold_total_ms'] for r in rows), 3),
+            'sites': rows,
+        }
+
+
+def lock_stats() -> dict:
+    """``{lock name: snapshot}`` for every InstrumentedLock (diagnostics)."""
+    return {name: lock.snapshot() for name, lock in list(LOCKS.items())}
+
+
+# ===== Per-thread DB accounting (request profiler) =====
+
+_db_scope = threading.local()
+
+
+def begin_db_scope() -> None:
+    """Start counting DB calls made on this thread."""
+    _db_scope.calls = 0
+    _db_scope.seconds = 0.0
+    _db_scope.active = True
+
+
+def end_db_scope() -> tuple:
+    """Stop counting. Returns ``(calls, seconds)`` since ``begin_db_scope``."""
+    if not getattr(_db_scope, 'active', False):
+        return 0, 0.0
+    _db_scope.active = False
+    return _db_scope.calls, _db_scope.seconds
+
+
+def record_db_call(seconds: float) -> None:
+    """Add one outermost DB call to this thread's scope, if one is open."""
+    if getattr(_db_scope, 'active', False):
+        _db_scope.calls += 1
+        _db_scope.seconds += seconds
+
+
+_STARTED = time.time()
+REGISTRY.gauge('dfm_uptime_seconds', 'Seconds since the process started').set_function(
+    lambda: time.time() - _STARTED)
+REGISTRY.gauge('dfm_threads', 'Live Python threads').set_function(threading.active_count)
@@ -7,12 +7,9 @@ notification orchestration lives here.
 =============================================================================
 """
 
-import smtplib
 import socket
 import time
 from datetime import datetime, timezone, timedelta
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 
 import requests
 
@@ -21,14 +18,14 @@ from config import (
     CONFIG,
     TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_IDS, TELEGRAM_ADMIN_CHAT_ID,
     MY_EMAIL, MY_PASSWORD, TO_EMAIL,
-    EMAIL_RETRY_INTERVALS, MAX_EMAIL_AGE_HOURS,
+    MAX_EMAIL_AGE_HOURS, TELEGRAM_WAVE_PAUSE,
 )
 from utils import (
     console_log, log_activity,
     sanitize_string, validate_email, mask_email,
     set_last_smtp_error, get_smtp_connection,
     parse_iso_timestamp, format_timestamp,
-    format_multi_timezone, format_multi_timezone_date,
+    format_multi_timezone_date,
 )
 from state import (
     load_seen_events, load_status, save_status, record_stat,
@@ -37,11 +34,13 @@ from state import (
     get_recipients, get_all_recipients,
     save_email_queue,
 )
-from db import (
-    db_get_active_subscriber_ids,
-    db_add_to_queue, db_get_queue, db_update_queue_item,
-    db_remove_from_queue, db_get_queue_count,
+from subscribers import SUBSCRIBERS
+from message_templates import (
+    render_new_events_telegram, render_new_events_email,
+    render_heartbeat_telegram, render_daily_summary_telegram, render_daily_summary_email,
 )
+from retry_queue import EMAIL_RETRY_QUEUE, retry_delay_minutes
+from metrics import TELEGRAM_SEND_SECONDS, SMTP_SEND_SECONDS
 
 
 # ===== Telegram Helpers =====
@@ -71,6 +70,52 @@ def get_admin_chat_id():
 
 # ===== Send Telegram =====
 
+TELEGRAM_429_RETRIES = 2       # Retries of a rate-limited sendMessage (honouring retry_after)
+TELEGRAM_RETRY_AFTER_MAX = 30  # Longer waits are treated as a failure instead
+
+def telegram_send_url() -> str:
+    return f"{config.TELEGRAM_API_BASE}/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+
+
+def telegram_send_payload(message: str, chat_id: str) -> dict:
+    return {
+        'chat_id': chat_id,
+        'text': message,
+        'parse_mode': 'HTML',
+        'disable_web_page_preview': False
+    }
+
+
+def telegram_retry_after(status_code: int, resp_data: dict) -> float | None:
+    """Seconds to wait before retrying a 429, or None if the response should not be retried."""
+    if status_code != 429:
+        return None
+    try:
+        wait = float(((resp_data or {}).get('parameters') or {}).get('retry_after', 1))
+    except (TypeError, ValueError):
+        wait = 1.0
+    return wait if wait <= TELEGRAM_RETRY_AFTER_MAX else None
+
+
+def telegram_response_error(cid: str, status_code: int, resp_data: dict, text: str = '') -> str | None:
+    """Log a sendMessage response. Returns None on success, else the error string."""
+    if status_code == 200:
+        console_log(f"✅ Telegram sent to chat {cid[:10]}...", "success")
+        return None
+    error_desc = (resp_data or {}).get('description', (text or '')[:80])
+    error = f"HTTP {status_code}: {error_desc}"
+    console_log(f"⚠️ Telegram error for {cid[:10]}: {error}", "warning")
+
+    # Log specific common errors for debugging
+    if status_code == 400:
+        console_log("   └─ Possible cause: invalid chat_id or bad HTML formatting", "debug")
+    elif status_code == 403:
+        console_log("   └─ Bot was blocked by user or chat not found", "debug")
+    elif status_code == 401:
+        console_log("   └─ Invalid bot token", "debug")
+    return error
+
+
 def send_telegram(message: str, chat_id: str | None = None) -> tuple:
     """Send message via Telegram Bot to specified chat_id(s).
 
@@ -90,53 +135,52 @@ def send_telegram(message: str, chat_id: str | None = None) -> tuple:
         console_log("⚠️ No Telegram chat IDs configured", "debug")
         return False, "No chat IDs configured"
 
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+    url = telegram_send_url()
     success_count = 0
     last_error = None
     failed_ids = []
 
     for cid in chat_ids:
+        send_start = time.perf_counter()
         try:
-            response = requests.post(url, json={
-                'chat_id': cid,
-                'text': message,
-                'parse_mode': 'HTML',
-                'disable_web_page_preview': False
-            }, timeout=10)
-
-            if response.status_code == 200:
+            for attempt in range(TELEGRAM_429_RETRIES + 1):
+                response = requests.post(url, json=telegram_send_payload(message, cid), timeout=10)
+
+                resp_data, text = {}, ''
+                if response.status_code != 200:
+                    text = response.text
+                    try:
+                        resp_data = response.json()
+                    except Exception:
+                        pass
+                wait = telegram_retry_after(response.status_code, resp_data)
+                if wait is None or attempt == TELEGRAM_429_RETRIES:
+                    break
+                console_log(f"⏳ Telegram rate limited — retrying {cid[:10]} in {wait}s", "debug")
+                time.sleep(wait)
+            error = telegram_response_error(cid, response.status_code, resp_data, text)
+            if error is None:
                 success_count += 1
-                console_log(f"✅ Telegram sent to chat {cid[:10]}...", "success")
             else:
-                resp_data = {}
-                try:
-                    resp_data = response.json()
-                except Exception:
-                    pass
-                error_desc = resp_data.get('description', response.text[:80])
-                last_error = f"HTTP {response.status_code}: {error_desc}"
+                last_error = error
                 failed_ids.append(cid)
-                console_log(f"⚠️ Telegram error for {cid[:10]}: {last_error}", "warning")
-
-                # Log specific common errors for debugging
-                if response.status_code == 400:
-                    console_log("   └─ Possible cause: invalid chat_id or bad HTML formatting", "debug")
-                elif response.status_code == 403:
-                    console_log("   └─ Bot was blocked by user or chat not found", "debug")
-                elif response.status_code == 401:
-                    console_log("   └─ Invalid bot token", "debug")
+            outcome = 'ok' if error is None else str(response.status_code)
         except requests.exceptions.Timeout:
             last_error = "Request timed out (10s)"
             failed_ids.append(cid)
+            outcome = 'timeout'
             console_log(f"⏱️ Telegram timeout for {cid[:10]}...", "warning")
         except requests.exceptions.ConnectionError as e:
             last_error = f"Connection error: {str(e)[:40]}"
             failed_ids.append(cid)
+            outcome = 'connection_error'
             console_log(f"🔌 Telegram connection error for {cid[:10]}...", "warning")
         except Exception as e:
             last_error = str(e)[:50]
             failed_ids.append(cid)
+            outcome = 'error'
             console_log(f"⚠️ Telegram exception: {last_error}", "warning")
+        TELEGRAM_SEND_SECONDS.observe(time.perf_counter() - send_start, outcome=outcome)
 
     if success_count > 0:
         CONFIG['telegram_messages_sent'] = CONFIG.get('telegram_messages_sent', 0) + success_count
@@ -181,6 +225,33 @@ def send_telegram_new_events(events: list) -> bool:
     Admin also gets them so they don't miss events.
     Respects telegram_notifications_enabled toggle.
     """
+    if not telegram_event_alerts_ready():
+        return False
+
+    message = render_new_events_telegram(events)
+
+    console_log(f"📱 Sending Telegram notification for {len(events)} event(s)", "info")
+
+    # Send to ALL chat IDs (admin + env-configured + DB subscribers) in waves
+    waves = SUBSCRIBERS.waves()
+    total = sum(len(wave) for wave in waves)
+    delivered = []
+    last_error = None
+    for n, wave in enumerate(waves):
+        if n:
+            time.sleep(TELEGRAM_WAVE_PAUSE)  # Stay under the Bot API broadcast limit
+        for sub in wave:
+            ok, err = send_telegram(message, chat_id=sub.chat_id)
+            if ok:
+                delivered.append(sub.chat_id)
+            else:
+                last_error = err
+
+    return finish_new_event_fanout(delivered, total, last_error)
+
+
+def telegram_event_alerts_ready() -> bool:
+    """Whether a new-event Telegram fan-out should run at all."""
     if not CONFIG.get('telegram_notifications_enabled', True):
         console_log("📵 Telegram notifications disabled, skipping event alert", "debug")
         return False
@@ -192,80 +263,18 @@ def send_telegram_new_events(events: list) -> bool:
     if not TELEGRAM_CHAT_IDS and not TELEGRAM_ADMIN_CHAT_ID:
         console_log("⚠️ No Telegram chat IDs configured for event alerts", "debug")
         return False
+    return True
 
-    now = datetime.now(timezone.utc)
-
-    import re as _re
-
-    def _clean(text, maxlen=120):
-        """Strip HTML tags and truncate."""
-        if not text:
-            return ''
-        return _re.sub(r'<[^>]+>', '', str(text)).strip()[:maxlen]
-
-    message = (
-        f"\U0001f6a8 <b>NEW EVENT{'S' if len(events) > 1 else ''} DETECTED!</b>\n"
-        f"\U0001f3af <b>{len(events)} new Dubai Flea Market listing{'s' if len(events) > 1 else ''} just went live!</b>\n"
-        "\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\n"
-    )
-
-    for i, event in enumerate(events, 1):
-        title = _clean(event.get('title', 'Untitled'), 80)
-        link = event.get('link', '')
-        date_posted = _clean(event.get('date_posted', ''), 40)
-        desc = _clean(event.get('description') or event.get('excerpt') or '', 150)
-        categories = event.get('categories') or event.get('tags') or []
-        if isinstance(categories, list):
-            categories = ', '.join(str(c) for c in categories[:3])
-
-        message += f"\n\U0001f4cd <b>Event {i}: {title}</b>\n"
-        if date_posted:
-            message += f"   \U0001f4c5 Posted: {date_posted}\n"
-        if categories:
-            message += f"   \U0001f3f7 Category: {categories}\n"
-        if desc:
-            raw_desc = str(event.get('description') or '')
-            overflow = len(_re.sub(r'<[^>]+>', '', raw_desc).strip()) > 150
-            message += f"   \U0001f4dd {desc}{'...' if overflow else ''}\n"
-        message += f"   \U0001f517 <a href=\"{link}\">Open Event Page</a>\n"
-        if i < len(events):
-            message += "\n   \u2500 \u2500 \u2500 \u2500 \u2500 \u2500 \u2500 \u2500 \u2500\n"
-
-    interval = CONFIG.get('check_interval_minutes', 15)
-    message += (
-        f"\n\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\u2501\n"
-        f"\u23f0 Detected: {format_multi_timezone(now)}\n"
-        f"\U0001f50d Next check: in ~{interval} min\n"
-        f"\U0001f4f1 Tap a link above to view full details!\n\n"
-        f"\U0001f916 <i>Dubai Flea Market Tracker</i>"
-    )
-
-    console_log(f"📱 Sending Telegram notification for {len(events)} event(s)", "info")
-
-    # Send to ALL chat IDs (env-configured + DB subscribers + admin)
-    all_ids = set()
-    if TELEGRAM_CHAT_IDS:
-        all_ids.update(cid.strip() for cid in TELEGRAM_CHAT_IDS.split(',') if cid.strip())
-    if TELEGRAM_ADMIN_CHAT_ID:
-        all_ids.add(TELEGRAM_ADMIN_CHAT_ID)
-    # Add active DB subscribers
-    try:
-        db_sub_ids = db_get_active_subscriber_ids()
-        all_ids.update(db_sub_ids)
-    except Exception:
-        pass  # DB unavailable, use env IDs only
 
-    success_count = 0
-    last_error = None
-    for cid in all_ids:
-        ok, err = send_telegram(message, chat_id=cid)
-        if ok:
-            success_count += 1
-        else:
-            last_error = err
+def finish_new_event_fanout(delivered: list, total: int, last_error: str | None) -> bool:
+    """Record a finished new-event fan-out (notified timestamps, logs, admin alert)."""
+    success_count = len(delivered)
+    if delivered:
+        SUBSCRIBERS.mark_notified(delivered)
+        SUBSCRIBERS.flush_notified()
 
     success = success_count > 0
-    console_log(f"📱 Event notification sent to {success_count}/{len(all_ids)} chat(s)", "success" if success else "warning")
+    console_log(f"📱 Event notification sent to {success_count}/{total} chat(s)", "success" if success else "warning")
     if not success:
         log_activity(f"📱 Telegram failed for new events: {last_error}", "warning")
         notify_admin_alert(f"Telegram failed for new event alerts: {last_error}", "Telegram Alert Failure")
@@ -301,26 +310,7 @@ def send_telegram_heartbeat() -> bool:
     uptime_hours = int(uptime_delta.total_seconds() // 3600)
     uptime_mins = int((uptime_delta.total_seconds() % 3600) // 60)
 
-    message = f"""💓 <b>HEARTBEAT - Bot Status</b>
-━━━━━━━━━━━━━━━━━━━━━━
-
-✅ <b>Status:</b> RUNNING & HEALTHY
-
-📊 <b>Statistics:</b>
-   • Check #{CONFIG['total_checks']}
-   • Events tracked: {len(seen_data.get('event_ids', []))}
-   • New events found: {CONFIG['total_new_events']}
-   • Notifications sent: {CONFIG['emails_sent']}
-
-⏰ <b>Timing:</b>
-   • Current: {format_multi_timezone(now)}
-   • Check interval: Every {CONFIG['check_interval_minutes']} min
-   • Uptime: {uptime_hours}h {uptime_mins}m
-
-━━━━━━━━━━━━━━━━━━━━━━
-🟢 <i>All systems operational</i>
-🤖 <i>Dubai Flea Market Tracker</i>
-👤 <i>Admin-only message</i>"""
+    message = render_heartbeat_telegram(now, len(seen_data.get('event_ids', [])), uptime_hours, uptime_mins)
 
     # Send to admin only
     success, error = send_telegram(message, chat_id=admin_chat_id)
@@ -365,29 +355,7 @@ def send_telegram_daily_summary() -> bool:
     uptime_days = uptime_delta.days
     uptime_hours = int((uptime_delta.total_seconds() % 86400) // 3600)
 
-    message = f"""📊 <b>DAILY SUMMARY REPORT</b>
-━━━━━━━━━━━━━━━━━━━━━━
-📅 {now.strftime('%A, %B %d, %Y')}
-⏰ {format_multi_timezone(now)}
-
-📈 <b>Today's Statistics:</b>
-   • Events on website: {event_count}
-   • Total events tracked: {seen_count}
-   • Checks performed: {CONFIG['total_checks']}
-   • New events detected: {CONFIG['total_new_events']}
-   • Notifications sent: {CONFIG['emails_sent']}
-
-⏱️ <b>Bot Performance:</b>
-   • Status: ✅ Running normally
-   • Uptime: {uptime_days}d {uptime_hours}h
-   • Check interval: Every {CONFIG['check_interval_minutes']} min
-   • Heartbeat: Every {CONFIG['heartbeat_hours']}h
-
-━━━━━━━━━━━━━━━━━━━━━━
-🔗 <a href="https://dubai-fleamarket.com">View All Events →</a>
-
-🤖 <i>Dubai Flea Market Tracker</i>
-👤 <i>Admin-only daily summary</i>"""
+    message = render_daily_summary_telegram(now, event_count, seen_count, uptime_days, uptime_hours)
 
     # Send to admin only
     success, error = send_telegram(message, chat_id=admin_chat_id)
@@ -405,6 +373,11 @@ def send_email_gmail(subject, body, recipient, max_retries=3):
         set_last_smtp_error("Gmail not configured")
         return False, "Gmail not configured"
 
+    # Lazy imports: only the SMTP path needs them (keeps cold start short)
+    import smtplib
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
     msg = MIMEMultipart('alternative')
     msg['Subject'] = sanitize_string(subject, 100)
     msg['From'] = MY_EMAIL
@@ -414,6 +387,7 @@ def send_email_gmail(subject, body, recipient, max_retries=3):
 
     last_error = None
     for attempt in range(1, max_retries + 1):
+        send_start = time.perf_counter()
         try:
             console_log(f"📧 Gmail SMTP to {mask_email(recipient)} (attempt {attempt}/{max_retries})...", "debug")
 
@@ -424,6 +398,7 @@ def send_email_gmail(subject, body, recipient, max_retries=3):
                 server.sendmail(MY_EMAIL, recipient, msg.as_string())
             finally:
                 server.quit()
+            SMTP_SEND_SECONDS.observe(time.perf_counter() - send_start, outcome='ok')
 
             CONFIG['emails_sent'] = CONFIG.get('emails_sent', 0) + 1
             record_stat('emails_sent', 1)
@@ -434,6 +409,7 @@ def send_email_gmail(subject, body, recipient, max_retries=3):
             return True, None
 
         except smtplib.SMTPException as e:
+            SMTP_SEND_SECONDS.observe(time.perf_counter() - send_start, outcome='smtp_error')
             last_error = str(e)[:50]
             set_last_smtp_error(f"SMTP error: {last_error}")
             console_log(f"⚠️ SMTP error (attempt {attempt}): {last_error}", "warning")
@@ -441,6 +417,7 @@ def send_email_gmail(subject, body, recipient, max_retries=3):
                 time.sleep(3)
                 continue
         except (OSError, socket.error) as e:
+            SMTP_SEND_SECONDS.observe(time.perf_counter() - send_start, outcome='network_error')
             last_error = str(e)[:50]
             set_last_smtp_error(f"Network error: {last_error}")
             console_log(f"⚠️ Network error (attempt {attempt}): {last_error}", "warning")
@@ -448,6 +425,7 @@ def send_email_gmail(subject, body, recipient, max_retries=3):
                 time.sleep(5 * attempt)
                 continue
         except Exception as e:
+            SMTP_SEND_SECONDS.observe(time.perf_counter() - send_start, outcome='error')
             last_error = str(e)[:50]
             set_last_smtp_error(f"Gmail error: {last_error}")
             console_log(f"❌ Gmail error: {last_error}", "error")
@@ -517,10 +495,9 @@ def send_email(subject, body, to_email=None, max_retries=3, priority='normal'):
 # ===== Email Queue =====
 
 def add_to_email_queue(subject, body, recipient, priority='normal'):
-    """Add a failed email to the retry queue (database-backed)."""
+    """Add a failed email to the retry queue (heap mirrored to the database)."""
     try:
-        db_add_to_queue(subject, body, recipient, priority)
-        config.EMAIL_QUEUE = db_get_queue()  # Refresh in-memory copy
+        EMAIL_RETRY_QUEUE.add(subject, body, recipient, priority)
         console_log(f"📬 Email queued for retry: {mask_email(recipient)} ({priority} priority)", "info")
         log_activity(f"📬 Email queued for retry to {mask_email(recipient)}", "warning")
     except Exception as e:
@@ -528,21 +505,25 @@ def add_to_email_queue(subject, body, recipient, priority='normal'):
 
 
 def process_email_queue():
-    """Process pending emails in the queue (DB-backed). Called periodically."""
-    queue_items = db_get_queue()
+    """Retry queued emails that are due, high priority first.
 
-    if not queue_items:
+    Only due items are touched; everything else stays in the heap until its
+    own deadline. Called by the scheduler when the earliest item comes due.
+    """
+    now = datetime.now(timezone.utc)
+    due_items = EMAIL_RETRY_QUEUE.pop_due(now)
+    if not due_items:
         return
 
-    now = datetime.now(timezone.utc)
     processed = 0
     removed = 0
 
-    console_log(f"📬 Processing email queue: {len(queue_items)} pending", "info")
+    console_log(f"📬 Processing email queue: {len(due_items)} due of "
+                f"{len(due_items) + len(EMAIL_RETRY_QUEUE)} pending", "info")
 
-    for item in queue_items:
+    for item in due_items:
         try:
-            created = datetime.fromisoformat(item['created_at'].replace('Z', '+00:00'))
+            created = parse_iso_timestamp(item['created_at'])
         except Exception:
             created = now  # fallback
         age_hours = (now - created).total_seconds() / 3600
@@ -557,18 +538,10 @@ def process_email_queue():
                 f"Subject: {item['subject'][:50]}",
                 "Email Expired"
             )
-            db_remove_from_queue(item['id'])
+            EMAIL_RETRY_QUEUE.remove(item['id'])
             removed += 1
             continue
 
-        # Check if it's time to retry
-        try:
-            next_retry = datetime.fromisoformat(item['next_retry'].replace('Z', '+00:00'))
-        except Exception:
-            next_retry = now  # retry now if can't parse
-        if now < next_retry:
-            continue
-
         # Try to send
         console_log(f"🔄 Retrying queued email to {mask_email(item['recipient'])} (attempt {item['attempts'] + 1})", "info")
 
@@ -577,66 +550,37 @@ def process_email_queue():
         if success:
             console_log(f"✅ Queued email delivered: {mask_email(item['recipient'])}", "success")
             log_activity(f"✅ Queued email finally delivered to {mask_email(item['recipient'])}", "success")
-            db_remove_from_queue(item['id'])
+            EMAIL_RETRY_QUEUE.remove(item['id'])
             processed += 1
         else:
             new_attempts = item['attempts'] + 1
-
-            # Calculate next retry
-            if new_attempts < len(EMAIL_RETRY_INTERVALS):
-                delay_minutes = EMAIL_RETRY_INTERVALS[new_attempts]
-            else:
-                delay_minutes = EMAIL_RETRY_INTERVALS[-1]  # Use last interval
-
-            new_next_retry = (now + timedelta(minutes=delay_minutes)).isoformat()
-            db_update_queue_item(item['id'], new_attempts, new_next_retry)
-            console_log(f"⏳ Will retry in {delay_minutes} minutes", "debug")
+            delay_minutes = retry_delay_minutes(new_attempts)
+            EMAIL_RETRY_QUEUE.reschedule(item, new_attempts, now + timedelta(minutes=delay_minutes),
+                                         item.get('last_error') or '')
+            console_log(f"⏳ Will retry in {delay_minutes:.0f} minutes", "debug")
 
     if processed or removed:
-        remaining = db_get_queue_count()
-        console_log(f"📬 Queue processed: {processed} sent, {removed} expired, {remaining} remaining", "info")
-
-    # Sync in-memory list for dashboard compatibility
-    config.EMAIL_QUEUE[:] = db_get_queue()
+        console_log(f"📬 Queue processed: {processed} sent, {removed} expired, "
+                    f"{len(EMAIL_RETRY_QUEUE)} remaining", "info")
 
 
 # ===== Notification Orchestration =====
 
-def send_new_event_email(events):
-    """Send new event notification to enabled recipients. Respects notification toggles."""
-    # Send via Telegram first (instant, free, reliable) — if enabled
-    telegram_success = send_telegram_new_events(events)
-
-    # Check if email notifications are enabled
-    if not CONFIG.get('email_notifications_enabled', True):
-        console_log("📵 Email notifications disabled, skipping email send", "debug")
-        if not telegram_success:
-            console_log("⚠️ Both email and Telegram disabled — new events NOT notified!", "warning")
-        return
-
-    # Also send via email
-    subject = f"🎉 {len(events)} New Dubai Flea Market Event(s)!"
-    body = f"🎯 {len(events)} new event(s) have been posted!\n\n"
+def send_to_recipients(subject, body, recipients, priority='normal') -> int:
+    """Send one email per recipient. Returns the number sent.
 
-    for event in events:
-        body += f"📍 {event['title']}\n"
-        body += f"🔗 {event['link']}\n"
-        body += f"📅 Posted: {event['date_posted']}\n"
-        body += "-" * 50 + "\n\n"
-
-    body += "\n🤖 Sent automatically by Dubai Flea Market Tracker"
-    body += f"\n⏰ {format_multi_timezone()}"
+    Runs the sends in parallel on the async engine when ASYNC_ENGINE is on.
+    """
+    if config.ASYNC_ENGINE and len(recipients) > 1:
+        # Late import to break circular dependency (events_async → notifications)
+        from events_async import ENGINE, send_emails_async
+        return ENGINE.run(send_emails_async(subject, body, recipients, priority))
+    return sum(1 for email in recipients if send_email(subject, body, email, priority=priority))
 
-    console_log(f"📧 Sending new event notification to {len(get_recipients())} recipient(s)", "info")
-    fail_count = 0
-    for email in get_recipients():
-        if not send_email(subject, body, email, priority='high'):
-            fail_count += 1
 
-    if not telegram_success:
-        notify_admin_alert("Telegram failed for new events. Email fallback attempted.", "Failover Notice")
-    if fail_count > 0:
-        notify_admin_alert(f"Email failed for {fail_count} recipient(s) during new event alert.", "Email Delivery Issues")
+def build_new_event_email(events) -> tuple:
+    """Build the (subject, body) of the new-event email (cached per batch)."""
+    return render_new_events_email(events)
 
 
 def send_heartbeat():
@@ -662,40 +606,12 @@ def send_daily_summary_email():
     from events import fetch_events
     events = fetch_events()
 
-    subject = f"📊 Dubai Flea Market Daily Summary - {now.strftime('%B %d, %Y')}"
-
     event_count = len(events) if events else 0
     seen_count = len(seen_data.get('event_ids', []))
-
-    body = f"""
-{'=' * 60}
-📊 DAILY SUMMARY - {now.strftime('%A, %B %d, %Y')}
-⏰ {format_multi_timezone(now)}
-{'=' * 60}
-
-📈 STATISTICS:
-   • Total events on website: {event_count}
-   • Events already tracked: {seen_count}
-   • Total checks performed: {CONFIG['total_checks']}
-   • New events found today: {CONFIG['total_new_events']}
-   • Emails sent: {CONFIG['emails_sent']}
-
-💡 The tracker is running normally!
-   You'll receive an instant notification when new events are posted.
-
-🔗 Check manually: https://dubai-fleamarket.com
-
-{'=' * 60}
-🤖 Sent by Dubai Flea Market Tracker
-⏰ {format_multi_timezone(now)}
-{'=' * 60}
-"""
+    subject, body = render_daily_summary_email(now, event_count, seen_count)
 
     recipients = get_recipients()
-    success_count = 0
-    for email in recipients:
-        if send_email(subject, body, email):
-            success_count += 1
+    success_count = send_to_recipients(subject, body, recipients)
 
     if success_count > 0:
         CONFIG['last_daily_summary_sent_at'] = datetime.now(timezone.utc).isoformat()
@@ -0,0 +1,201 @@
+"""
+=============================================================================
+🌐 DUBAI FLEA MARKET TRACKER — Request Profiler
+=============================================================================
+Flask before/after-request hooks that time every request and count the
+DB calls it made (outermost ``db_*`` calls on the request's thread).
+
+  * per-endpoint count, avg / p50 / p95 / max latency, DB calls and DB time
+    (a rolling window of the last 200 requests per endpoint)
+  * requests slower than ``SLOW_REQUEST_MS`` are logged and kept in a
+    short list
+  * with ``PROFILE_SAMPLE_RATE`` > 0 that fraction of requests runs under
+    cProfile (one at a time); the profile is kept only if the request
+    turned out slow
+  * every response carries a ``Server-Timing`` header (app and db time)
+  * ``dfm_http_request_seconds{endpoint,method}`` on /metrics
+
+Admin page: /admin/profiler. JSON: /api/profiler.
+=============================================================================
+"""
+
+import io
+import random
+import statistics
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+
+from flask import g, request
+
+import config
+from config import app
+from utils import console_log
+from metrics import REGISTRY, begin_db_scope, end_db_scope
+
+WINDOW = 200          # Recent latencies kept per endpoint
+MAX_SLOW = 50         # Slow requests kept
+MAX_PROFILES = 20     # cProfile captures kept
+PROFILE_LINES = 40    # pstats rows per capture
+
+HTTP_SECONDS = REGISTRY.histogram(
+    'dfm_http_request_seconds', 'HTTP request latency by Flask endpoint', ('endpoint', 'method'))
+
+
+class RequestProfiler:
+    """Per-endpoint timings, slow-request log and sampled cProfile captures."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profile_lock = threading.Lock()  # cProfile one request at a time
+        self._endpoints = {}
+        self._slow = deque(maxlen=MAX_SLOW)
+        self._profiles = OrderedDict()
+        self._next_profile_id = 1
+
+    # ----- Hooks -----
+
+    def before(self) -> None:
+        g._prof_start = time.perf_counter()
+        g._prof = None
+        begin_db_scope()
+        rate = config.PROFILE_SAMPLE_RATE
+        if rate > 0 and random.random() < rate and self._profile_lock.acquire(blocking=False):
+            import cProfile  # Lazy import: sampling is off by default
+            g._prof = cProfile.Profile()
+            g._prof.enable()
+
+    def after(self, response):
+        start = g.pop('_prof_start', None)
+        if start is None:
+            return response
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        db_calls, db_seconds = end_db_scope()
+        db_ms = db_seconds * 1000
+        profile_text = self._stop_profile()
+
+        endpoint = request.endpoint or '<unmatched>'
+        if endpoint != 'static':
+            HTTP_SECONDS.observe(elapsed_ms / 1000, endpoint=endpoint, method=request.method)
+            self._record(endpoint, request.method, request.path, response.status_code,
+                         elapsed_ms, db_calls, db_ms, profile_text)
+        response.headers['Server-Timing'] = f'app;dur={elapsed_ms:.1f}, db;dur={db_ms:.1f};desc="{db_calls} calls"'
+        return response
+
+    def teardown(self, exc=None) -> None:
+        """Release the profiler if after() never ran (unhandled error)."""
+        if g.pop('_prof_start', None) is not None:
+            end_db_scope()
+            self._stop_profile()
+
+    def _stop_profile(self) -> str | None:
+        prof = g.pop('_prof', None)
+        if prof is None:
+            return None
+        prof.disable()
+        self._profile_lock.release()
+        import pstats  # Lazy import: sampling is off by default
+        stream = io.StringIO()
+        pstats.Stats(prof, stream=stream).sort_stats('cumulative').print_stats(PROFILE_LINES)
+        return stream.getvalue()
+
+    # ----- Recording -----
+
+    def _record(self, endpoint: str, method: str, path: str, status: int,
+                elapsed_ms: float, db_calls: int, db_ms: float, profile_text: str | None) -> None:
+        slow = elapsed_ms >= config.SLOW_REQUEST_MS
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = {
+                    'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'slow': 0,
+                    'db_calls': 0, 'db_ms': 0.0, 'recent': deque(maxlen=WINDOW),
+                }
+            stats['count'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            stats['db_calls'] += db_calls
+            stats['db_ms'] += db_ms
+            stats['recent'].append(elapsed_ms)
+            if not slow:
+                return
+            stats['slow'] += 1
+            profile_id = None
+            if profile_text:
+                profile_id = self._next_profile_id
+                self._next_profile_id += 1
+                self._profiles[profile_id] = {
+                    'endpoint': endpoint, 'path': path, 'ms': round(elapsed_ms, 1),
+                    'at': datetime.now(timezone.utc).isoformat(), 'text': profile_text,
+                }
+                while len(self._profiles) > MAX_PROFILES:
+                    self._profiles.popitem(last=False)
+            self._slow.appendleft({
+                'at': datetime.now(timezone.utc).isoformat(),
+                'method': method, 'path': path[:200], 'endpoint': endpoint, 'status': status,
+                'ms': round(elapsed_ms, 1), 'db_calls': db_calls, 'db_ms': round(db_ms, 1),
+                'profile_id': profile_id,
+            })
+        console_log(f"🐢 Slow request: {method} {path[:60]} took {elapsed_ms:.0f}ms "
+                    f"({db_calls} DB calls, {db_ms:.0f}ms DB)", "warning")
+
+    # ----- Introspection -----
+
+    def snapshot(self, top: int = 10) -> dict:
+        with self._lock:
+            rows = []
+            for endpoint, s in self._endpoints.items():
+                recent = sorted(s['recent'])
+                rows.append({
+                    'endpoint': endpoint,
+                    'count': s['count'],
+                    'avg_ms': round(s['total_ms'] / s['count'], 1),
+                    'p50_ms': round(statistics.median(recent), 1),
+                    'p95_ms': round(recent[min(len(recent) - 1, int(len(recent) * 0.95))], 1),
+                    'max_ms': round(s['max_ms'], 1),
+                    'avg_db_calls': round(s['db_calls'] / s['count'], 1),
+                    'avg_db_ms': round(s['db_ms'] / s['count'], 1),
+                    'slow': s['slow'],
+                })
+            slow = list(self._slow)
+            profiles = [{k: v for k, v in p.items() if k != 'text'} | {'id': pid}
+                        for pid, p in reversed(self._profiles.items())]
+        rows.sort(key=lambda r: r['p95_ms'], reverse=True)
+        return {
+            'slow_threshold_ms': config.SLOW_REQUEST_MS,
+            'profile_sample_rate': config.PROFILE_SAMPLE_RATE,
+            'endpoints': rows[:top],
+            'tracked_endpoints': len(rows),
+            'slow_requests': slow,
+            'profiles': profiles,
+        }
+
+    def profile(self, profile_id: int) -> dict | None:
+        with self._lock:
+            captured = self._profiles.get(profile_id)
+            return dict(captured) if captured else None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._endpoints.clear()
+            self._slow.clear()
+            self._profiles.clear()
+
+
+PROFILER = RequestProfiler()
+
+
+@app.before_request
+def _profile_before():
+    PROFILER.before()
+
+
+@app.after_request
+def _profile_after(response):
+    return PROFILER.after(response)
+
+
+@app.teardown_request
+def _profile_teardown(exc=None):
+    PROFILER.teardown(exc)
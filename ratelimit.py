@@ -0,0 +1,234 @@
+"""
+=============================================================================
+🌐 DUBAI FLEA MARKET TRACKER — Rate Limiter
+=============================================================================
+GCRA (generic cell rate algorithm — a token bucket stored as one number).
+Each client key keeps only its "theoretical arrival time"; a request is
+allowed while that time is no more than one window ahead of now. State is
+O(1) per key and every check is O(1).
+
+Keys live in an LRU ``OrderedDict`` capped at ``RATE_LIMIT_MAX_KEYS``.
+Idle keys (whose bucket has fully refilled) carry no information and are
+evicted first, so memory stays bounded even when a crawler sprays IPs.
+Blocks expire by timestamp — no timer threads.
+
+Backends (``RATE_LIMIT_BACKEND``):
+  memory — state is private to this process (default)
+  db     — every process still decides locally, but merges its usage into
+           the shared ``rate_limits`` table every ``RATE_LIMIT_SYNC_SECONDS``
+           and picks up other processes' usage and blocks. Requests never
+           wait on the database; blocks survive restarts.
+
+Has NO Flask dependency; ``utils.rate_limit`` is the request-facing wrapper.
+=============================================================================
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from config import (
+    RATE_LIMITS, RATE_LIMIT_MAX_KEYS, BLOCK_DURATION,
+    RATE_LIMIT_BACKEND, RATE_LIMIT_SYNC_SECONDS,
+)
+from db import db_rate_limit_push, db_rate_limit_fetch, db_rate_limit_prune
+
+EVICT_PER_HIT = 2  # Idle keys swept opportunistically on each request
+PRUNE_EVERY_SYNCS = 30  # Shared backend: delete idle rows every N syncs
+
+
+class RateLimiter:
+    """Per-(route class, client) GCRA limiter with LRU eviction and timed blocks."""
+
+    backend = 'memory'
+
+    def __init__(self, limits: dict, max_keys: int = 10000, block_seconds: float = 300):
+        self._limits = {}
+        for route_class, (max_requests, window) in limits.items():
+            interval = window / max_requests
+            # (emission interval, burst tolerance)
+            self._limits[route_class] = (interval, window - interval)
+        self._max_keys = max_keys
+        self._block_seconds = block_seconds
+        self._lock = threading.Lock()
+        self._tat = OrderedDict()      # 'route_class|key' -> theoretical arrival time
+        self._blocked = OrderedDict()  # 'route_class|key' -> unblock time
+        self._stats = {'allowed': 0, 'rejected': 0, 'blocks': 0, 'evicted': 0}
+
+    def hit(self, route_class: str, key: str, now: float | None = None) -> tuple:
+        """Record one request. Returns ``(allowed, retry_after_seconds, newly_blocked)``."""
+        now = time.time() if now is None else now
+        interval, tolerance = self._limits.get(route_class, self._limits['public'])
+        slot = f"{route_class}|{key}"
+
+        with self._lock:
+            self._expire_blocks(now)
+            until = self._blocked.get(slot)
+            if until is not None:
+                if until > now:
+                    self._stats['rejected'] += 1
+                    return False, until - now, False
+                del self._blocked[slot]
+
+            tat = max(self._tat.get(slot, now), now)
+            if tat - now > tolerance:
+                # Over the limit: block the client for the block duration
+                until = now + self._block_seconds
+                self._tat.pop(slot, None)
+                self._blocked[slot] = until
+                while len(self._blocked) > self._max_keys:
+                    self._blocked.popitem(last=False)
+                self._stats['rejected'] += 1
+                self._stats['blocks'] += 1
+                self._on_blocked(slot, until)
+                return False, self._block_seconds, True
+
+            self._tat[slot] = tat + interval
+            self._tat.move_to_end(slot)
+            self._evict(now)
+            self._stats['allowed'] += 1
+            self._on_allowed(slot, interval)
+            return True, 0.0, False
+
+    def start(self) -> None:
+        """Start backend background work (no-op for the memory backend)."""
+
+    # ----- Backend hooks (called with the lock held) -----
+
+    def _on_allowed(self, slot: str, interval: float) -> None:
+        pass
+
+    def _on_blocked(self, slot: str, until: float) -> None:
+        pass
+
+    # ----- Housekeeping -----
+
+    def _expire_blocks(self, now: float) -> None:
+        # Blocks are (almost) in expiry order; hit() re-checks the exact time
+        while self._blocked:
+            slot, until = next(iter(self._blocked.items()))
+            if until > now:
+                return
+            self._blocked.popitem(last=False)
+
+    def _evict(self, now: float) -> None:
+        swept = 0
+        while self._tat and swept < EVICT_PER_HIT:
+            slot, tat = next(iter(self._tat.items()))
+            if tat > now:
+                break  # Least recently used key is still throttled
+            self._tat.popitem(last=False)
+            self._stats['evicted'] += 1
+            swept += 1
+        while len(self._tat) > self._max_keys:
+            self._tat.popitem(last=False)
+            self._stats['evicted'] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._tat.clear()
+            self._blocked.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._expire_blocks(time.time())
+            return {
+                **self._stats,
+                'backend': self.backend,
+                'tracked_keys': len(self._tat),
+                'blocked_keys': len(self._blocked),
+                'max_keys': self._max_keys,
+                'limits': {c: {'max_requests': round((t + i) / i), 'window_seconds': round(t + i)}
+                           for c, (i, t) in self._limits.items()},
+            }
+
+
+class SharedRateLimiter(RateLimiter):
+    """GCRA limiter whose state is batched into the shared ``rate_limits`` table.
+
+    Local decisions use the last synced view plus this process's own usage
+    since then, so cross-process enforcement lags by at most one sync
+    interval while requests never wait on the database.
+    """
+
+    backend = 'db'
+
+    def __init__(self, limits: dict, sync_seconds: float = 2.0, **kwargs):
+        super().__init__(limits, **kwargs)
+        self._sync_seconds = sync_seconds
+        self._pending = {}  # slot -> [consumed_seconds, blocked_until]
+        self._sync_thread = None
+        self._syncs = 0
+        self._stats.update({'syncs': 0, 'sync_errors': 0, 'last_sync_ms': 0, 'pending_slots': 0})
+
+    def _on_allowed(self, slot: str, interval: float) -> None:
+        self._pending.setdefault(slot, [0.0, 0.0])[0] += interval
+        self._ensure_sync_thread()
+
+    def _on_blocked(self, slot: str, until: float) -> None:
+        pending = self._pending.setdefault(slot, [0.0, 0.0])
+        pending[1] = max(pending[1], until)
+        self._ensure_sync_thread()
+
+    def start(self) -> None:
+        """Load shared blocks now instead of on the first request."""
+        with self._lock:
+            self._ensure_sync_thread()
+
+    def _ensure_sync_thread(self) -> None:
+        if self._sync_thread is None:
+            self._sync_thread = threading.Thread(target=self._sync_loop, daemon=True,
+                                                 name='ratelimit-sync')
+            self._sync_thread.start()
+
+    def _sync_loop(self) -> None:
+        while True:
+            try:
+                self.sync()
+            except Exception:
+                self._stats['sync_errors'] += 1
+            time.sleep(self._sync_seconds)
+
+    def sync(self, now: float | None = None) -> None:
+        """Push local usage, then merge the shared view back into memory."""
+        now = time.time() if now is None else now
+        start = time.monotonic()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            hot = [slot for slot in reversed(self._tat) if self._tat[slot] > now][:500]
+        try:
+            db_rate_limit_push([(slot, consumed, blocked) for slot, (consumed, blocked) in pending.items()], now)
+        except Exception:
+            with self._lock:  # Keep the usage for the next attempt
+                for slot, (consumed, blocked) in pending.items():
+                    merged = self._pending.setdefault(slot, [0.0, 0.0])
+                    merged[0] += consumed
+                    merged[1] = max(merged[1], blocked)
+            raise
+        shared = db_rate_limit_fetch(list(dict.fromkeys(list(pending) + hot)), now)
+
+        with self._lock:
+            for slot, (tat, blocked_until) in shared.items():
+                if blocked_until > now:
+                    if self._blocked.get(slot, 0) < blocked_until:
+                        self._blocked[slot] = blocked_until
+                    self._tat.pop(slot, None)
+                elif tat > now and tat > self._tat.get(slot, 0):
+                    self._tat[slot] = tat
+            self._stats['syncs'] += 1
+            self._stats['last_sync_ms'] = int((time.monotonic() - start) * 1000)
+            self._stats['pending_slots'] = len(self._pending)
+
+        self._syncs += 1
+        if self._syncs % PRUNE_EVERY_SYNCS == 0:
+            db_rate_limit_prune(now)
+
+
+def _build_limiter() -> RateLimiter:
+    kwargs = {'max_keys': RATE_LIMIT_MAX_KEYS, 'block_seconds': BLOCK_DURATION}
+    if RATE_LIMIT_BACKEND == 'db':
+        return SharedRateLimiter(RATE_LIMITS, sync_seconds=RATE_LIMIT_SYNC_SECONDS, **kwargs)
+    return RateLimiter(RATE_LIMITS, **kwargs)
+
+
+LIMITER = _build_limiter()
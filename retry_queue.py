@@ -0,0 +1,197 @@
+"""
+=============================================================================
+🌐 DUBAI FLEA MARKET TRACKER — Email Retry Queue
+=============================================================================
+In-memory min-heap of failed emails keyed by when each one is next due,
+mirrored to the ``email_queue`` table. Timestamps are parsed once when an
+item enters the queue, so finding due work is O(log n) per item instead
+of a full table scan + string parsing every pass.
+
+An item is due at its ``next_retry`` time, or at its expiry time
+(``created_at + MAX_EMAIL_AGE_HOURS``) if that comes first, so expired
+items are dropped promptly too.
+
+Depends only on config, utils and db so any layer can import it.
+=============================================================================
+"""
+
+import heapq
+import itertools
+import random
+import threading
+from datetime import datetime, timezone, timedelta
+
+import config
+from config import (
+    MAX_EMAIL_QUEUE, EMAIL_RETRY_INTERVALS, EMAIL_RETRY_JITTER, MAX_EMAIL_AGE_HOURS,
+)
+from utils import parse_iso_timestamp
+from db import (
+    db_add_to_queue, db_get_queue, db_get_queue_item, db_update_queue_item,
+    db_remove_from_queue, db_clear_queue,
+)
+from metrics import QUEUE_DEPTH
+
+
+def retry_delay_minutes(attempts: int) -> float:
+    """Backoff for the next retry after ``attempts`` failures, with jitter.
+
+    Follows ``EMAIL_RETRY_INTERVALS`` (doubling, capped at the last entry)
+    and spreads each delay by ±``EMAIL_RETRY_JITTER`` so items that failed
+    together do not all retry in the same instant.
+    """
+    base = EMAIL_RETRY_INTERVALS[min(max(attempts, 0), len(EMAIL_RETRY_INTERVALS) - 1)]
+    return base * (1 + random.uniform(-EMAIL_RETRY_JITTER, EMAIL_RETRY_JITTER))
+
+
+def _epoch(iso_string: str | None, default: float) -> float:
+    try:
+        return parse_iso_timestamp(iso_string).timestamp()
+    except Exception:
+        return default
+
+
+class EmailRetryQueue:
+    """Heap of ``(due_epoch, priority_rank, seq, item_id)`` with lazy deletion."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heap = []
+        self._items = {}    # id -> item dict (includes '_due' and '_seq')
+        self._seq = itertools.count()
+        self._listener = None
+
+    # ----- Wiring -----
+
+    def set_listener(self, callback) -> None:
+        """``callback(seconds_until_next_due | None)`` runs after every change."""
+        self._listener = callback
+
+    def _changed(self) -> None:
+        config.EMAIL_QUEUE = self.items()
+        if self._listener:
+            try:
+                self._listener(self.seconds_until_next())
+            except Exception:
+                pass
+
+    def _push(self, item: dict) -> None:
+        """Index ``item`` (caller holds the lock)."""
+        now = datetime.now(timezone.utc).timestamp()
+        next_retry = _epoch(item.get('next_retry'), now)
+        expires = _epoch(item.get('created_at'), now) + MAX_EMAIL_AGE_HOURS * 3600
+        item['_due'] = min(next_retry, expires)
+        item['_seq'] = next(self._seq)
+        self._items[item['id']] = item
+        rank = 0 if item.get('priority') == 'high' else 1
+        heapq.heappush(self._heap, (item['_due'], rank, item['_seq'], item['id']))
+
+    # ----- Loading / adding -----
+
+    def load(self) -> int:
+        """Rebuild the heap from the database. Returns the item count."""
+        rows = db_get_queue()
+        with self._lock:
+            self._heap = []
+            self._items = {}
+            for row in rows:
+                self._push(row)
+        self._changed()
+        return len(rows)
+
+    def add(self, subject: str, body: str, recipient: str, priority: str = 'normal') -> str:
+        """Persist a failed email and schedule its first retry."""
+        next_retry = datetime.now(timezone.utc) + timedelta(minutes=retry_delay_minutes(0))
+        item_id = db_add_to_queue(subject, body, recipient, priority, next_retry=next_retry.isoformat())
+        item = db_get_queue_item(item_id)
+        if item is None:
+            # Evicted immediately by the queue size cap
+            return item_id
+        with self._lock:
+            self._push(item)
+            overflow = len(self._items) > MAX_EMAIL_QUEUE
+        if overflow:
+            self.load()  # DB applied its size cap — re-mirror it
+        else:
+            self._changed()
+        return item_id
+
+    # ----- Consuming -----
+
+    def pop_due(self, now: datetime | None = None) -> list:
+        """Remove and return every due item, high priority first.
+
+        Popped items are owned by the caller until it calls ``reschedule``
+        or ``remove``, so concurrent processors never send the same email.
+        """
+        now_ts = (now or datetime.now(timezone.utc)).timestamp()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now_ts:
+                _, rank, seq, item_id = heapq.heappop(self._heap)
+                item = self._items.get(item_id)
+                if item is None or item['_seq'] != seq:
+                    continue  # stale entry
+                del self._items[item_id]
+                due.append((rank, item['_due'], item))
+        if due:
+            self._changed()
+        return [item for _, _, item in sorted(due, key=lambda d: (d[0], d[1]))]
+
+    def reschedule(self, item: dict, attempts: int, next_retry: datetime, last_error: str = '') -> None:
+        """Persist and re-queue a failed retry."""
+        item['attempts'] = attempts
+        item['next_retry'] = next_retry.isoformat()
+        item['last_error'] = last_error
+        db_update_queue_item(item['id'], attempts, item['next_retry'], last_error)
+        with self._lock:
+            self._push(item)
+        self._changed()
+
+    def remove(self, item_id: str) -> bool:
+        """Delete an item from memory and the database."""
+        with self._lock:
+            self._items.pop(item_id, None)  # heap entry becomes stale
+        removed = db_remove_from_queue(item_id)
+        self._changed()
+        return removed
+
+    def clear(self) -> int:
+        """Delete every queued email. Returns the number removed."""
+        with self._lock:
+            self._heap = []
+            self._items = {}
+        cleared = db_clear_queue()
+        self._changed()
+        return cleared
+
+    # ----- Introspection -----
+
+    def get(self, item_id: str) -> dict | None:
+        with self._lock:
+            return self._items.get(item_id)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def seconds_until_next(self) -> float | None:
+        """Seconds until the earliest item is due, or None if empty."""
+        with self._lock:
+            while self._heap:
+                due, _, seq, item_id = self._heap[0]
+                item = self._items.get(item_id)
+                if item is not None and item['_seq'] == seq:
+                    return max(0.0, due - datetime.now(timezone.utc).timestamp())
+                heapq.heappop(self._heap)
+        return None
+
+    def items(self) -> list:
+        """Queued emails for display, high priority then oldest first."""
+        with self._lock:
+            items = list(self._items.values())
+        items.sort(key=lambda i: (0 if i.get('priority') == 'high' else 1, i.get('created_at') or ''))
+        return [{k: v for k, v in i.items() if not k.startswith('_')} for i in items]
+
+
+EMAIL_RETRY_QUEUE = EmailRetryQueue()
+QUEUE_DEPTH.set_function(lambda: len(EMAIL_RETRY_QUEUE), queue='email_retry')
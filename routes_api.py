@@ -6,14 +6,10 @@
 
 import csv
 import json
-import smtplib
 import socket
-import threading
 import time
 from io import StringIO
 from datetime import datetime, timezone, timedelta
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 
 from flask import request, jsonify, Response
 
@@ -24,11 +20,10 @@ from config import (
     MY_EMAIL, MY_PASSWORD, TO_EMAIL,
     SMTP_SERVER, SMTP_PORT, SMTP_USE_IPV4,
     CHECK_HISTORY,
-    EMAIL_RETRY_INTERVALS,
 )
 from utils import (
-    rate_limit, require_admin, require_password,
-    console_log, log_activity, log_admin_action,
+    rate_limit, require_admin, require_password, is_admin, verify_metrics_token,
+    console_log, get_console_logs, log_activity, log_admin_action,
     sanitize_string, validate_email, validate_url, mask_email,
     format_timestamp, parse_iso_timestamp,
     format_multi_timezone, format_multi_timezone_date,
@@ -43,23 +38,37 @@ from state import (
     load_recipient_status, save_recipient_status,
     get_all_recipients, get_recipients,
     load_tracked_events, get_latest_event_summary,
-    save_email_queue, build_email_queue_payload,
+    build_email_queue_payload,
     mark_daily_summary_sent,
 )
 from notifications import (
     send_telegram, send_telegram_heartbeat, send_telegram_daily_summary,
-    send_telegram_new_events, send_new_event_email,
+    send_telegram_new_events,
     send_email, send_email_gmail,
     send_heartbeat, send_daily_summary_email,
-    process_email_queue, notify_admin_alert,
-    get_admin_chat_id,
+    process_email_queue,
 )
-from events import fetch_events, check_for_events
+from events import (
+    fetch_events, run_check, request_check,
+    get_check_coordination_stats, SCHEDULER,
+)
+from dispatcher import get_dispatch_stats
+from retry_queue import EMAIL_RETRY_QUEUE, retry_delay_minutes
+from ratelimit import LIMITER
+from subscribers import SUBSCRIBERS
+from message_templates import get_render_stats
+from events_async import ENGINE
+from telegram_bot import COMMANDS, POLLER
+from metrics import REGISTRY, lock_stats
+from profiler import PROFILER
+from logsink import LOG_SINK
+from startup import startup_report
+from snapshot import snapshot_status
 from db import (
     db_set_notification_setting, db_get_all_notification_settings,
     db_add_subscriber, db_remove_subscriber, db_toggle_subscriber,
-    db_get_subscribers, db_get_active_subscriber_ids, db_get_subscriber_count,
-    db_get_queue, db_remove_from_queue, db_clear_queue, db_clear_logs,
+    db_get_subscribers,
+    db_clear_logs, get_query_stats,
     validate_chat_id, mask_chat_id,
 )
 
@@ -99,8 +108,8 @@ def api_public_stats():
     # Safe console feed — only msg + time_short, no internal diagnostics
     safe_console = [
         {'msg': entry.get('msg', ''), 'time_short': entry.get('time_short', '')}
-        for entry in config.SYSTEM_CONSOLE[:10]
-        if isinstance(entry, dict) and entry.get('msg')
+        for entry in get_console_logs(10)
+        if entry.get('msg')
     ]
 
     return jsonify({
@@ -181,7 +190,7 @@ def api_status():
 def api_console():
     """API endpoint for system console logs."""
     return jsonify({
-        'console': config.SYSTEM_CONSOLE[:100],
+        'console': get_console_logs(100),
         'diagnostics': {
             **API_DIAGNOSTICS,
             'email_provider': {
@@ -194,6 +203,7 @@ def api_console():
                 'ipv4_forced': SMTP_USE_IPV4
             },
             'email_queue': build_email_queue_payload(limit=10),
+            'db_queries': get_query_stats(top=3),
             'last_smtp_error': CONFIG.get('last_smtp_error'),
             'last_smtp_error_at': CONFIG.get('last_smtp_error_at')
         },
@@ -246,8 +256,23 @@ def api_diagnostics():
         'email_queue': {
             'pending_count': len(config.EMAIL_QUEUE),
             'high_priority': len([e for e in config.EMAIL_QUEUE if e.get('priority') == 'high']),
-            'items': config.EMAIL_QUEUE[:10]  # Show first 10 for debugging
+            'items': config.EMAIL_QUEUE[:10],  # Show first 10 for debugging
+            'next_due_seconds': EMAIL_RETRY_QUEUE.seconds_until_next(),
         },
+        'check_coordination': get_check_coordination_stats(),
+        'notification_dispatch': get_dispatch_stats(),
+        'rate_limiter': LIMITER.snapshot(),
+        'subscribers': SUBSCRIBERS.snapshot(),
+        'message_render': get_render_stats(),
+        'async_engine': ENGINE.snapshot(),
+        'telegram_commands': COMMANDS.snapshot(),
+        'telegram_polling': POLLER.snapshot(),
+        'db_queries': get_query_stats(top=20),
+        'locks': lock_stats(),
+        'log_sink': LOG_SINK.snapshot(),
+        'startup': startup_report(),
+        'snapshot': snapshot_status(),
+        'dispatch_prep': {**config.RECIPIENT_CACHE_STATS, 'cached': config.RECIPIENT_STATUS is not None},
         'console_entries': len(config.SYSTEM_CONSOLE),
         'activity_log_entries': len(config.ACTIVITY_LOGS)
     })
@@ -286,7 +311,7 @@ def test_api_connection():
 @require_password
 def clear_console():
     """Clear system console logs - requires password."""
-    config.SYSTEM_CONSOLE = []
+    config.SYSTEM_CONSOLE.clear()
     console_log("🗑️ Console cleared by admin", "info")
     return jsonify({'success': True})
 
@@ -296,6 +321,11 @@ def clear_console():
 @require_password
 def diagnose_smtp():
     """Comprehensive Gmail SMTP diagnostic - tests each step of the connection."""
+    # Lazy imports: only the SMTP path needs them (keeps cold start short)
+    import smtplib
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
     console_log("🔧 SMTP DIAGNOSTIC: Starting comprehensive test...", "warning")
 
     results = {
@@ -611,7 +641,8 @@ def toggle_recipient(email):
         return jsonify({'success': False, 'message': 'Email not in recipient list'}), 400
 
     status = load_recipient_status()
-    status[email]['enabled'] = not status[email]['enabled']
+    entry = status.setdefault(email, {'enabled': True})
+    entry['enabled'] = not entry['enabled']
     save_recipient_status(status)
 
     state = 'enabled' if status[email]['enabled'] else 'disabled'
@@ -684,6 +715,7 @@ def add_telegram_subscriber():
 
         success = db_add_subscriber(chat_id, label)
         if success:
+            SUBSCRIBERS.invalidate()
             log_activity(f"📱 Telegram subscriber added: {mask_chat_id(chat_id)}", "success")
             log_admin_action("Add Telegram subscriber", f"Chat ID: {mask_chat_id(chat_id)}, Label: {label}")
             return jsonify({'success': True, 'message': f'Subscriber {mask_chat_id(chat_id)} added'})
@@ -707,6 +739,7 @@ def remove_telegram_subscriber():
 
         success = db_remove_subscriber(chat_id)
         if success:
+            SUBSCRIBERS.invalidate()
             log_activity(f"📱 Telegram subscriber removed: {mask_chat_id(chat_id)}", "warning")
             log_admin_action("Remove Telegram subscriber", f"Chat ID: {mask_chat_id(chat_id)}")
             return jsonify({'success': True, 'message': 'Subscriber removed'})
@@ -730,6 +763,7 @@ def toggle_telegram_subscriber():
 
         new_state = db_toggle_subscriber(chat_id)
         if new_state is not None:
+            SUBSCRIBERS.invalidate()
             state_str = 'activated' if new_state else 'deactivated'
             log_activity(f"📱 Telegram subscriber {state_str}: {mask_chat_id(chat_id)}", "success")
             return jsonify({'success': True, 'active': new_state, 'message': f'Subscriber {state_str}'})
@@ -741,281 +775,18 @@ def toggle_telegram_subscriber():
 
 # ===== Telegram Bot Webhook (Interactive Commands) =====
 
-def _tg_reply(chat_id: str, text: str):
-    """Send a reply message back to a Telegram chat."""
-    if not TELEGRAM_BOT_TOKEN:
-        return
-    try:
-        import requests as _req
-        _req.post(
-            f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage",
-            json={'chat_id': chat_id, 'text': text, 'parse_mode': 'HTML',
-                  'disable_web_page_preview': True},
-            timeout=10,
-        )
-    except Exception:
-        pass
-
-
 @app.route(f'/api/telegram-webhook', methods=['POST'])
+@rate_limit('webhook')
 def telegram_webhook():
-    """Handle incoming Telegram bot updates (commands from users)."""
+    """Handle incoming Telegram bot updates (commands from users).
+
+    Only queues the command — telegram_bot.py's workers run it and reply.
+    """
     try:
         data = request.get_json(silent=True) or {}
-        message = data.get('message', {})
-        if not message:
-            return jsonify({'ok': True})
-
-        chat_id = str(message.get('chat', {}).get('id', ''))
-        text = (message.get('text') or '').strip()
-        first_name = message.get('from', {}).get('first_name', 'there')
-        username = message.get('from', {}).get('username', '')
-
-        if not chat_id or not text:
-            return jsonify({'ok': True})
-
-        cmd = text.split()[0].lower().split('@')[0]  # handle /start@botname
-
-        if cmd == '/start':
-            welcome = (
-                f"👋 <b>Welcome, {first_name}!</b>\n\n"
-                "🏪 I'm the <b>Dubai Flea Market Tracker Bot</b>.\n"
-                "I watch the Dubai Flea Market website 24/7 and notify you "
-                "the moment a new event is posted.\n\n"
-                "━━━━━━━━━━━━━━━━━━━━━━\n"
-                "📌 <b>Commands:</b>\n\n"
-                "/subscribe — Get event alerts\n"
-                "/unsubscribe — Stop alerts\n"
-                "/status — Tracker stats + uptime\n"
-                "/uptime — How long the bot has been running\n"
-                "/events — Recent events with details\n"
-                "/check — Trigger an instant check now\n"
-                "/next — When is the next scheduled check\n"
-                "/myid — Your chat ID\n"
-                "/help — Full command list\n"
-                "━━━━━━━━━━━━━━━━━━━━━━\n\n"
-                "💡 <i>Use /subscribe to start receiving notifications!</i>"
-            )
-            _tg_reply(chat_id, welcome)
-
-        elif cmd == '/help':
-            _tg_reply(chat_id, (
-                "ℹ️ <b>Dubai Flea Market Tracker — All Commands</b>\n\n"
-                "<b>Subscriptions</b>\n"
-                "/subscribe — Subscribe to new event alerts\n"
-                "/unsubscribe — Unsubscribe from alerts\n\n"
-                "<b>Status</b>\n"
-                "/status — Full tracker stats and uptime\n"
-                "/uptime — How long the bot has been running\n"
-                "/next — When is the next scheduled check\n\n"
-                "<b>Events</b>\n"
-                "/events — See recent tracked events with details\n"
-                "/check — Trigger an instant check right now\n\n"
-                "<b>Info</b>\n"
-                "/myid — Show your Telegram chat ID\n"
-                "/help — Show this message\n\n"
-                "🌐 <a href=\"https://dubai-fleamarket.com\">Dubai Flea Market Website</a>"
-            ))
-
-        elif cmd == '/subscribe':
-            if not validate_chat_id(chat_id):
-                _tg_reply(chat_id, "❌ Could not validate your chat ID.")
-                return jsonify({'ok': True})
-            display_name = username or first_name or ''
-            added = db_add_subscriber(chat_id, display_name, added_by='self')
-            if added:
-                _tg_reply(chat_id, (
-                    "✅ <b>Subscribed successfully!</b>\n\n"
-                    "You'll receive instant notifications when new "
-                    "Dubai Flea Market events are posted.\n\n"
-                    "Use /unsubscribe to stop at any time."
-                ))
-                log_activity(f"📱 New Telegram subscriber via /subscribe: {mask_chat_id(chat_id)}", "success")
-                # Notify admin
-                notify_admin_alert(
-                    f"📱 New subscriber joined via /subscribe\n"
-                    f"Name: {first_name}\nUsername: @{username or 'none'}\n"
-                    f"Chat ID: {mask_chat_id(chat_id)}",
-                    "New Subscriber"
-                )
-            else:
-                _tg_reply(chat_id, "ℹ️ You're already subscribed! Use /unsubscribe to stop.")
-
-        elif cmd == '/unsubscribe':
-            removed = db_remove_subscriber(chat_id)
-            if removed:
-                _tg_reply(chat_id, (
-                    "👋 <b>Unsubscribed.</b>\n\n"
-                    "You won't receive event notifications anymore.\n"
-                    "Use /subscribe to re-subscribe at any time."
-                ))
-                log_activity(f"📱 Telegram subscriber left via /unsubscribe: {mask_chat_id(chat_id)}", "warning")
-            else:
-                _tg_reply(chat_id, "ℹ️ You're not currently subscribed. Use /subscribe to join.")
-
-        elif cmd == '/status':
-            seen_data = load_seen_events()
-            sub_count = 0
-            try:
-                sub_count = db_get_subscriber_count()
-            except Exception:
-                pass
-            # Calculate uptime
-            uptime_str = 'Unknown'
-            try:
-                from utils import parse_iso_timestamp
-                start = parse_iso_timestamp(CONFIG.get('uptime_start', ''))
-                if start:
-                    delta = datetime.now(timezone.utc) - start
-                    days = delta.days
-                    hours, rem = divmod(delta.seconds, 3600)
-                    minutes = rem // 60
-                    if days > 0:
-                        uptime_str = f"{days}d {hours}h {minutes}m"
-                    elif hours > 0:
-                        uptime_str = f"{hours}h {minutes}m"
-                    else:
-                        uptime_str = f"{minutes}m"
-            except Exception:
-                pass
-            # Next check
-            next_check_str = 'Soon'
-            try:
-                next_raw = CONFIG.get('next_check')
-                if next_raw:
-                    next_dt = parse_iso_timestamp(next_raw)
-                    if next_dt:
-                        diff = int((next_dt - datetime.now(timezone.utc)).total_seconds())
-                        if diff > 0:
-                            next_check_str = f"in {diff // 60}m {diff % 60}s"
-                        else:
-                            next_check_str = 'Running now'
-            except Exception:
-                pass
-            last_check_str = CONFIG.get('last_check') or 'Not yet'
-            _tg_reply(chat_id, (
-                "📊 <b>Tracker Status</b>\n"
-                "━━━━━━━━━━━━━━━━━━━━━━\n\n"
-                f"✅ Status: <b>{'Running' if CONFIG.get('tracker_enabled', True) else 'Paused'}</b>\n"
-                f"⏱ Uptime: <b>{uptime_str}</b>\n"
-                f"🔍 Total checks: {CONFIG.get('total_checks', 0)}\n"
-                f"📦 Events tracked: {len(seen_data.get('event_ids', []))}\n"
-                f"🆕 New events found: {CONFIG.get('total_new_events', 0)}\n"
-                f"📬 Notifications sent: {CONFIG.get('emails_sent', 0)}\n"
-                f"👥 Subscribers: {sub_count}\n"
-                f"⏰ Interval: Every {CONFIG.get('check_interval_minutes', 15)} min\n"
-                f"🕐 Last check: {last_check_str}\n"
-                f"⏭ Next check: {next_check_str}\n\n"
-                "🌐 <a href=\"https://dubai-fleamarket.com\">View Events →</a>"
-            ))
-
-        elif cmd == '/events':
-            seen_data = load_seen_events()
-            details = seen_data.get('event_details', [])
-            if details:
-                recent = details[-5:][::-1]
-                lines = [f"📋 <b>Recent Events</b> ({len(details)} total tracked)\n━━━━━━━━━━━━━━━━━━━━━━\n"]
-                for i, ev in enumerate(recent, 1):
-                    title = (ev.get('title') or ev.get('name') or 'Untitled')[:55]
-                    link = ev.get('link') or ev.get('url') or ''
-                    date_posted = ev.get('date_posted') or ev.get('date') or ''
-                    first_seen = ev.get('first_seen') or ''
-                    desc = (ev.get('description') or ev.get('excerpt') or '').strip()
-                    # Strip basic HTML tags from description
-                    import re as _re
-                    desc = _re.sub(r'<[^>]+>', '', desc)[:80].strip()
-                    lines.append(f"\n<b>{i}. <a href=\"{link}\">{title}</a></b>")
-                    if date_posted:
-                        lines.append(f"   📅 Posted: {date_posted}")
-                    if first_seen:
-                        lines.append(f"   👁 Detected: {first_seen}")
-                    if desc:
-                        lines.append(f"   📝 {desc}...")
-                    lines.append(f"   🔗 <a href=\"{link}\">Open Event</a>")
-                    if i < len(recent):
-                        lines.append("   ─ ─ ─ ─ ─ ─ ─ ─")
-                lines.append(f"\n━━━━━━━━━━━━━━━━━━━━━━\n🌐 <a href=\"https://dubai-fleamarket.com\">Browse All Events →</a>")
-                _tg_reply(chat_id, '\n'.join(lines))
-            else:
-                _tg_reply(chat_id, "📋 No events tracked yet. The tracker will notify you as soon as one is found!")
-
-        elif cmd == '/uptime':
-            uptime_str = 'Unknown'
-            try:
-                from utils import parse_iso_timestamp
-                start = parse_iso_timestamp(CONFIG.get('uptime_start', ''))
-                if start:
-                    delta = datetime.now(timezone.utc) - start
-                    days = delta.days
-                    hours, rem = divmod(delta.seconds, 3600)
-                    minutes = rem // 60
-                    if days > 0:
-                        uptime_str = f"{days} day{'s' if days != 1 else ''}, {hours}h {minutes}m"
-                    elif hours > 0:
-                        uptime_str = f"{hours}h {minutes}m"
-                    else:
-                        uptime_str = f"{minutes} minute{'s' if minutes != 1 else ''}"
-            except Exception:
-                pass
-            _tg_reply(chat_id, (
-                f"⏱ <b>Bot Uptime</b>\n\n"
-                f"Running for: <b>{uptime_str}</b>\n"
-                f"Total checks done: {CONFIG.get('total_checks', 0)}"
-            ))
-
-        elif cmd == '/next':
-            next_check_str = 'Unknown'
-            try:
-                from utils import parse_iso_timestamp
-                next_raw = CONFIG.get('next_check')
-                if next_raw:
-                    next_dt = parse_iso_timestamp(next_raw)
-                    if next_dt:
-                        diff = int((next_dt - datetime.now(timezone.utc)).total_seconds())
-                        if diff > 0:
-                            next_check_str = f"{diff // 60}m {diff % 60}s"
-                        else:
-                            next_check_str = 'Running right now'
-            except Exception:
-                pass
-            interval = CONFIG.get('check_interval_minutes', 15)
-            _tg_reply(chat_id, (
-                f"⏭ <b>Next Scheduled Check</b>\n\n"
-                f"Next check: <b>{next_check_str}</b>\n"
-                f"Interval: Every {interval} minutes\n"
-                f"Checks done so far: {CONFIG.get('total_checks', 0)}"
-            ))
-
-        elif cmd == '/check':
-            _tg_reply(chat_id, "🔍 Triggering an instant check now...")
-            try:
-                from events import check_for_events
-                import threading as _threading
-                new_before = CONFIG.get('total_new_events', 0)
-                def _run_check():
-                    try:
-                        check_for_events()
-                        new_after = CONFIG.get('total_new_events', 0)
-                        found = new_after - new_before
-                        if found > 0:
-                            _tg_reply(chat_id, f"✅ Check done! Found <b>{found} new event{'s' if found != 1 else ''}</b>. Notifications sent!")
-                        else:
-                            total = CONFIG.get('total_checks', 0)
-                            _tg_reply(chat_id, f"✅ Check done. No new events found. (🔍 {total} total checks run)")
-                    except Exception as _e:
-                        _tg_reply(chat_id, f"⚠️ Check encountered an error: {str(_e)[:80]}")
-                _threading.Thread(target=_run_check, daemon=True).start()
-            except Exception as e:
-                _tg_reply(chat_id, f"⚠️ Could not trigger check: {str(e)[:80]}")
-
-        elif cmd == '/myid':
-            _tg_reply(chat_id, f"🆔 Your Telegram Chat ID is:\n<code>{chat_id}</code>")
-
-        else:
-            _tg_reply(chat_id, (
-                "🤔 Unknown command. Try /help to see available commands."
-            ))
-
+        if COMMANDS.submit(data) == 'full':
+            console_log("⚠️ Telegram command queue full — asking Telegram to redeliver", "warning")
+            return jsonify({'ok': False, 'error': 'busy'}), 503
         return jsonify({'ok': True})
     except Exception as e:
         console_log(f"⚠️ Telegram webhook error: {str(e)[:80]}", "error")
@@ -1030,6 +801,9 @@ def setup_telegram_webhook():
     try:
         if not TELEGRAM_BOT_TOKEN:
             return jsonify({'success': False, 'error': 'Bot token not configured'}), 400
+        if POLLER.running():
+            return jsonify({'success': False,
+                            'error': 'Bot is in long-polling mode (TELEGRAM_INGEST=polling)'}), 409
 
         # Build webhook URL from request host or provided URL
         data = request.get_json(silent=True) or {}
@@ -1040,7 +814,7 @@ def setup_telegram_webhook():
 
         import requests as _req
         resp = _req.post(
-            f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/setWebhook",
+            f"{config.TELEGRAM_API_BASE}/bot{TELEGRAM_BOT_TOKEN}/setWebhook",
             json={'url': webhook_url, 'allowed_updates': ['message']},
             timeout=15,
         )
@@ -1063,9 +837,12 @@ def setup_telegram_webhook():
 def check_now():
     """Trigger an immediate check - requires password."""
     log_activity("⚡ Manual check triggered", "info")
-    thread = threading.Thread(target=check_for_events)
-    thread.start()
-    return jsonify({'success': True, 'message': 'Check triggered'})
+    coalesced = request_check()
+    return jsonify({
+        'success': True,
+        'message': 'Check already pending' if coalesced else 'Check triggered',
+        'coalesced': coalesced,
+    })
 
 
 @app.route('/api/send-heartbeat', methods=['POST'])
@@ -1267,7 +1044,7 @@ def test_new_event():
     console_log("🔄 TEST NEW EVENT: Triggering immediate API check...", "info")
 
     try:
-        check_for_events()
+        run_check()
         console_log("✅ TEST NEW EVENT: Check completed - notification should have been sent", "success")
         log_activity("✅ Test new event notification completed", "success")
 
@@ -1472,12 +1249,11 @@ def get_email_queue():
 @require_admin
 def clear_email_queue():
     """Clear all queued emails."""
-    cleared = len(config.EMAIL_QUEUE)
-    config.EMAIL_QUEUE = []
     try:
-        db_clear_queue()
+        cleared = EMAIL_RETRY_QUEUE.clear()
     except Exception as e:
         console_log(f"⚠️ Failed to clear DB queue: {e}", "warning")
+        cleared = 0
     log_admin_action('email_queue_clear', f"cleared={cleared}")
     return jsonify({'success': True, 'cleared': cleared})
 
@@ -1487,14 +1263,7 @@ def clear_email_queue():
 @require_admin
 def delete_email_queue_item(item_id):
     """Delete a single queued email by id."""
-    removed = False
-    for item in config.EMAIL_QUEUE[:]:
-        if item.get('id') == item_id:
-            config.EMAIL_QUEUE.remove(item)
-            removed = True
-            break
-    if removed:
-        save_email_queue()
+    if EMAIL_RETRY_QUEUE.get(item_id) and EMAIL_RETRY_QUEUE.remove(item_id):
         log_admin_action('email_queue_delete', f"id={item_id}")
         return jsonify({'success': True})
     return jsonify({'success': False, 'message': 'Item not found'}), 404
@@ -1505,25 +1274,19 @@ def delete_email_queue_item(item_id):
 @require_admin
 def retry_email_queue_item(item_id):
     """Retry a single queued email by id."""
-    target = None
-    for item in config.EMAIL_QUEUE:
-        if item.get('id') == item_id:
-            target = item
-            break
+    target = EMAIL_RETRY_QUEUE.get(item_id)
     if not target:
         return jsonify({'success': False, 'message': 'Item not found'}), 404
 
     success, error = send_email_gmail(target.get('subject', ''), target.get('body', ''), target.get('recipient', ''), max_retries=1)
     if success:
-        config.EMAIL_QUEUE.remove(target)
-        save_email_queue()
+        EMAIL_RETRY_QUEUE.remove(item_id)
         log_admin_action('email_queue_retry', f"id={item_id} success")
         return jsonify({'success': True, 'message': 'Email sent'})
 
-    target['attempts'] = target.get('attempts', 0) + 1
-    target['last_error'] = error or 'Send failed'
-    target['next_retry'] = (datetime.now(timezone.utc) + timedelta(minutes=EMAIL_RETRY_INTERVALS[-1])).isoformat()
-    save_email_queue()
+    attempts = target.get('attempts', 0) + 1
+    next_retry = datetime.now(timezone.utc) + timedelta(minutes=retry_delay_minutes(attempts))
+    EMAIL_RETRY_QUEUE.reschedule(target, attempts, next_retry, error or 'Send failed')
     log_admin_action('email_queue_retry', f"id={item_id} failed")
     return jsonify({'success': False, 'message': 'Send failed'})
 
@@ -1693,34 +1456,59 @@ def get_stats():
 @rate_limit
 @require_admin
 def export_logs():
-    """Export activity logs as JSON or CSV."""
+    """Export logs as JSON or CSV.
+
+    With the NDJSON log sink enabled this streams its full history.
+    Query args: ``kind`` (activity [default], console, audit, comma list
+    or ``all``), ``level``, and ``since`` / ``until`` (ISO UTC prefixes).
+    Without the sink it exports the in-memory activity log.
+    """
     format_type = request.args.get('format', 'json')
     console_log(f"📤 Exporting logs as {format_type.upper()}", "info")
 
-    if format_type == 'csv':
-        output = StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['Timestamp', 'Level', 'Message'])
+    if LOG_SINK.enabled:
+        kind_arg = request.args.get('kind', 'activity')
+        kinds = None if kind_arg == 'all' else {k.strip() for k in kind_arg.split(',') if k.strip()}
+        levels = {l.strip() for l in request.args.get('level', '').split(',') if l.strip()} or None
+        records = LOG_SINK.read(since=request.args.get('since') or None, until=request.args.get('until') or None,
+                                kinds=kinds, levels=levels)
+    else:
+        records = ({'timestamp': log.get('timestamp', ''), 'kind': 'activity',
+                    'level': log.get('level', 'info'), 'message': log.get('message', '')}
+                   for log in reversed(config.ACTIVITY_LOGS))
 
-        for log in config.ACTIVITY_LOGS:
-            writer.writerow([
-                log.get('timestamp_formatted', log.get('timestamp', '')),
-                log.get('level', 'info'),
-                log.get('message', '')
-            ])
+    if format_type == 'csv':
+        def generate_csv():
+            output = StringIO()
+            writer = csv.writer(output)
+            writer.writerow(['Timestamp', 'Level', 'Message', 'Kind'])
+            for record in records:
+                writer.writerow([record.get('timestamp', ''), record.get('level', 'info'),
+                                 record.get('message', ''), record.get('kind', '')])
+                if output.tell() > 64 * 1024:
+                    yield output.getvalue()
+                    output.seek(0)
+                    output.truncate()
+            yield output.getvalue()
 
-        response = app.response_class(
-            output.getvalue(),
+        return Response(
+            generate_csv(),
             mimetype='text/csv',
             headers={'Content-Disposition': 'attachment;filename=activity_logs.csv'}
         )
-        return response
-    else:
-        return Response(
-            json.dumps(config.ACTIVITY_LOGS, indent=2),
-            mimetype='application/json',
-            headers={'Content-Disposition': 'attachment;filename=activity_logs.json'}
-        )
+
+    def generate_json():
+        separator = '[\n'
+        for record in records:
+            yield separator + json.dumps(record, ensure_ascii=False)
+            separator = ',\n'
+        yield '[]\n' if separator == '[\n' else '\n]\n'
+
+    return Response(
+        generate_json(),
+        mimetype='application/json',
+        headers={'Content-Disposition': 'attachment;filename=activity_logs.json'}
+    )
 
 
 @app.route('/api/export-events')
@@ -1816,6 +1604,54 @@ def notification_check():
 
 # ===== Consolidated Polling =====
 
+@app.route('/metrics')
+@rate_limit('admin')
+def metrics():
+    """Prometheus text exposition (admin session or METRICS_TOKEN bearer token)."""
+    if not (is_admin() or verify_metrics_token()):
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.route('/api/startup-report')
+@rate_limit
+@require_admin
+def api_startup_report():
+    """Deferred init stages with timings and the critical path, plus startup milestones."""
+    return jsonify(startup_report())
+
+
+@app.route('/api/profiler')
+@rate_limit
+@require_admin
+def api_profiler():
+    """Per-endpoint request timings and recent slow requests."""
+    top = min(max(request.args.get('top', 20, type=int), 1), 100)
+    return jsonify(PROFILER.snapshot(top))
+
+
+@app.route('/api/profiler/profile/<int:profile_id>')
+@rate_limit
+@require_admin
+def api_profiler_profile(profile_id):
+    """cProfile capture of one slow request (plain text)."""
+    captured = PROFILER.profile(profile_id)
+    if not captured:
+        return jsonify({'error': 'Profile not found'}), 404
+    header = f"{captured['path']} ({captured['endpoint']}) — {captured['ms']}ms at {captured['at']}\n\n"
+    return Response(header + captured['text'], mimetype='text/plain')
+
+
+@app.route('/api/profiler/reset', methods=['POST'])
+@rate_limit
+@require_password
+def api_profiler_reset():
+    """Clear request profiler data - requires password."""
+    PROFILER.reset()
+    log_admin_action('profiler_reset', 'Request profiler data cleared')
+    return jsonify({'success': True})
+
+
 @app.route('/api/status-full')
 @rate_limit
 @require_admin
@@ -1854,10 +1690,13 @@ def api_status_full():
         'next_check_seconds': next_check_seconds,
         'next_heartbeat_seconds': next_heartbeat_seconds,
         'checker_running': checker_alive,
+        'scheduled_jobs': SCHEDULER.snapshot(),
+        'check_coordination': get_check_coordination_stats(),
+        'notification_dispatch': get_dispatch_stats(),
         'email_queue': build_email_queue_payload(limit=10),
         'latest_event': get_latest_event_summary(),
         'logs': config.ACTIVITY_LOGS[:20],
-        'console': config.SYSTEM_CONSOLE[:100],
+        'console': get_console_logs(100),
         'check_history': CHECK_HISTORY[:20],
         'diagnostics': {
             **API_DIAGNOSTICS,
@@ -26,6 +26,7 @@ from state import (
     load_email_history, get_all_recipients,
     get_latest_event_summary, build_email_queue_payload,
 )
+from profiler import PROFILER, WINDOW
 
 
 @app.route('/')
@@ -202,6 +203,19 @@ def dashboard():
     )
 
 
+@app.route('/admin/profiler')
+@rate_limit
+@require_admin
+def profiler_page():
+    """Request profiler: slowest endpoints, slow requests, cProfile captures."""
+    top = min(max(request.args.get('top', 20, type=int), 1), 100)
+    return render_template('profiler.html',
+        profile=PROFILER.snapshot(top),
+        window=WINDOW,
+        theme=load_theme_settings().get('theme', 'dark'),
+    )
+
+
 @app.route('/health')
 def health():
     """Health check endpoint for UptimeRobot - no rate limit."""
@@ -0,0 +1,219 @@
+"""
+=============================================================================
+🌐 DUBAI FLEA MARKET TRACKER — Background Job Scheduler
+=============================================================================
+A single priority queue of timed jobs (check, heartbeat, daily summary,
+queue retry, prune). The owning thread sleeps until the earliest deadline
+instead of waking every second, and can be woken explicitly when a job
+must run early (e.g. a manual "check now").
+
+Also provides ``SingleFlight`` so concurrent callers of the same job share
+one execution instead of racing each other.
+
+Has NO dependency on the rest of the app so it can be imported anywhere.
+=============================================================================
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+
+class Scheduler:
+    """Min-heap of named job deadlines with explicit wakeup.
+
+    Each job name has at most one live deadline. Rescheduling a job pushes a
+    new heap entry and invalidates the old one (lazy deletion), so both
+    ``schedule`` and ``next_due`` stay O(log n).
+    """
+
+    def __init__(self, stop_event: threading.Event | None = None):
+        self._heap = []
+        self._deadlines = {}  # name -> (deadline, seq) of the live entry
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stop = stop_event or threading.Event()
+
+    # ----- Scheduling -----
+
+    def schedule(self, name: str, delay_seconds: float = 0) -> None:
+        """(Re)schedule ``name`` to run ``delay_seconds`` from now."""
+        self.schedule_at(name, time.monotonic() + max(0.0, delay_seconds))
+
+    def schedule_at(self, name: str, deadline: float) -> None:
+        """(Re)schedule ``name`` at an absolute ``time.monotonic()`` deadline."""
+        with self._cond:
+            entry = (deadline, next(self._seq), name)
+            self._deadlines[name] = entry[:2]
+            heapq.heappush(self._heap, entry)
+            self._cond.notify_all()
+
+    def schedule_earlier(self, name: str, delay_seconds: float = 0) -> None:
+        """Move ``name`` forward to ``delay_seconds`` from now, never later."""
+        deadline = time.monotonic() + max(0.0, delay_seconds)
+        with self._cond:
+            current = self._deadlines.get(name)
+            if current is not None and current[0] <= deadline:
+                return
+            self.schedule_at(name, deadline)
+
+    def wake(self, name: str) -> None:
+        """Make ``name`` due immediately and wake the waiting thread."""
+        self.schedule(name, 0)
+
+    def cancel(self, name: str) -> None:
+        """Drop the live deadline for ``name`` (if any)."""
+        with self._cond:
+            self._deadlines.pop(name, None)
+
+    def stop(self) -> None:
+        """Signal the scheduler loop to exit and wake it."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    # ----- Consuming -----
+
+    def _discard_stale(self) -> None:
+        while self._heap:
+            deadline, seq, name = self._heap[0]
+            if self._deadlines.get(name) == (deadline, seq):
+                return
+            heapq.heappop(self._heap)
+
+    def next_due(self) -> str | None:
+        """Block until a job is due, then pop and return its name.
+
+        Returns None once the stop event is set. The job is removed from the
+        schedule; the caller is responsible for rescheduling it.
+        """
+        with self._cond:
+            while not self._stop.is_set():
+                self._discard_stale()
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                deadline, _, name = self._heap[0]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    heapq.heappop(self._heap)
+                    del self._deadlines[name]
+                    return name
+                self._cond.wait(timeout=remaining)
+            return None
+
+    # ----- Introspection -----
+
+    def seconds_until(self, name: str) -> float | None:
+        """Seconds until ``name`` is due, or None if not scheduled."""
+        with self._cond:
+            current = self._deadlines.get(name)
+        if current is None:
+            return None
+        return max(0.0, current[0] - time.monotonic())
+
+    def snapshot(self) -> dict:
+        """Return ``{job_name: seconds_until_due}`` for the dashboard."""
+        now = time.monotonic()
+        with self._cond:
+            return {name: round(max(0.0, d - now), 1)
+                    for name, (d, _) in sorted(self._deadlines.items(), key=lambda kv: kv[1])}
+
+
+class _Flight:
+    """One in-progress call shared by its leader and any attached waiters."""
+
+    __slots__ = ('done', 'result', 'error', 'waiters', 'callbacks', 'started')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+        self.callbacks = []
+        self.started = time.monotonic()
+
+
+class SingleFlight:
+    """Collapse concurrent calls of the same function into one execution.
+
+    The first caller (the leader) runs the function; callers that arrive
+    while it is running block on, and share, the leader's result (or its
+    exception) instead of running the function again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flight = None
+        self._stats = {
+            'runs': 0,
+            'coalesced': 0,
+            'waiters': 0,
+            'max_waiters': 0,
+            'last_duration_ms': 0,
+        }
+
+    def in_flight(self) -> bool:
+        return self._flight is not None
+
+    def do(self, fn, *args, **kwargs):
+        """Run ``fn`` unless a call is already in flight; then share its outcome."""
+        with self._lock:
+            flight = self._flight
+            leader = flight is None
+            if leader:
+                flight = self._flight = _Flight()
+                self._stats['runs'] += 1
+            else:
+                flight.waiters += 1
+                self._stats['coalesced'] += 1
+                self._stats['waiters'] += 1
+                self._stats['max_waiters'] = max(self._stats['max_waiters'], flight.waiters)
+
+        if not leader:
+            flight.done.wait()
+            with self._lock:
+                self._stats['waiters'] -= 1
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn(*args, **kwargs)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flight = None
+                self._stats['last_duration_ms'] = int((time.monotonic() - flight.started) * 1000)
+                callbacks = flight.callbacks[:]
+            flight.done.set()
+            for callback in callbacks:
+                try:
+                    callback(flight.result if flight.error is None else None)
+                except Exception as e:
+                    from utils import console_log  # Late import: keeps this module app-independent
+                    console_log(f"⚠️ SingleFlight callback {getattr(callback, '__name__', callback)!s} failed: {e}", "error")
+
+    def attach(self, callback) -> bool:
+        """Register ``callback(result)`` on the in-flight call, if any.
+
+        Returns False when nothing is in flight (the callback is not kept).
+        """
+        with self._lock:
+            if self._flight is None:
+                return False
+            self._flight.callbacks.append(callback)
+            self._stats['coalesced'] += 1
+            return True
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = self._flight is not None
+            stats['in_flight_ms'] = (int((time.monotonic() - self._flight.started) * 1000)
+                                     if self._flight is not None else 0)
+        return stats
@@ -4,31 +4,62 @@
 =============================================================================
 Simple entry point that starts waitress FIRST, then kicks off background
 work.  Waitress binds the port immediately — Render sees it alive.
+
+Startup is profiled (startup.py): module import times while the app
+loads, then ``server_ready`` once the port is bound — the deferred
+background work in app.py waits for that instead of a fixed sleep — and
+the time to the first response. Set STARTUP_PROFILE=false to skip the
+import timer.
 =============================================================================
 """
 
 import os
+import signal
 import sys
 
+import startup  # First: starts the process clock
+
 
 def main():
     port = int(os.environ.get('PORT', 10000))
     print(f"[SERVER] Starting on 0.0.0.0:{port} ...")
     sys.stdout.flush()
 
+    startup.expect_server()
+    profile_imports = os.environ.get('STARTUP_PROFILE', 'true').lower() != 'false'
+    if profile_imports:
+        startup.IMPORT_TIMER.install()
+
     # Import app AFTER printing — so if import hangs, we at least see the log
     from app import app
 
-    print(f"[SERVER] App imported — serving on http://0.0.0.0:{port}")
+    startup.IMPORT_TIMER.uninstall()
+    startup.milestone('app_imported')
+    print(f"[SERVER] App imported in {startup.elapsed_ms():.0f}ms — serving on http://0.0.0.0:{port}")
+    if profile_imports:
+        imports = startup.import_report(top=5)
+        slowest = ', '.join(f"{r['module']} {r['cumulative_ms']:.0f}ms" for r in imports['top_cumulative'][1:])
+        print(f"[SERVER] Imported {imports['modules']} modules in {imports['total_ms']:.0f}ms (slowest: {slowest})")
     sys.stdout.flush()
 
     try:
-        from waitress import serve
-        serve(app, host='0.0.0.0', port=port, threads=4)
+        from waitress import create_server
     except ImportError:
         print("[SERVER] waitress not installed — using Flask dev server")
         sys.stdout.flush()
+        startup.mark_server_ready()  # app.run binds within milliseconds
         app.run(host='0.0.0.0', port=port, debug=False)
+        return
+
+    # Render stops the service with SIGTERM: exit normally so atexit hooks
+    # (state snapshot, log flush) run
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    server = create_server(app, host='0.0.0.0', port=port, threads=4)  # Binds the port
+    startup.mark_server_ready()
+    print(f"[SERVER] Listening after {startup.elapsed_ms():.0f}ms")
+    sys.stdout.flush()
+    server.run()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,226 @@
+"""
+=============================================================================
+🌐 DUBAI FLEA MARKET TRACKER — Startup State Snapshot
+=============================================================================
+Warm restarts: a compact JSON snapshot of the in-memory state is written
+to ``STATE_SNAPSHOT_PATH`` every ``SNAPSHOT_INTERVAL_MINUTES`` (scheduler
+job ``snapshot`` in events.py) and when the process exits.
+
+  * counters, notification toggles, activity / admin-audit logs, event
+    statistics, recipient status, the console tail and the newest seen
+    event IDs
+  * ``load_snapshot()`` runs while app.py is imported — a few ms of JSON
+    instead of several DB round trips — so the dashboard has data on the
+    very first request after a cold start
+  * the DB stays the source of truth: the deferred init stages in app.py
+    reload everything in the background, keep the higher of the snapshot /
+    DB counters and only keep seeded seen IDs the DB confirms
+    (``reconcile_seen_ids``), then call ``mark_reconciled()``
+
+Writes are atomic (temp file + ``os.replace``). A missing, unreadable or
+wrong-version snapshot is ignored. Set ``STATE_SNAPSHOT_PATH`` to an empty
+string to disable.
+=============================================================================
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+
+import config
+from config import CONFIG
+from utils import console_log
+from state import recent_seen_ids, remember_seen_ids, forget_seen_ids, filter_seen_event_ids
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SEEN_IDS = 1000  # Newest seen event IDs kept in the snapshot
+
+COUNTER_KEYS = ('total_checks', 'total_new_events', 'emails_sent', 'telegram_messages_sent')
+CONFIG_KEYS = COUNTER_KEYS + (
+    'last_check', 'last_daily_summary_sent_at', 'last_daily_summary_recipient_count',
+    'telegram_notifications_enabled', 'email_notifications_enabled',
+)
+
+_lock = threading.Lock()  # One writer at a time (scheduler job vs. atexit)
+_status = {
+    'loaded': False, 'loaded_from': None, 'load_ms': None, 'saved_at_loaded': None,
+    'reconciled': False, 'reconcile_ms': None, 'seeded_seen_ids': 0,
+    'saves': 0, 'last_save_at': None, 'last_save_ms': None, 'last_save_bytes': 0,
+    'errors': 0, 'last_error': None,
+}
+_seeded_ids = []
+_atexit_registered = False
+
+
+def _path() -> str:
+    return config.STATE_SNAPSHOT_PATH
+
+
+def _error(message: str) -> None:
+    _status['errors'] += 1
+    _status['last_error'] = message[:200]
+
+
+# ===== Save =====
+
+def build_snapshot() -> dict:
+    """Current in-memory state as a JSON-serializable dict."""
+    return {
+        'version': SNAPSHOT_VERSION,
+        'saved_at': time.time(),
+        'config': {key: CONFIG.get(key) for key in CONFIG_KEYS},
+        'activity_logs': list(config.ACTIVITY_LOGS),
+        'admin_audit_logs': list(config.ADMIN_AUDIT_LOGS),
+        'event_stats': config.EVENT_STATS,
+        'recipient_status': config.RECIPIENT_STATUS,
+        'console': [list(line) for line in list(config.SYSTEM_CONSOLE)],
+        'seen_ids': recent_seen_ids(SNAPSHOT_SEEN_IDS),
+    }
+
+
+def save_snapshot() -> bool:
+    """Write the snapshot atomically. Returns True on success."""
+    path = _path()
+    if not path:
+        return False
+    start = time.perf_counter()
+    with _lock:
+        try:
+            data = json.dumps(build_snapshot(), ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except (OSError, TypeError, ValueError, RuntimeError) as e:  # RuntimeError: dict resized mid-dump
+            _error(str(e))
+            console_log(f"⚠️ State snapshot save failed: {e}", "warning")
+            return False
+        _status['saves'] += 1
+        _status['last_save_at'] = time.time()
+        _status['last_save_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        _status['last_save_bytes'] = len(data)
+    return True
+
+
+def _save_at_exit() -> None:
+    save_snapshot()
+
+
+# ===== Load =====
+
+def load_snapshot() -> bool:
+    """Apply the snapshot on disk to the in-memory state (no DB access).
+
+    Also registers the exit-time save, so only the app process writes
+    snapshots. Returns True if a snapshot was applied.
+    """
+    global _atexit_registered
+    path = _path()
+    if not path:
+        return False
+    if not _atexit_registered:
+        atexit.register(_save_at_exit)
+        _atexit_registered = True
+
+    start = time.perf_counter()
+    try:
+        with open(path, 'rb') as f:
+            snap = json.loads(f.read())
+    except FileNotFoundError:
+        return False
+    except (OSError, ValueError) as e:
+        _error(str(e))
+        console_log(f"⚠️ State snapshot unreadable, ignoring: {e}", "warning")
+        return False
+    if not isinstance(snap, dict) or snap.get('version') != SNAPSHOT_VERSION:
+        console_log("⚠️ State snapshot has an unknown version, ignoring", "warning")
+        return False
+
+    try:
+        _apply(snap)
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        _error(str(e))
+        console_log(f"⚠️ State snapshot could not be applied: {e}", "warning")
+        return False
+
+    _status['loaded'] = True
+    _status['loaded_from'] = path
+    _status['saved_at_loaded'] = snap.get('saved_at')
+    _status['load_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    age = time.time() - (snap.get('saved_at') or time.time())
+    console_log(f"💾 State snapshot loaded in {_status['load_ms']}ms "
+                f"({age / 60:.0f} min old, {len(_seeded_ids)} seen IDs)", "success")
+    return True
+
+
+def _apply(snap: dict) -> None:
+    for key, value in (snap.get('config') or {}).items():
+        if key in CONFIG_KEYS and value is not None:
+            CONFIG[key] = value
+    config.ACTIVITY_LOGS = list(snap.get('activity_logs') or [])[:config.MAX_LOGS]
+    config.ADMIN_AUDIT_LOGS = list(snap.get('admin_audit_logs') or [])[:config.MAX_ADMIN_AUDIT]
+    stats = snap.get('event_stats') or {}
+    for period in ('daily', 'hourly'):
+        if isinstance(stats.get(period), dict):
+            config.EVENT_STATS[period] = stats[period]
+    if isinstance(snap.get('recipient_status'), dict):
+        config.RECIPIENT_STATUS = snap['recipient_status']
+
+    # Older console lines go before the ones this process has logged so far
+    current = list(config.SYSTEM_CONSOLE)
+    config.SYSTEM_CONSOLE.clear()
+    config.SYSTEM_CONSOLE.extend(tuple(line) for line in snap.get('console') or [] if len(line) == 3)
+    config.SYSTEM_CONSOLE.extend(current)
+
+    _seeded_ids[:] = [eid for eid in snap.get('seen_ids') or [] if isinstance(eid, int)]
+    remember_seen_ids(_seeded_ids)
+    _status['seeded_seen_ids'] = len(_seeded_ids)
+
+
+# ===== Reconcile =====
+
+def reconcile_counters(db_status: dict) -> None:
+    """Keep the higher of the snapshot and DB counters (both only grow)."""
+    for key in COUNTER_KEYS:
+        value = db_status.get(key)
+        if value is None:
+            continue
+        try:
+            CONFIG[key] = max(int(value), int(CONFIG.get(key) or 0))
+        except (ValueError, TypeError):
+            pass
+
+
+def reconcile_seen_ids() -> int:
+    """Drop seeded seen IDs the DB does not have (e.g. the DB was reset).
+
+    Returns the number dropped. Must run before the first check.
+    """
+    if not _seeded_ids:
+        return 0
+    seeded = set(_seeded_ids)
+    forget_seen_ids(seeded)
+    confirmed = filter_seen_event_ids(seeded)  # Re-adds what the DB confirms
+    _seeded_ids.clear()
+    return len(seeded) - len(confirmed)
+
+
+def mark_reconciled(started: float) -> None:
+    """Called by app.py once the DB state has replaced the snapshot."""
+    _status['reconciled'] = True
+    _status['reconcile_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+
+def snapshot_status() -> dict:
+    """Snapshot settings and load / save timings (diagnostics)."""
+    return {
+        'path': _path(),
+        'enabled': bool(_path()),
+        'interval_minutes': config.SNAPSHOT_INTERVAL_MINUTES,
+        **_status,
+    }
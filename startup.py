@@ -0,0 +1,315 @@
+"""
+=============================================================================
+🌐 DUBAI FLEA MARKET TRACKER — Startup Profiling & Readiness
+=============================================================================
+Cold-start instrumentation for server.py (Render free tier spins the
+service down, so every first visit pays for the boot):
+
+  * ``ImportTimer`` — a ``sys.meta_path`` hook installed before the app is
+    imported; records self / cumulative time per module like
+    ``python -X importtime`` (``import_report()``)
+  * ``SERVER_READY`` — set once the WSGI server has bound its port; the
+    deferred startup in app.py waits on it instead of sleeping
+  * milestones in ms since the process clock started (``app_imported``,
+    ``server_ready``, ``first_response`` = time to first byte, ...)
+  * ``StartupGraph`` — the deferred init stages with their dependencies;
+    independent stages run concurrently (``STARTUP_PARALLELISM`` at a
+    time) and each is timed, so the report shows the critical path
+
+Reported under ``startup`` in /api/diagnostics and /api/startup-report.
+Stdlib only and must not import the app (it has to load before
+everything it measures).
+=============================================================================
+"""
+
+import os
+import sys
+import threading
+import time
+
+PROCESS_START = time.perf_counter()
+STARTED_AT = time.time()
+
+SERVER_READY = threading.Event()
+SERVER_READY_TIMEOUT = 30  # Seconds deferred startup waits for the port before going ahead anyway
+STARTUP_PARALLELISM = max(1, int(os.environ.get('STARTUP_PARALLELISM', '4')))  # Init stages running at once
+
+_milestones = {}  # name -> ms since PROCESS_START (first occurrence wins)
+_expect_server = False
+_first_response_path = None
+
+
+def elapsed_ms() -> float:
+    return (time.perf_counter() - PROCESS_START) * 1000
+
+
+def milestone(name: str) -> None:
+    """Record the first time ``name`` is reached."""
+    _milestones.setdefault(name, round(elapsed_ms(), 1))
+
+
+# ===== Readiness =====
+
+def expect_server() -> None:
+    """Called by server.py: background work should wait for the port to be bound."""
+    global _expect_server
+    _expect_server = True
+
+
+def mark_server_ready() -> None:
+    milestone('server_ready')
+    SERVER_READY.set()
+
+
+def wait_until_serving(timeout: float = SERVER_READY_TIMEOUT) -> bool:
+    """Block until the server is listening. Returns False on timeout.
+
+    Without server.py (``python app.py``, tests, another WSGI host that binds
+    before importing the app) there is nothing to wait for.
+    """
+    if not _expect_server:
+        return True
+    return SERVER_READY.wait(timeout)
+
+
+def record_first_response(path: str) -> None:
+    """Time to first byte: process start → first response leaves the app."""
+    global _first_response_path
+    if 'first_response' not in _milestones:
+        milestone('first_response')
+        _first_response_path = path
+
+
+# ===== Import timing =====
+
+class _TimedLoader:
+    """Wraps a module's loader while it executes; restored afterwards."""
+
+    def __init__(self, loader, timer: 'ImportTimer'):
+        self._loader = loader
+        self._timer = timer
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        spec = module.__spec__
+        spec.loader = self._loader  # Code running at import time sees the real loader
+        module.__loader__ = self._loader
+        self._timer._enter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._timer._exit(module.__name__)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class ImportTimer:
+    """``sys.meta_path`` finder that times every module executed while installed."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.records = []  # (name, self_ms, cumulative_ms, depth) in completion order
+
+    def install(self) -> 'ImportTimer':
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+        return self
+
+    def uninstall(self) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self:
+                continue
+            find = getattr(finder, 'find_spec', None)
+            spec = find(name, path, target) if find else None
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimedLoader(spec.loader, self)
+                return spec
+        return None
+
+    def _enter(self) -> None:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append([time.perf_counter(), 0.0])
+
+    def _exit(self, name: str) -> None:
+        stack = self._local.stack
+        start, children = stack.pop()
+        cumulative = time.perf_counter() - start
+        if stack:
+            stack[-1][1] += cumulative
+        with self._lock:
+            self.records.append((name, (cumulative - children) * 1000, cumulative * 1000, len(stack)))
+
+    def report(self, top: int = 25) -> dict:
+        with self._lock:
+            records = list(self.records)
+        roots = [r for r in records if r[3] == 0]
+        by_cumulative = sorted(records, key=lambda r: r[2], reverse=True)[:top]
+        by_self = sorted(records, key=lambda r: r[1], reverse=True)[:top]
+
+        def row(r):
+            return {'module': r[0], 'self_ms': round(r[1], 1), 'cumulative_ms': round(r[2], 1)}
+
+        return {
+            'modules': len(records),
+            'total_ms': round(sum(r[2] for r in roots), 1),
+            'top_cumulative': [row(r) for r in by_cumulative],
+            'top_self': [row(r) for r in by_self],
+        }
+
+
+IMPORT_TIMER = ImportTimer()
+
+
+def import_report(top: int = 25) -> dict:
+    return IMPORT_TIMER.report(top)
+
+
+# ===== Init stage graph =====
+
+class _Stage:
+    __slots__ = ('name', 'fn', 'after', 'resource', 'done', 'ready_ms', 'start_ms', 'end_ms', 'status', 'error')
+
+    def __init__(self, name: str, fn, after: tuple, resource: str | None):
+        self.name = name
+        self.fn = fn
+        self.after = after
+        self.resource = resource
+        self.done = threading.Event()
+        self.ready_ms = self.start_ms = self.end_ms = None
+        self.status = 'pending'
+        self.error = None
+
+
+class StartupGraph:
+    """Init stages with dependencies, run as soon as their dependencies finish.
+
+    A stage only names stages declared before it, so the graph cannot have
+    cycles. Stages naming the same ``resource`` (e.g. ``'db'`` for the one
+    shared connection) never overlap; the rest run up to ``parallelism``
+    at a time. A failing stage is logged through ``on_error`` and its
+    dependents still run — the same as the old sequential try/except
+    blocks — so one broken integration cannot block the checker.
+    """
+
+    def __init__(self, parallelism: int = STARTUP_PARALLELISM, on_error=None):
+        self._stages = {}
+        self._resources = {}  # resource name -> Lock
+        self._slots = threading.Semaphore(parallelism)
+        self._on_error = on_error
+        self.parallelism = parallelism
+        self.started_ms = self.finished_ms = None
+
+    def stage(self, name: str, fn, after=(), resource: str | None = None) -> None:
+        unknown = [dep for dep in after if dep not in self._stages]
+        if name in self._stages or unknown:
+            raise ValueError(f"startup stage {name!r}: duplicate or unknown dependencies {unknown}")
+        if resource is not None:
+            self._resources.setdefault(resource, threading.Lock())
+        self._stages[name] = _Stage(name, fn, tuple(after), resource)
+
+    def run(self) -> None:
+        """Run every stage (one thread each) and block until all have finished."""
+        self.started_ms = round(elapsed_ms(), 1)
+        threads = [threading.Thread(target=self._run_stage, args=(s,), daemon=True, name=f"init-{s.name}")
+                   for s in self._stages.values()]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.finished_ms = round(elapsed_ms(), 1)
+
+    def _run_stage(self, stage: _Stage) -> None:
+        for dep in stage.after:
+            self._stages[dep].done.wait()
+        stage.ready_ms = round(elapsed_ms(), 1)
+        resource = self._resources.get(stage.resource)
+        if resource is not None:
+            resource.acquire()  # Before a slot: waiting for the resource must not block other stages
+        try:
+            with self._slots:
+                stage.start_ms = round(elapsed_ms(), 1)
+                stage.status = 'running'
+                try:
+                    stage.fn()
+                    stage.status = 'ok'
+                except Exception as e:
+                    stage.status = 'error'
+                    stage.error = str(e)[:200]
+                    if self._on_error:
+                        self._on_error(stage.name, e)
+                finally:
+                    stage.end_ms = round(elapsed_ms(), 1)
+        finally:
+            if resource is not None:
+                resource.release()
+            stage.done.set()
+
+    def critical_path(self) -> list:
+        """Walk back from the last stage to finish through its latest-finishing dependency."""
+        finished = [s for s in self._stages.values() if s.end_ms is not None]
+        if not finished:
+            return []
+        stage = max(finished, key=lambda s: s.end_ms)
+        path = [stage]
+        while stage.after:
+            stage = max((self._stages[dep] for dep in stage.after), key=lambda s: s.end_ms or 0)
+            path.append(stage)
+        return [s.name for s in reversed(path)]
+
+    def report(self) -> dict:
+        stages = []
+        for s in self._stages.values():
+            duration = round(s.end_ms - s.start_ms, 1) if s.end_ms is not None else None
+            queued = round(s.start_ms - s.ready_ms, 1) if s.start_ms is not None else None
+            stages.append({
+                'name': s.name, 'after': list(s.after), 'resource': s.resource,
+                'status': s.status, 'error': s.error,
+                'ready_ms': s.ready_ms, 'start_ms': s.start_ms, 'end_ms': s.end_ms,
+                'duration_ms': duration, 'queued_ms': queued,
+            })
+        path = self.critical_path()
+        durations = {row['name']: row['duration_ms'] or 0 for row in stages}
+        wall = round(self.finished_ms - self.started_ms, 1) if self.finished_ms is not None else None
+        return {
+            'parallelism': self.parallelism,
+            'started_ms': self.started_ms,
+            'finished_ms': self.finished_ms,
+            'wall_ms': wall,
+            'serial_ms': round(sum(durations.values()), 1),  # What the old one-after-another startup would take
+            'critical_path': path,
+            'critical_path_ms': round(sum(durations[name] for name in path), 1),
+            'stages': sorted(stages, key=lambda r: (r['start_ms'] is None, r['start_ms'] or 0)),
+        }
+
+
+_graph = None
+
+
+def run_graph(graph: StartupGraph) -> None:
+    """Run the deferred init graph and keep it for the startup report."""
+    global _graph
+    _graph = graph
+    graph.run()
+
+
+def startup_report() -> dict:
+    """Milestones, readiness, init stages and the import breakdown (diagnostics)."""
+    return {
+        'started_at': STARTED_AT,
+        'server_ready': SERVER_READY.is_set(),
+        'milestones_ms': dict(_milestones),
+        'first_response_path': _first_response_path,
+        'init': _graph.report() if _graph is not None else None,
+        'imports': import_report(top=15),
+    }
@@ -10,7 +10,9 @@ prevent circular imports.
 =============================================================================
 """
 
+import hashlib
 import json
+import time
 from datetime import datetime, timezone
 
 import config
@@ -21,18 +23,44 @@ from utils import (
 )
 from db import (
     db_load_seen_events, db_save_seen_events_bulk,
+    db_filter_seen_event_ids, db_get_seen_event_count,
+    db_save_seen_events_with_outbox,
     db_load_status, db_save_status, db_get_status, db_set_status,
     db_get_logs,
     db_add_email_history, db_get_email_history,
-    db_get_queue, db_add_to_queue, db_update_queue_item,
-    db_remove_from_queue, db_clear_queue, db_get_queue_count,
-    db_record_stat, db_get_stats,
+    db_record_stat, db_get_stats, db_prune_stats,
     db_get_audit_logs,
 )
+from retry_queue import EMAIL_RETRY_QUEUE
 
 
 # ===== Seen Events =====
 
+# Event IDs known to be in seen_events. Seen events are never un-seen, so
+# a hit needs no DB round trip; seeded from the startup snapshot.
+SEEN_ID_CACHE_MAX = 5000
+_seen_id_cache = set()
+
+
+def remember_seen_ids(event_ids) -> None:
+    """Add IDs known to be in seen_events to the cache (keeps the newest)."""
+    _seen_id_cache.update(eid for eid in event_ids if isinstance(eid, int) and eid > 0)
+    if len(_seen_id_cache) > 2 * SEEN_ID_CACHE_MAX:
+        newest = sorted(_seen_id_cache)[-SEEN_ID_CACHE_MAX:]
+        _seen_id_cache.clear()
+        _seen_id_cache.update(newest)
+
+
+def forget_seen_ids(event_ids) -> None:
+    """Drop IDs from the cache (they will be looked up in the DB again)."""
+    _seen_id_cache.difference_update(event_ids)
+
+
+def recent_seen_ids(limit: int = 1000) -> list:
+    """Newest cached seen IDs (for the startup snapshot)."""
+    return sorted(_seen_id_cache)[-limit:]
+
+
 def load_seen_events() -> dict:
     """Load seen events from database."""
     try:
@@ -42,15 +70,66 @@ def load_seen_events() -> dict:
         return {'event_ids': [], 'event_details': []}
 
 
+def filter_seen_event_ids(event_ids) -> set:
+    """IDs from ``event_ids`` that are already in the seen-events database."""
+    event_ids = list(event_ids)
+    known = {eid for eid in event_ids if eid in _seen_id_cache}
+    unknown = [eid for eid in event_ids if eid not in known]
+    if not unknown:
+        return known
+    try:
+        found = db_filter_seen_event_ids(unknown)
+    except Exception as e:
+        console_log(f"\u26a0\ufe0f Failed to look up seen events in DB: {e}", "warning")
+        return known
+    remember_seen_ids(found)
+    return known | found
+
+
+def get_seen_event_count() -> int:
+    try:
+        return db_get_seen_event_count()
+    except Exception:
+        return 0
+
+
 def save_seen_events(seen_data: dict) -> None:
     """Save seen events to database."""
     try:
         db_save_seen_events_bulk(seen_data)
+        remember_seen_ids(d.get('id') for d in seen_data.get('event_details', []))
     except Exception as e:
         console_log(f"\u26a0\ufe0f Failed to save events to DB: {e}", "warning")
         log_activity(f"Failed to save events: {e}", "error")
 
 
+def save_seen_events_with_outbox(seen_data: dict, new_events: list, telegram: bool = True) -> str | None:
+    """Save seen events and queue their deliveries atomically.
+
+    Writes one outbox row for the Telegram fan-out (only if ``telegram``,
+    i.e. Telegram alerts are on and configured) and one per enabled email
+    recipient. Returns the batch ID, or None (nothing saved) if the
+    transaction failed, so the events are detected again on the next check
+    instead of being lost.
+    """
+    prep_start = time.perf_counter()
+    ids = ','.join(str(e['id']) for e in sorted(new_events, key=lambda e: e['id']))
+    batch_id = hashlib.sha1(ids.encode()).hexdigest()[:12]
+    deliveries = [('telegram', '')] if telegram else []
+    if CONFIG.get('email_notifications_enabled', True):
+        deliveries += [('email', email) for email in get_recipients()]
+    payload = json.dumps(new_events)
+    record_dispatch_prep((time.perf_counter() - prep_start) * 1000)
+    try:
+        db_save_seen_events_with_outbox(seen_data, batch_id, payload, deliveries)
+        remember_seen_ids(e['id'] for e in new_events)
+        return batch_id
+    except Exception as e:
+        console_log(f"\u26a0\ufe0f Failed to save events + outbox to DB: {e}", "error")
+        log_activity(f"Failed to save events: {e}", "error")
+        return None
+
+
 # ===== Tracker Status =====
 
 def load_status():
@@ -104,6 +183,14 @@ def record_stat(stat_type, value=1):
         console_log(f"\u26a0\ufe0f Failed to record stat: {e}", "warning")
 
 
+def prune_event_stats():
+    """Drop stats rows older than the chart windows (30 days / 48 hours)."""
+    try:
+        db_prune_stats()
+    except Exception as e:
+        console_log(f"\u26a0\ufe0f Failed to prune stats: {e}", "warning")
+
+
 # ===== Activity Logs =====
 
 def load_logs():
@@ -184,33 +271,50 @@ def save_theme_settings(settings):
 
 # ===== Recipient Status =====
 
-def load_recipient_status():
-    """Load recipient enabled/disabled status from DB."""
+def _recipient_status() -> dict:
+    """Cached recipient status (shared, do not mutate). Loads from DB once."""
+    if config.RECIPIENT_STATUS is not None:
+        config.RECIPIENT_CACHE_STATS['cache_hits'] += 1
+        return config.RECIPIENT_STATUS
+    status = None
     try:
         raw = db_get_status('recipient_status')
+        config.RECIPIENT_CACHE_STATS['db_loads'] += 1
         if raw:
-            return json.loads(raw)
+            status = json.loads(raw)
     except Exception:
         pass
-    # Initialize all recipients as enabled
-    status = {}
-    for email in get_all_recipients():
-        status[email] = {'enabled': True}
-    save_recipient_status(status)
+    if status is None:
+        # Initialize all recipients as enabled
+        status = {email: {'enabled': True} for email in get_all_recipients()}
+        save_recipient_status(status)
+    config.RECIPIENT_STATUS = status
     return status
 
 
+def load_recipient_status(refresh: bool = False):
+    """Load recipient enabled/disabled status (from cache unless ``refresh``).
+
+    Returns a copy, so callers may edit it and pass it to
+    ``save_recipient_status``.
+    """
+    if refresh:
+        config.RECIPIENT_STATUS = None
+    return {email: dict(entry) for email, entry in _recipient_status().items()}
+
+
 def save_recipient_status(status):
-    """Save recipient status to DB."""
+    """Save recipient status to DB and update the cache (write-through)."""
     try:
         db_set_status('recipient_status', json.dumps(status))
+        config.RECIPIENT_STATUS = {email: dict(entry) for email, entry in status.items()}
     except Exception as e:
         console_log(f"Failed to save recipient status: {e}", "error")
 
 
-def is_recipient_enabled(email):
+def is_recipient_enabled(email, status: dict | None = None):
     """Check if recipient is enabled."""
-    status = load_recipient_status()
+    status = _recipient_status() if status is None else status
     return status.get(email, {}).get('enabled', True)
 
 
@@ -224,9 +328,17 @@ def get_all_recipients() -> list:
 
 
 def get_recipients() -> list:
-    """Get enabled recipients only."""
-    all_recipients = get_all_recipients()
-    return [e for e in all_recipients if is_recipient_enabled(e)]
+    """Get enabled recipients only (one status lookup for the whole list)."""
+    status = _recipient_status()
+    return [e for e in get_all_recipients() if is_recipient_enabled(e, status)]
+
+
+def record_dispatch_prep(elapsed_ms: float) -> None:
+    """Record how long it took to prepare a dispatch (recipients + payload)."""
+    stats = config.RECIPIENT_CACHE_STATS
+    stats['preps'] += 1
+    stats['last_prep_ms'] = round(elapsed_ms, 3)
+    stats['avg_prep_ms'] = round(stats['avg_prep_ms'] + (elapsed_ms - stats['avg_prep_ms']) / stats['preps'], 3)
 
 
 # ===== Admin Audit =====
@@ -239,9 +351,9 @@ def load_admin_audit_on_startup():
 # ===== Email Queue =====
 
 def load_email_queue():
-    """Load email queue from database."""
+    """Load the email retry heap from the database."""
     try:
-        config.EMAIL_QUEUE = db_get_queue()
+        EMAIL_RETRY_QUEUE.load()
         console_log(f"📬 Email queue loaded: {len(config.EMAIL_QUEUE)} pending emails", "debug")
     except Exception as e:
         console_log(f"\u26a0\ufe0f Failed to load email queue: {e}", "warning")
@@ -249,16 +361,16 @@ def load_email_queue():
 
 
 def save_email_queue():
-    """Sync in-memory queue with database."""
+    """Re-mirror the in-memory retry heap from the database."""
     try:
-        config.EMAIL_QUEUE = db_get_queue()
+        EMAIL_RETRY_QUEUE.load()
     except Exception as e:
         console_log(f"\u26a0\ufe0f Failed to sync email queue: {e}", "warning")
 
 
 def build_email_queue_payload(limit=None):
-    """Return a safe, UI-ready email queue payload (DB-backed)."""
-    items = db_get_queue()
+    """Return a safe, UI-ready email queue payload (from the in-memory heap)."""
+    items = EMAIL_RETRY_QUEUE.items()
     total = len(items)
     high_priority = sum(1 for e in items if e.get('priority') == 'high')
 
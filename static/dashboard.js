@@ -725,6 +725,29 @@ function updateDiagnostics(diag) {
         smtpError.className = 'diag-value error-text-sm' + (diag.last_smtp_error ? ' error' : '');
     }
     
+    // DB statement stats (fingerprinted in db.py)
+    const dbq = diag.db_queries;
+    if (dbq) {
+        const dbStatements = document.getElementById('diag-db-statements');
+        if (dbStatements) {
+            const avg = dbq.statements > 0 ? (dbq.total_ms / dbq.statements).toFixed(1) : 0;
+            dbStatements.textContent = `${dbq.statements} (avg ${avg}ms)`;
+        }
+        const dbTop = document.getElementById('diag-db-top-query');
+        if (dbTop) {
+            const top = dbq.top && dbq.top[0];
+            dbTop.textContent = top ? `${top.sql.slice(0, 60)} — ${top.count}× / ${top.total_ms}ms` : '--';
+            dbTop.title = top ? top.sql : '';
+        }
+        const dbSlow = document.getElementById('diag-db-slow');
+        if (dbSlow) {
+            const slow = dbq.slow_queries || [];
+            dbSlow.textContent = slow.length ? `${slow.length} (last ${slow[0].ms}ms)` : '0';
+            dbSlow.className = 'diag-value' + (slow.length ? ' warning' : ' good');
+            dbSlow.title = slow.length ? slow[0].sql : '';
+        }
+    }
+
     // Email queue (from status endpoint)
     // This will be updated in refreshTimersFromServer
     
@@ -0,0 +1,130 @@
+"""
+=============================================================================
+🌐 DUBAI FLEA MARKET TRACKER — Telegram Subscriber Registry
+=============================================================================
+In-memory view of everyone who receives new-event alerts: env-configured
+chat IDs, the admin chat and active ``telegram_subscribers`` rows, merged
+and de-duplicated once instead of on every alert.
+
+The registry is marked stale whenever a subscriber is added, removed or
+toggled (webhook /start, /stop, admin routes) and reloads lazily on next
+use. ``last_notified_at`` updates from a fan-out are buffered and written
+in one batch.
+=============================================================================
+"""
+
+import threading
+from datetime import datetime, timezone
+
+from config import (
+    TELEGRAM_CHAT_IDS, TELEGRAM_ADMIN_CHAT_ID,
+    TELEGRAM_WAVE_SIZE,
+)
+from db import db_get_active_subscriber_ids, db_mark_subscribers_notified
+
+
+class Subscriber:
+    """One alert recipient."""
+
+    __slots__ = ('chat_id', 'source')
+
+    def __init__(self, chat_id: str, source: str):
+        self.chat_id = chat_id
+        self.source = source  # 'admin', 'env' or 'db'
+
+    def __repr__(self):
+        return f"Subscriber({self.chat_id!r}, {self.source!r})"
+
+
+class SubscriberRegistry:
+    """De-duplicated, ordered subscriber list with lazy refresh."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = ()
+        self._stale = True
+        self._notified = {}  # chat_id -> ISO timestamp, awaiting flush
+        self._stats = {'refreshes': 0, 'last_refresh_at': None, 'flushed': 0, 'db_errors': 0}
+
+    def invalidate(self) -> None:
+        """Mark the registry stale (call after any subscriber change)."""
+        self._stale = True
+
+    def refresh(self) -> int:
+        """Reload from env + DB. Admin first, then env IDs, then DB subscribers."""
+        ordered = {}
+        if TELEGRAM_ADMIN_CHAT_ID:
+            ordered[TELEGRAM_ADMIN_CHAT_ID] = 'admin'
+        for cid in (TELEGRAM_CHAT_IDS or '').split(','):
+            cid = cid.strip()
+            if cid:
+                ordered.setdefault(cid, 'env')
+        try:
+            for cid in db_get_active_subscriber_ids():
+                ordered.setdefault(cid, 'db')
+            self._stale = False
+        except Exception:
+            self._stats['db_errors'] += 1  # DB unavailable — env IDs only, retry next use
+
+        subscribers = tuple(Subscriber(cid, source) for cid, source in ordered.items())
+        with self._lock:
+            self._subscribers = subscribers
+        self._stats['refreshes'] += 1
+        self._stats['last_refresh_at'] = datetime.now(timezone.utc).isoformat()
+        return len(subscribers)
+
+    def all(self) -> tuple:
+        if self._stale:
+            self.refresh()
+        return self._subscribers
+
+    def __len__(self) -> int:
+        return len(self.all())
+
+    def waves(self, size: int | None = None) -> list:
+        """Split subscribers into consecutive send waves of ``size``."""
+        size = max(1, size or TELEGRAM_WAVE_SIZE)
+        subscribers = self.all()
+        return [subscribers[i:i + size] for i in range(0, len(subscribers), size)]
+
+    # ----- last_notified_at batching -----
+
+    def mark_notified(self, chat_ids) -> None:
+        now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        with self._lock:
+            for cid in chat_ids:
+                self._notified[cid] = now
+
+    def flush_notified(self) -> int:
+        """Write buffered ``last_notified_at`` values in one batch."""
+        with self._lock:
+            pending, self._notified = self._notified, {}
+        if not pending:
+            return 0
+        try:
+            db_mark_subscribers_notified(list(pending.items()))
+        except Exception:
+            self._stats['db_errors'] += 1
+            with self._lock:
+                for cid, ts in pending.items():
+                    self._notified.setdefault(cid, ts)
+            return 0
+        self._stats['flushed'] += len(pending)
+        return len(pending)
+
+    def snapshot(self) -> dict:
+        subscribers = self._subscribers
+        by_source = {}
+        for sub in subscribers:
+            by_source[sub.source] = by_source.get(sub.source, 0) + 1
+        return {
+            **self._stats,
+            'count': len(subscribers),
+            'by_source': by_source,
+            'stale': self._stale,
+            'pending_notified': len(self._notified),
+            'wave_size': TELEGRAM_WAVE_SIZE,
+        }
+
+
+SUBSCRIBERS = SubscriberRegistry()
@@ -0,0 +1,608 @@
+"""
+=============================================================================
+🌐 DUBAI FLEA MARKET TRACKER — Telegram Bot Commands
+=============================================================================
+Handlers for the bot commands users send (/start, /status, /events, ...).
+
+The webhook route only validates the update and hands it to
+``COMMANDS.submit``, which returns immediately. A small pool of
+'tg-cmd-N' worker threads runs the handlers. Those do DB reads and the
+blocking ``sendMessage`` reply, so a burst of bot users no longer ties up
+the waitress request threads.
+
+  * The queue is bounded (``TELEGRAM_COMMAND_QUEUE_SIZE``). When it is
+    full the webhook answers 503 so Telegram redelivers the update later.
+  * Updates are de-duplicated by ``update_id``, because Telegram
+    re-sends an update whose webhook call timed out.
+  * Queue depth, queue wait and per-command handler latency are kept in
+    ``COMMANDS.snapshot()`` (shown on the diagnostics page).
+
+Instead of the webhook, updates can be pulled with ``getUpdates`` long
+polling (``TELEGRAM_INGEST=polling``). This works on hosts with no public
+URL. ``UpdatePoller`` feeds each batch into the same queue and persists
+the next offset, so a restart neither replays nor skips commands.
+=============================================================================
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import requests
+
+import config
+from config import (
+    CONFIG, TELEGRAM_BOT_TOKEN,
+    TELEGRAM_COMMAND_WORKERS, TELEGRAM_COMMAND_QUEUE_SIZE,
+    TELEGRAM_POLL_TIMEOUT, TELEGRAM_POLL_LIMIT,
+)
+from utils import console_log, log_activity, parse_iso_timestamp
+from notifications import notify_admin_alert
+from message_templates import strip_tags
+from subscribers import SUBSCRIBERS
+from db import (
+    db_add_subscriber, db_remove_subscriber, db_get_subscriber_count,
+    db_get_seen_event_count, db_get_recent_seen_events,
+    db_get_status, db_set_status,
+    validate_chat_id, mask_chat_id,
+)
+from metrics import QUEUE_DEPTH
+
+DEDUP_WINDOW = 1000  # Recent update_ids remembered for de-duplication
+OFFSET_STATUS_KEY = 'telegram_update_offset'
+POLL_BACKOFF_MAX = 60  # Seconds between getUpdates retries after repeated errors
+QUEUE_FULL_PAUSE = 1   # Seconds to let workers drain before re-polling a batch
+
+
+def reply(chat_id: str, text: str) -> None:
+    """Send a reply message back to a Telegram chat."""
+    if not TELEGRAM_BOT_TOKEN:
+        return
+    try:
+        requests.post(
+            f"{config.TELEGRAM_API_BASE}/bot{TELEGRAM_BOT_TOKEN}/sendMessage",
+            json={'chat_id': chat_id, 'text': text, 'parse_mode': 'HTML',
+                  'disable_web_page_preview': True},
+            timeout=10,
+        )
+    except Exception:
+        pass
+
+
+# ===== Formatting helpers =====
+
+def _uptime_delta():
+    start = parse_iso_timestamp(CONFIG.get('uptime_start', ''))
+    return datetime.now(timezone.utc) - start if start else None
+
+
+def _seconds_until_next_check() -> int | None:
+    next_raw = CONFIG.get('next_check')
+    if next_raw:
+        next_dt = parse_iso_timestamp(next_raw)
+        if next_dt:
+            return int((next_dt - datetime.now(timezone.utc)).total_seconds())
+    return None
+
+
+# ===== Command handlers =====
+# Each takes (chat_id, first_name, username) and returns the reply text
+# (or None when the handler replied itself).
+
+def cmd_start(chat_id, first_name, username):
+    return (
+        f"👋 <b>Welcome, {first_name}!</b>\n\n"
+        "🏪 I'm the <b>Dubai Flea Market Tracker Bot</b>.\n"
+        "I watch the Dubai Flea Market website 24/7 and notify you "
+        "the moment a new event is posted.\n\n"
+        "━━━━━━━━━━━━━━━━━━━━━━\n"
+        "📌 <b>Commands:</b>\n\n"
+        "/subscribe — Get event alerts\n"
+        "/unsubscribe — Stop alerts\n"
+        "/status — Tracker stats + uptime\n"
+        "/uptime — How long the bot has been running\n"
+        "/events — Recent events with details\n"
+        "/check — Trigger an instant check now\n"
+        "/next — When is the next scheduled check\n"
+        "/myid — Your chat ID\n"
+        "/help — Full command list\n"
+        "━━━━━━━━━━━━━━━━━━━━━━\n\n"
+        "💡 <i>Use /subscribe to start receiving notifications!</i>"
+    )
+
+
+def cmd_help(chat_id, first_name, username):
+    return (
+        "ℹ️ <b>Dubai Flea Market Tracker — All Commands</b>\n\n"
+        "<b>Subscriptions</b>\n"
+        "/subscribe — Subscribe to new event alerts\n"
+        "/unsubscribe — Unsubscribe from alerts\n\n"
+        "<b>Status</b>\n"
+        "/status — Full tracker stats and uptime\n"
+        "/uptime — How long the bot has been running\n"
+        "/next — When is the next scheduled check\n\n"
+        "<b>Events</b>\n"
+        "/events — See recent tracked events with details\n"
+        "/check — Trigger an instant check right now\n\n"
+        "<b>Info</b>\n"
+        "/myid — Show your Telegram chat ID\n"
+        "/help — Show this message\n\n"
+        "🌐 <a href=\"https://dubai-fleamarket.com\">Dubai Flea Market Website</a>"
+    )
+
+
+def cmd_subscribe(chat_id, first_name, username):
+    if not validate_chat_id(chat_id):
+        return "❌ Could not validate your chat ID."
+    display_name = username or first_name or ''
+    if not db_add_subscriber(chat_id, display_name, added_by='self'):
+        return "ℹ️ You're already subscribed! Use /unsubscribe to stop."
+    SUBSCRIBERS.invalidate()
+    reply(chat_id, (
+        "✅ <b>Subscribed successfully!</b>\n\n"
+        "You'll receive instant notifications when new "
+        "Dubai Flea Market events are posted.\n\n"
+        "Use /unsubscribe to stop at any time."
+    ))
+    log_activity(f"📱 New Telegram subscriber via /subscribe: {mask_chat_id(chat_id)}", "success")
+    # Notify admin
+    notify_admin_alert(
+        f"📱 New subscriber joined via /subscribe\n"
+        f"Name: {first_name}\nUsername: @{username or 'none'}\n"
+        f"Chat ID: {mask_chat_id(chat_id)}",
+        "New Subscriber"
+    )
+    return None
+
+
+def cmd_unsubscribe(chat_id, first_name, username):
+    if not db_remove_subscriber(chat_id):
+        return "ℹ️ You're not currently subscribed. Use /subscribe to join."
+    SUBSCRIBERS.invalidate()
+    log_activity(f"📱 Telegram subscriber left via /unsubscribe: {mask_chat_id(chat_id)}", "warning")
+    return (
+        "👋 <b>Unsubscribed.</b>\n\n"
+        "You won't receive event notifications anymore.\n"
+        "Use /subscribe to re-subscribe at any time."
+    )
+
+
+def cmd_status(chat_id, first_name, username):
+    seen_count = sub_count = 0
+    try:
+        seen_count = db_get_seen_event_count()
+        sub_count = db_get_subscriber_count()
+    except Exception:
+        pass
+    # Calculate uptime
+    uptime_str = 'Unknown'
+    try:
+        delta = _uptime_delta()
+        if delta:
+            days = delta.days
+            hours, rem = divmod(delta.seconds, 3600)
+            minutes = rem // 60
+            if days > 0:
+                uptime_str = f"{days}d {hours}h {minutes}m"
+            elif hours > 0:
+                uptime_str = f"{hours}h {minutes}m"
+            else:
+                uptime_str = f"{minutes}m"
+    except Exception:
+        pass
+    # Next check
+    next_check_str = 'Soon'
+    try:
+        diff = _seconds_until_next_check()
+        if diff is not None:
+            next_check_str = f"in {diff // 60}m {diff % 60}s" if diff > 0 else 'Running now'
+    except Exception:
+        pass
+    last_check_str = CONFIG.get('last_check') or 'Not yet'
+    return (
+        "📊 <b>Tracker Status</b>\n"
+        "━━━━━━━━━━━━━━━━━━━━━━\n\n"
+        f"✅ Status: <b>{'Running' if CONFIG.get('tracker_enabled', True) else 'Paused'}</b>\n"
+        f"⏱ Uptime: <b>{uptime_str}</b>\n"
+        f"🔍 Total checks: {CONFIG.get('total_checks', 0)}\n"
+        f"📦 Events tracked: {seen_count}\n"
+        f"🆕 New events found: {CONFIG.get('total_new_events', 0)}\n"
+        f"📬 Notifications sent: {CONFIG.get('emails_sent', 0)}\n"
+        f"👥 Subscribers: {sub_count}\n"
+        f"⏰ Interval: Every {CONFIG.get('check_interval_minutes', 15)} min\n"
+        f"🕐 Last check: {last_check_str}\n"
+        f"⏭ Next check: {next_check_str}\n\n"
+        "🌐 <a href=\"https://dubai-fleamarket.com\">View Events →</a>"
+    )
+
+
+def cmd_events(chat_id, first_name, username):
+    total = db_get_seen_event_count()
+    recent = db_get_recent_seen_events(5)
+    if not recent:
+        return "📋 No events tracked yet. The tracker will notify you as soon as one is found!"
+    lines = [f"📋 <b>Recent Events</b> ({total} total tracked)\n━━━━━━━━━━━━━━━━━━━━━━\n"]
+    for i, ev in enumerate(recent, 1):
+        title = (ev.get('title') or ev.get('name') or 'Untitled')[:55]
+        link = ev.get('link') or ev.get('url') or ''
+        date_posted = ev.get('date_posted') or ev.get('date') or ''
+        first_seen = ev.get('first_seen') or ''
+        desc = strip_tags((ev.get('description') or ev.get('excerpt') or '').strip(), 80)
+        lines.append(f"\n<b>{i}. <a href=\"{link}\">{title}</a></b>")
+        if date_posted:
+            lines.append(f"   📅 Posted: {date_posted}")
+        if first_seen:
+            lines.append(f"   👁 Detected: {first_seen}")
+        if desc:
+            lines.append(f"   📝 {desc}...")
+        lines.append(f"   🔗 <a href=\"{link}\">Open Event</a>")
+        if i < len(recent):
+            lines.append("   ─ ─ ─ ─ ─ ─ ─ ─")
+    lines.append(f"\n━━━━━━━━━━━━━━━━━━━━━━\n🌐 <a href=\"https://dubai-fleamarket.com\">Browse All Events →</a>")
+    return '\n'.join(lines)
+
+
+def cmd_uptime(chat_id, first_name, username):
+    uptime_str = 'Unknown'
+    try:
+        delta = _uptime_delta()
+        if delta:
+            days = delta.days
+            hours, rem = divmod(delta.seconds, 3600)
+            minutes = rem // 60
+            if days > 0:
+                uptime_str = f"{days} day{'s' if days != 1 else ''}, {hours}h {minutes}m"
+            elif hours > 0:
+                uptime_str = f"{hours}h {minutes}m"
+            else:
+                uptime_str = f"{minutes} minute{'s' if minutes != 1 else ''}"
+    except Exception:
+        pass
+    return (
+        f"⏱ <b>Bot Uptime</b>\n\n"
+        f"Running for: <b>{uptime_str}</b>\n"
+        f"Total checks done: {CONFIG.get('total_checks', 0)}"
+    )
+
+
+def cmd_next(chat_id, first_name, username):
+    next_check_str = 'Unknown'
+    try:
+        diff = _seconds_until_next_check()
+        if diff is not None:
+            next_check_str = f"{diff // 60}m {diff % 60}s" if diff > 0 else 'Running right now'
+    except Exception:
+        pass
+    interval = CONFIG.get('check_interval_minutes', 15)
+    return (
+        f"⏭ <b>Next Scheduled Check</b>\n\n"
+        f"Next check: <b>{next_check_str}</b>\n"
+        f"Interval: Every {interval} minutes\n"
+        f"Checks done so far: {CONFIG.get('total_checks', 0)}"
+    )
+
+
+def cmd_check(chat_id, first_name, username):
+    reply(chat_id, "🔍 Triggering an instant check now...")
+    try:
+        # Late import to break circular dependency (events → ... → telegram_bot)
+        from events import request_check
+
+        def _on_check_done(result):
+            # Runs on the checker thread: send from a short-lived thread so a
+            # slow Bot API never holds up the scheduler's other jobs
+            if result is None:
+                text = "⚠️ Check encountered an error. Please try again later."
+            elif result.get('new_events_found', 0) > 0:
+                found = result['new_events_found']
+                text = f"✅ Check done! Found <b>{found} new event{'s' if found != 1 else ''}</b>. Notifications queued!"
+            else:
+                total = CONFIG.get('total_checks', 0)
+                text = f"✅ Check done. No new events found. (🔍 {total} total checks run)"
+            threading.Thread(target=reply, args=(chat_id, text), daemon=True, name='tg-check-reply').start()
+        request_check(on_done=_on_check_done)
+    except Exception as e:
+        return f"⚠️ Could not trigger check: {str(e)[:80]}"
+    return None
+
+
+def cmd_myid(chat_id, first_name, username):
+    return f"🆔 Your Telegram Chat ID is:\n<code>{chat_id}</code>"
+
+
+def cmd_unknown(chat_id, first_name, username):
+    return "🤔 Unknown command. Try /help to see available commands."
+
+
+COMMAND_HANDLERS = {
+    '/start': cmd_start,
+    '/help': cmd_help,
+    '/subscribe': cmd_subscribe,
+    '/unsubscribe': cmd_unsubscribe,
+    '/status': cmd_status,
+    '/events': cmd_events,
+    '/uptime': cmd_uptime,
+    '/next': cmd_next,
+    '/check': cmd_check,
+    '/myid': cmd_myid,
+}
+
+
+def parse_update(update: dict) -> dict | None:
+    """Extract the command from a Telegram update, or None if there is nothing to do."""
+    message = update.get('message') or {}
+    if not message:
+        return None
+    chat_id = str(message.get('chat', {}).get('id', ''))
+    text = (message.get('text') or '').strip()
+    if not chat_id or not text:
+        return None
+    return {
+        'chat_id': chat_id,
+        'cmd': text.split()[0].lower().split('@')[0],  # handle /start@botname
+        'first_name': message.get('from', {}).get('first_name', 'there'),
+        'username': message.get('from', {}).get('username', ''),
+    }
+
+
+def handle_command(command: dict) -> None:
+    """Run one parsed command and send its reply."""
+    handler = COMMAND_HANDLERS.get(command['cmd'], cmd_unknown)
+    text = handler(command['chat_id'], command['first_name'], command['username'])
+    if text:
+        reply(command['chat_id'], text)
+
+
+# ===== Command queue =====
+
+class CommandQueue:
+    """Bounded queue of parsed bot commands drained by a worker pool."""
+
+    def __init__(self, maxsize: int, workers: int):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._workers = max(1, workers)
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._seen_lock = threading.Lock()
+        self._seen_updates = OrderedDict()  # update_id -> None (recent, for dedup)
+        self._latency = {}  # cmd -> {'count', 'total_ms', 'max_ms', 'last_ms'}
+        self._stats = {
+            'received': 0, 'queued': 0, 'duplicates': 0, 'ignored': 0, 'rejected_full': 0,
+            'processed': 0, 'errors': 0, 'max_depth': 0,
+            'queue_wait_ms_total': 0.0, 'queue_wait_ms_max': 0.0,
+        }
+
+    def start(self) -> None:
+        """Start the worker threads (idempotent)."""
+        with self._start_lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for n in range(len(self._threads), self._workers):
+                t = threading.Thread(target=self._worker, daemon=True, name=f'tg-cmd-{n + 1}')
+                t.start()
+                self._threads.append(t)
+
+    def submit(self, update: dict) -> str:
+        """Accept a webhook update. Returns 'queued', 'duplicate', 'ignored' or 'full'."""
+        self._stats['received'] += 1
+        command = parse_update(update)
+        if command is None:
+            self._stats['ignored'] += 1
+            return 'ignored'
+
+        update_id = update.get('update_id')
+        with self._seen_lock:
+            if update_id is not None and update_id in self._seen_updates:
+                self._stats['duplicates'] += 1
+                return 'duplicate'
+            try:
+                self._queue.put_nowait((time.monotonic(), command))
+            except queue.Full:
+                self._stats['rejected_full'] += 1
+                return 'full'  # Not remembered — Telegram's redelivery will be accepted
+            if update_id is not None:
+                self._seen_updates[update_id] = None
+                while len(self._seen_updates) > DEDUP_WINDOW:
+                    self._seen_updates.popitem(last=False)
+
+        self._stats['queued'] += 1
+        self._stats['max_depth'] = max(self._stats['max_depth'], self._queue.qsize())
+        self.start()
+        return 'queued'
+
+    def _worker(self) -> None:
+        while True:
+            enqueued_at, command = self._queue.get()
+            started = time.monotonic()
+            wait_ms = (started - enqueued_at) * 1000
+            try:
+                handle_command(command)
+            except Exception as e:
+                self._stats['errors'] += 1
+                console_log(f"⚠️ Telegram command {command['cmd'][:20]} failed: {str(e)[:80]}", "error")
+            finally:
+                self._record(command['cmd'], wait_ms, (time.monotonic() - started) * 1000)
+                self._queue.task_done()
+
+    def _record(self, cmd: str, wait_ms: float, handler_ms: float) -> None:
+        key = cmd if cmd in COMMAND_HANDLERS else 'unknown'
+        with self._seen_lock:
+            self._stats['processed'] += 1
+            self._stats['queue_wait_ms_total'] += wait_ms
+            self._stats['queue_wait_ms_max'] = max(self._stats['queue_wait_ms_max'], wait_ms)
+            entry = self._latency.setdefault(key, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'last_ms': 0.0})
+            entry['count'] += 1
+            entry['total_ms'] += handler_ms
+            entry['max_ms'] = max(entry['max_ms'], handler_ms)
+            entry['last_ms'] = handler_ms
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def snapshot(self) -> dict:
+        with self._seen_lock:
+            stats = dict(self._stats)
+            latency = {
+                cmd: {'count': e['count'], 'avg_ms': round(e['total_ms'] / e['count'], 1),
+                      'max_ms': round(e['max_ms'], 1), 'last_ms': round(e['last_ms'], 1)}
+                for cmd, e in self._latency.items()
+            }
+        total_wait = stats.pop('queue_wait_ms_total')
+        stats['avg_queue_wait_ms'] = round(total_wait / stats['processed'], 1) if stats['processed'] else 0
+        stats['queue_wait_ms_max'] = round(stats['queue_wait_ms_max'], 1)
+        return {
+            **stats,
+            'depth': self._queue.qsize(),
+            'capacity': self._queue.maxsize,
+            'workers': self._workers,
+            'workers_alive': sum(1 for t in self._threads if t.is_alive()),
+            'command_latency': latency,
+        }
+
+
+COMMANDS = CommandQueue(TELEGRAM_COMMAND_QUEUE_SIZE, TELEGRAM_COMMAND_WORKERS)
+QUEUE_DEPTH.set_function(COMMANDS.depth, queue='telegram_commands')
+
+
+# ===== getUpdates long polling =====
+
+class TelegramAPIError(Exception):
+    """A Bot API call returned ok=false."""
+
+    def __init__(self, message: str, retry_after: int | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UpdatePoller:
+    """Pull updates with ``getUpdates`` and feed them to a CommandQueue."""
+
+    def __init__(self, commands: CommandQueue, timeout: int, limit: int):
+        self._commands = commands
+        self._timeout = timeout
+        self._limit = max(1, min(limit, 100))
+        self._offset = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._stats = {
+            'polls': 0, 'batches': 0, 'updates': 0, 'last_batch_size': 0,
+            'errors': 0, 'last_error': None, 'last_poll_at': None,
+        }
+
+    def _call(self, method: str, payload: dict, timeout: float) -> dict:
+        resp = requests.post(f"{config.TELEGRAM_API_BASE}/bot{TELEGRAM_BOT_TOKEN}/{method}",
+                             json=payload, timeout=timeout)
+        try:
+            data = resp.json()
+        except ValueError:
+            data = {'ok': False, 'description': resp.text[:80]}
+        data.setdefault('error_code', resp.status_code)
+        return data
+
+    def _load_offset(self) -> None:
+        try:
+            saved = db_get_status(OFFSET_STATUS_KEY)
+            self._offset = int(saved) if saved else None
+        except Exception:
+            self._offset = None
+
+    def _save_offset(self) -> None:
+        try:
+            db_set_status(OFFSET_STATUS_KEY, self._offset)
+        except Exception as e:
+            console_log(f"⚠️ Could not persist Telegram update offset: {str(e)[:60]}", "warning")
+
+    def poll_once(self) -> int:
+        """One getUpdates round trip. Returns the number of updates handed to the queue.
+
+        Raises TelegramAPIError on API errors.
+        """
+        payload = {'timeout': self._timeout, 'limit': self._limit, 'allowed_updates': ['message']}
+        if self._offset is not None:
+            payload['offset'] = self._offset
+        self._stats['polls'] += 1
+        self._stats['last_poll_at'] = datetime.now(timezone.utc).isoformat()
+        data = self._call('getUpdates', payload, timeout=self._timeout + 10)
+
+        if not data.get('ok'):
+            if data.get('error_code') == 409:
+                # A webhook is still registered — getUpdates is refused until it is removed
+                self._call('deleteWebhook', {'drop_pending_updates': False}, timeout=15)
+            retry_after = (data.get('parameters') or {}).get('retry_after')
+            raise TelegramAPIError(f"getUpdates HTTP {data.get('error_code')}: {data.get('description', '?')}",
+                                   retry_after)
+
+        updates = data.get('result') or []
+        handed = 0
+        start_offset = self._offset
+        for update in updates:
+            if self._commands.submit(update) == 'full':
+                break  # Leave the offset here; Telegram re-sends the rest next poll
+            self._offset = update['update_id'] + 1
+            handed += 1
+        if updates:
+            self._stats['batches'] += 1
+            self._stats['last_batch_size'] = len(updates)
+            self._stats['updates'] += handed
+        if self._offset != start_offset:
+            self._save_offset()
+        if handed < len(updates):
+            time.sleep(QUEUE_FULL_PAUSE)
+        return handed
+
+    def _loop(self) -> None:
+        self._load_offset()
+        try:
+            self._call('deleteWebhook', {'drop_pending_updates': False}, timeout=15)
+        except Exception as e:
+            console_log(f"⚠️ Could not remove Telegram webhook: {str(e)[:60]}", "warning")
+        console_log(f"📱 Telegram long polling started (offset {self._offset or 'latest'})", "success")
+
+        backoff = 1
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+                backoff = 1
+            except Exception as e:
+                self._stats['errors'] += 1
+                self._stats['last_error'] = str(e)[:120]
+                delay = getattr(e, 'retry_after', None) or backoff
+                console_log(f"⚠️ Telegram polling error: {self._stats['last_error'][:80]} "
+                            f"(retry in {delay}s)", "warning")
+                self._stop.wait(delay)
+                backoff = min(backoff * 2, POLL_BACKOFF_MAX)
+
+    def start(self) -> None:
+        """Start the 'tg-poller' thread (idempotent)."""
+        if not TELEGRAM_BOT_TOKEN:
+            console_log("⚠️ Telegram polling skipped (no bot token)", "debug")
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._commands.start()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name='tg-poller')
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def snapshot(self) -> dict:
+        return {**self._stats, 'running': self.running(), 'offset': self._offset,
+                'timeout': self._timeout, 'limit': self._limit}
+
+
+def ingest_mode() -> str:
+    """'webhook' or 'polling', resolving 'auto' from RENDER_EXTERNAL_URL."""
+    mode = config.TELEGRAM_INGEST
+    if mode == 'auto':
+        return 'webhook' if os.environ.get('RENDER_EXTERNAL_URL') else 'polling'
+    return 'polling' if mode == 'polling' else 'webhook'
+
+
+POLLER = UpdatePoller(COMMANDS, TELEGRAM_POLL_TIMEOUT, TELEGRAM_POLL_LIMIT)
@@ -91,6 +91,47 @@ def _():
     assert isinstance(status['tables'], dict)
     assert len(status['tables']) >= 7, f"Expected >=7 tables, got {len(status['tables'])}"
 
+@test("SQL fingerprints strip literals and collapse placeholder lists")
+def _():
+    fp = db_module.fingerprint_sql
+    assert fp("SELECT * FROM t WHERE id = 42 AND name = 'x'") == "SELECT * FROM t WHERE id = ? AND name = ?"
+    assert fp("SELECT 1 FROM t WHERE id IN (?, ?, ?)") == fp("SELECT 1 FROM t WHERE id IN (?,?)")
+
+@test("Statements are aggregated per fingerprint with redacted slow log")
+def _():
+    db_module.reset_query_stats()
+    old_threshold = db_module.SLOW_QUERY_MS
+    db_module.SLOW_QUERY_MS = 0  # Log every statement
+    try:
+        conn = db_module.get_connection()
+        conn.execute("SELECT COUNT(*) FROM seen_events WHERE event_id = ?", ('secret-id',)).fetchone()
+        conn.execute("SELECT COUNT(*) FROM seen_events WHERE event_id = ?", ('other',)).fetchone()
+    finally:
+        db_module.SLOW_QUERY_MS = old_threshold
+    stats = db_module.get_query_stats()
+    row = next(r for r in stats['top'] if 'seen_events WHERE event_id' in r['sql'])
+    assert row['count'] == 2, row
+    assert 'secret-id' not in str(stats['slow_queries'])
+    assert stats['slow_queries'][0]['params'] == ['str(5)']
+    assert 'queries' in db_module.get_db_status()
+
+@test("Slow statements reach the console once per shape per interval")
+def _():
+    import config
+    db_module.reset_query_stats()
+    old_threshold = db_module.SLOW_QUERY_MS
+    db_module.SLOW_QUERY_MS = 0
+    config.SYSTEM_CONSOLE.clear()
+    try:
+        conn = db_module.get_connection()
+        for _ in range(5):
+            conn.execute("SELECT COUNT(*) FROM outbox WHERE status = ?", ('pending',)).fetchone()
+    finally:
+        db_module.SLOW_QUERY_MS = old_threshold
+    lines = [msg for _, _, msg in config.SYSTEM_CONSOLE if 'FROM outbox WHERE status' in msg]
+    assert len(lines) == 1, lines
+    assert len([q for q in db_module.get_query_stats()['slow_queries'] if 'outbox' in q['sql']]) == 5
+
 print()
 
 # =========================================================================
@@ -144,6 +185,12 @@ def _():
     count = db_module.db_get_seen_event_count()
     assert count >= 4, f"Expected >=4, got {count}"
 
+@test("db_get_recent_seen_events() returns newest first, limited")
+def _():
+    recent = db_module.db_get_recent_seen_events(2)
+    assert len(recent) == 2
+    assert [e['id'] for e in recent] == [1001, 2003], recent
+
 @test("db_load_seen_event_ids() returns list of ints")
 def _():
     ids = db_module.db_load_seen_event_ids()
@@ -151,6 +198,12 @@ def _():
     assert 1001 in ids
     assert all(isinstance(i, int) for i in ids)
 
+@test("db_filter_seen_event_ids() returns only the seen IDs")
+def _():
+    seen = db_module.db_filter_seen_event_ids([1001, 2002, 9999, -1, 'x'])
+    assert seen == {1001, 2002}, seen
+    assert db_module.db_filter_seen_event_ids([]) == set()
+
 @test("db_remove_latest_event() removes most recent event")
 def _():
     count_before = db_module.db_get_seen_event_count()
@@ -460,6 +513,12 @@ def _():
     assert isinstance(ids, list)
     assert '111222333' in ids
 
+@test("db_mark_subscribers_notified() updates in one batch")
+def _():
+    db_module.db_mark_subscribers_notified([('111222333', '2026-01-01T00:00:00Z'), ('999', '2026-01-01T00:00:00Z')])
+    subs = {s['chat_id']: s for s in db_module.db_get_subscribers()}
+    assert subs['111222333']['last_notified_at'] == '2026-01-01T00:00:00Z'
+
 @test("db_toggle_subscriber() toggles active state")
 def _():
     new_state = db_module.db_toggle_subscriber('111222333')
@@ -539,9 +598,130 @@ def _():
 print()
 
 # =========================================================================
-# 11. JSON MIGRATION
+# 11. OUTBOX
+# =========================================================================
+print("── 11. Outbox ────────────────────────────────")
+
+OUTBOX_SEEN = {'event_ids': [4001], 'event_details': [
+    {'id': 4001, 'title': 'Outbox Event', 'link': 'https://example.com/o1', 'date_posted': '2026-03-01'},
+]}
+OUTBOX_DELIVERIES = [('telegram', ''), ('email', 'a@test.com'), ('email', 'b@test.com')]
+
+@test("db_save_seen_events_with_outbox() writes events and deliveries together")
+def _():
+    written = db_module.db_save_seen_events_with_outbox(OUTBOX_SEEN, 'batch1', '[]', OUTBOX_DELIVERIES)
+    assert written == 3
+    assert db_module.db_check_event_exists(4001)
+    assert db_module.db_get_outbox_counts().get('pending') == 3
+
+@test("db_save_seen_events_with_outbox() is idempotent per batch/channel/target")
+def _():
+    db_module.db_save_seen_events_with_outbox(OUTBOX_SEEN, 'batch1', '[]', OUTBOX_DELIVERIES)
+    assert db_module.db_get_outbox_counts().get('pending') == 3
+
+@test("db_save_seen_events_with_outbox() rolls back seen events on failure")
+def _():
+    seen = {'event_ids': [4002], 'event_details': [{'id': 4002, 'title': 'Rolled Back'}]}
+    try:
+        db_module.db_save_seen_events_with_outbox(seen, 'batch2', '[]', [('telegram', None)])
+        assert False, "Expected an error for an invalid delivery"
+    except TypeError:
+        pass
+    assert not db_module.db_check_event_exists(4002)
+
+@test("db_save_seen_events_with_outbox() is not committed by a concurrent writer")
+def _():
+    import threading
+    entered, release = threading.Event(), threading.Event()
+    original = db_module._outbox_row_id
+
+    def stalled_row_id(*args):
+        entered.set()  # Seen event inserted, outbox row not yet
+        release.wait(5)
+        raise RuntimeError("outbox insert failed")
+
+    def save():
+        try:
+            db_module.db_save_seen_events_with_outbox(
+                {'event_ids': [4003], 'event_details': [{'id': 4003, 'title': 'Half Batch'}]},
+                'batch3', '[]', [('telegram', '')])
+        except RuntimeError:
+            pass
+
+    db_module._outbox_row_id = stalled_row_id
+    try:
+        saver = threading.Thread(target=save)
+        saver.start()
+        assert entered.wait(5)
+        writer = threading.Thread(target=db_module.db_add_log, args=("Interleaved commit", "info"))
+        writer.start()
+        writer.join(0.3)
+        assert writer.is_alive(), "Concurrent writer did not wait for the open transaction"
+        release.set()
+        saver.join(5)
+        writer.join(5)
+    finally:
+        db_module._outbox_row_id = original
+        release.set()
+    assert not db_module.db_check_event_exists(4003)
+    assert any(log['message'] == "Interleaved commit" for log in db_module.db_get_logs(20))
+
+@test("db_claim_outbox_row() claims a row only once")
+def _():
+    row = db_module.db_get_pending_outbox()[0]
+    assert db_module.db_claim_outbox_row(row['id']) is True
+    assert db_module.db_claim_outbox_row(row['id']) is False
+    assert db_module.db_get_outbox_counts().get('sending') == 1
+
+@test("db_reset_stuck_outbox() returns in-flight rows to pending")
+def _():
+    assert db_module.db_reset_stuck_outbox() == 1
+    assert db_module.db_get_outbox_counts().get('pending') == 3
+
+@test("db_finish_outbox_row() marks rows done")
+def _():
+    for row in db_module.db_get_pending_outbox():
+        db_module.db_claim_outbox_row(row['id'])
+        db_module.db_finish_outbox_row(row['id'], 'done')
+    counts = db_module.db_get_outbox_counts()
+    assert counts.get('done') == 3
+    assert not counts.get('pending')
+
+print()
+
+# =========================================================================
+# 12. RATE LIMITS
+# =========================================================================
+print("── 12. Rate Limits ───────────────────────────")
+
+@test("db_rate_limit_push() adds usage from separate pushes atomically")
+def _():
+    now = 1_000_000.0
+    db_module.db_rate_limit_push([('public|1.2.3.4', 6.0, 0.0)], now)
+    db_module.db_rate_limit_push([('public|1.2.3.4', 3.0, 0.0)], now)
+    tat, blocked = db_module.db_rate_limit_fetch(['public|1.2.3.4'], now)['public|1.2.3.4']
+    assert tat == now + 9.0
+    assert blocked == 0.0
+
+@test("db_rate_limit_fetch() returns active blocks for unknown slots")
+def _():
+    now = 1_000_000.0
+    db_module.db_rate_limit_push([('admin|5.6.7.8', 0.0, now + 300)], now)
+    shared = db_module.db_rate_limit_fetch([], now)
+    assert shared['admin|5.6.7.8'][1] == now + 300
+
+@test("db_rate_limit_prune() deletes idle rows only")
+def _():
+    later = 1_000_100.0
+    assert db_module.db_rate_limit_prune(later) == 1
+    assert 'admin|5.6.7.8' in db_module.db_rate_limit_fetch([], later)
+
+print()
+
+# =========================================================================
+# 13. JSON MIGRATION
 # =========================================================================
-print("── 11. JSON Migration ────────────────────────")
+print("── 13. JSON Migration ────────────────────────")
 
 @test("migrate_from_json() runs without crashing (even with no JSON files)")
 def _():
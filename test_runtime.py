@@ -0,0 +1,869 @@
+"""
+=============================================================================
+ RUNTIME TEST SUITE
+=============================================================================
+ Run: python test_runtime.py
+
+ Tests the in-process machinery around the database (startup stage
+ graph, background job scheduler, single-flight checks, state snapshot
+ and seen-ID cache, instrumented locks, NDJSON log sink, rate limiter,
+ email retry queue, Telegram command queue and update poller). Uses a
+ throwaway DATA_DIR with local SQLite; Telegram is the local fake from
+ bench/fake_telegram.py.
+=============================================================================
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+# ── Throwaway data dir / local SQLite before any app module is imported ──
+os.environ.pop('TURSO_DATABASE_URL', None)
+os.environ.pop('TURSO_AUTH_TOKEN', None)
+TEST_DATA_DIR = tempfile.mkdtemp(prefix='dfm-runtime-test-')
+os.environ['DATA_DIR'] = TEST_DATA_DIR
+os.environ['LOG_DIR'] = ''
+
+passed = 0
+failed = 0
+errors = []
+
+def test(name):
+    """Decorator to register and run a test."""
+    def decorator(fn):
+        global passed, failed
+        try:
+            fn()
+            passed += 1
+            print(f"  ✅ {name}")
+        except Exception as e:
+            failed += 1
+            tb = traceback.format_exc().strip().split('\n')[-1]
+            errors.append((name, tb))
+            print(f"  ❌ {name}")
+            print(f"     └─ {tb}")
+        return fn
+    return decorator
+
+
+print("\n━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+print("  🧪 RUNTIME TESTS")
+print("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n")
+print(f"  📁 Test data dir: {TEST_DATA_DIR}")
+print()
+
+# =========================================================================
+# 1. STARTUP STAGE GRAPH
+# =========================================================================
+print("── 1. Startup Stage Graph ────────────────────")
+
+from startup import StartupGraph
+
+
+def _sleeper(seconds, log=None, name=None):
+    def fn():
+        if log is not None:
+            log.append(name)
+        time.sleep(seconds)
+    return fn
+
+
+@test("StartupGraph runs a stage only after its dependencies finish")
+def _():
+    order = []
+    graph = StartupGraph(parallelism=4)
+    graph.stage('a', _sleeper(0.05, order, 'a'))
+    graph.stage('b', _sleeper(0.01, order, 'b'), after=('a',))
+    graph.stage('c', _sleeper(0.01, order, 'c'), after=('b',))
+    graph.run()
+    assert order == ['a', 'b', 'c'], order
+    stages = {s['name']: s for s in graph.report()['stages']}
+    assert stages['b']['start_ms'] >= stages['a']['end_ms']
+    assert stages['c']['start_ms'] >= stages['b']['end_ms']
+
+@test("StartupGraph records a failing stage and still runs its dependents")
+def _():
+    failures = []
+    ran = []
+    graph = StartupGraph(on_error=lambda name, e: failures.append((name, type(e).__name__)))
+    graph.stage('broken', lambda: 1 / 0)
+    graph.stage('after_broken', lambda: ran.append('after_broken'), after=('broken',))
+    graph.run()
+    stages = {s['name']: s for s in graph.report()['stages']}
+    assert stages['broken']['status'] == 'error' and 'division' in stages['broken']['error']
+    assert stages['after_broken']['status'] == 'ok'
+    assert ran == ['after_broken']
+    assert failures == [('broken', 'ZeroDivisionError')]
+
+@test("StartupGraph critical path follows the latest-finishing dependency")
+def _():
+    graph = StartupGraph(parallelism=4)
+    graph.stage('slow', _sleeper(0.15))
+    graph.stage('fast', _sleeper(0.01))
+    graph.stage('middle', _sleeper(0.05), after=('slow',))
+    graph.stage('last', _sleeper(0.01), after=('middle', 'fast'))
+    graph.stage('side', _sleeper(0.01), after=('fast',))
+    graph.run()
+    report = graph.report()
+    assert report['critical_path'] == ['slow', 'middle', 'last'], report['critical_path']
+    assert report['critical_path_ms'] >= 200
+    assert report['wall_ms'] < report['serial_ms']
+
+@test("StartupGraph never runs more than `parallelism` stages at once")
+def _():
+    lock = threading.Lock()
+    state = {'running': 0, 'peak': 0}
+
+    def tracked():
+        with lock:
+            state['running'] += 1
+            state['peak'] = max(state['peak'], state['running'])
+        time.sleep(0.05)
+        with lock:
+            state['running'] -= 1
+
+    graph = StartupGraph(parallelism=2)
+    for n in range(6):
+        graph.stage(f"s{n}", tracked)
+    graph.run()
+    assert state['peak'] == 2, state
+
+@test("StartupGraph runs stages sharing a resource one at a time")
+def _():
+    graph = StartupGraph(parallelism=4)
+    for n in range(3):
+        graph.stage(f"db{n}", _sleeper(0.03), resource='db')
+    graph.stage('network', _sleeper(0.03))
+    graph.run()
+    stages = {s['name']: s for s in graph.report()['stages']}
+    spans = sorted((stages[f"db{n}"]['start_ms'], stages[f"db{n}"]['end_ms']) for n in range(3))
+    for (_, end), (start, _) in zip(spans, spans[1:]):
+        assert start >= end, spans
+    assert stages['network']['start_ms'] < spans[0][1]  # Overlaps the first DB stage
+
+@test("StartupGraph rejects unknown or duplicate stages")
+def _():
+    graph = StartupGraph()
+    graph.stage('a', lambda: None)
+    for name, after in (('b', ('missing',)), ('a', ())):
+        try:
+            graph.stage(name, lambda: None, after=after)
+            assert False, f"Expected ValueError for {name}"
+        except ValueError:
+            pass
+
+print()
+
+# =========================================================================
+# 2. SCHEDULER
+# =========================================================================
+print("── 2. Scheduler ──────────────────────────────")
+
+from scheduler import Scheduler
+
+
+@test("Scheduler hands out due jobs earliest deadline first")
+def _():
+    sched = Scheduler()
+    now = time.monotonic()
+    sched.schedule_at('late', now - 1)
+    sched.schedule_at('early', now - 3)
+    sched.schedule_at('middle', now - 2)
+    assert [sched.next_due() for _ in range(3)] == ['early', 'middle', 'late']
+    assert sched.snapshot() == {}
+
+@test("Scheduler reschedule invalidates the old heap entry (lazy deletion)")
+def _():
+    sched = Scheduler()
+    sched.schedule('job', 0)
+    sched.schedule('job', 60)  # Old, due entry is now stale
+    sched.schedule('other', 0)
+    assert sched.next_due() == 'other'
+    assert 59 < sched.seconds_until('job') <= 60
+    assert list(sched.snapshot()) == ['job']
+
+@test("Scheduler schedule_earlier only ever moves a job forward")
+def _():
+    sched = Scheduler()
+    sched.schedule('job', 60)
+    sched.schedule_earlier('job', 120)
+    assert 59 < sched.seconds_until('job') <= 60
+    sched.schedule_earlier('job', 10)
+    assert 9 < sched.seconds_until('job') <= 10
+    sched.schedule_earlier('fresh', 5)  # Unscheduled jobs are simply scheduled
+    assert 4 < sched.seconds_until('fresh') <= 5
+
+@test("Scheduler wake() interrupts a long wait, cancel() drops the job")
+def _():
+    sched = Scheduler()
+    sched.schedule('job', 60)
+    sched.schedule('dropped', 0)
+    sched.cancel('dropped')
+    assert sched.seconds_until('dropped') is None
+    threading.Timer(0.05, sched.wake, args=('job',)).start()
+    start = time.monotonic()
+    assert sched.next_due() == 'job'
+    assert time.monotonic() - start < 5
+
+@test("Scheduler next_due() returns None once stopped")
+def _():
+    sched = Scheduler()
+    threading.Timer(0.05, sched.stop).start()
+    assert sched.next_due() is None
+
+print()
+
+# =========================================================================
+# 3. SINGLE FLIGHT
+# =========================================================================
+print("── 3. Single Flight ──────────────────────────")
+
+from scheduler import SingleFlight
+
+
+def _start_leader(flight, release, result='result'):
+    """Start a leader call that blocks until ``release`` is set."""
+    calls = []
+    started = threading.Event()
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    outcome = {}
+
+    def leader():
+        try:
+            outcome['value'] = flight.do(work)
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=leader)
+    thread.start()
+    assert started.wait(5)
+    return thread, calls, outcome
+
+
+@test("SingleFlight runs concurrent callers once and shares the result")
+def _():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader, calls, outcome = _start_leader(flight, release)
+    results = []
+    waiters = [threading.Thread(target=lambda: results.append(flight.do(lambda: 'other')))
+               for _ in range(3)]
+    for t in waiters:
+        t.start()
+    deadline = time.monotonic() + 5
+    while flight.snapshot()['waiters'] < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for t in [leader] + waiters:
+        t.join(5)
+    assert calls == [1] and outcome['value'] == 'result'
+    assert results == ['result'] * 3, results
+    stats = flight.snapshot()
+    assert stats['runs'] == 1 and stats['coalesced'] == 3 and stats['max_waiters'] == 3
+    assert stats['waiters'] == 0 and not stats['in_flight']
+
+@test("SingleFlight shares the leader's exception with waiters")
+def _():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader, _calls, outcome = _start_leader(flight, release, result=RuntimeError("boom"))
+    caught = []
+
+    def waiter():
+        try:
+            flight.do(lambda: 'other')
+        except RuntimeError as e:
+            caught.append(str(e))
+
+    t = threading.Thread(target=waiter)
+    t.start()
+    deadline = time.monotonic() + 5
+    while flight.snapshot()['waiters'] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    leader.join(5)
+    t.join(5)
+    assert str(outcome['error']) == 'boom' and caught == ['boom']
+
+@test("SingleFlight attach() runs callbacks after the in-flight call only")
+def _():
+    flight = SingleFlight()
+    assert flight.attach(lambda _r: None) is False  # Nothing in flight
+    release = threading.Event()
+    leader, _calls, _outcome = _start_leader(flight, release)
+    got = []
+    assert flight.attach(got.append) is True
+    assert flight.attach(lambda _r: 1 / 0) is True  # A failing callback doesn't stop the rest
+    assert flight.attach(got.append) is True
+    snap = flight.snapshot()
+    assert snap['in_flight'] and snap['coalesced'] == 3
+    release.set()
+    leader.join(5)
+    assert got == ['result', 'result'], got
+    assert flight.snapshot()['in_flight'] is False
+    assert flight.do(lambda: 'fresh') == 'fresh'  # Next call runs again
+
+print()
+
+# =========================================================================
+# 4. STATE SNAPSHOT & SEEN-ID CACHE
+# =========================================================================
+print("── 4. State Snapshot & Seen-ID Cache ─────────")
+
+import config
+import snapshot
+import state
+import db as db_module
+from config import CONFIG
+
+assert config.STATE_SNAPSHOT_PATH.startswith(TEST_DATA_DIR), config.STATE_SNAPSHOT_PATH
+db_module.db_save_seen_events_bulk({'event_ids': [5001, 5002], 'event_details': [
+    {'id': 5001, 'title': 'Snapshot Event 1'}, {'id': 5002, 'title': 'Snapshot Event 2'},
+]})
+
+
+@test("save_snapshot() / load_snapshot() round-trip counters, logs and seen IDs")
+def _():
+    CONFIG['total_checks'] = 42
+    CONFIG['email_notifications_enabled'] = False
+    config.ACTIVITY_LOGS = [{'message': 'before restart', 'type': 'info'}]
+    state.remember_seen_ids([5001, 5002, 9999])
+    assert snapshot.save_snapshot()
+    assert not os.path.exists(f"{config.STATE_SNAPSHOT_PATH}.tmp")
+
+    CONFIG['total_checks'] = 0
+    CONFIG['email_notifications_enabled'] = True
+    config.ACTIVITY_LOGS = []
+    state.forget_seen_ids([5001, 5002, 9999])
+    assert snapshot.load_snapshot()
+    assert CONFIG['total_checks'] == 42
+    assert CONFIG['email_notifications_enabled'] is False
+    assert config.ACTIVITY_LOGS == [{'message': 'before restart', 'type': 'info'}]
+    assert {5001, 5002, 9999} <= set(state.recent_seen_ids())
+    status = snapshot.snapshot_status()
+    assert status['loaded'] and status['seeded_seen_ids'] == 3 and status['saves'] >= 1
+    CONFIG['email_notifications_enabled'] = True
+
+@test("load_snapshot() ignores a corrupt or wrong-version snapshot")
+def _():
+    for content in ('{not json', '{"version": 999}'):
+        with open(config.STATE_SNAPSHOT_PATH, 'w') as f:
+            f.write(content)
+        assert snapshot.load_snapshot() is False
+
+@test("reconcile_seen_ids() drops seeded IDs the DB does not have")
+def _():
+    dropped = snapshot.reconcile_seen_ids()
+    assert dropped == 1, dropped
+    cached = set(state.recent_seen_ids())
+    assert 9999 not in cached and {5001, 5002} <= cached
+    assert snapshot.reconcile_seen_ids() == 0  # Seeds are only reconciled once
+
+@test("reconcile_counters() keeps the higher of snapshot and DB values")
+def _():
+    CONFIG['total_checks'] = 42
+    CONFIG['emails_sent'] = 3
+    snapshot.reconcile_counters({'total_checks': 40, 'emails_sent': '7', 'total_new_events': None})
+    assert CONFIG['total_checks'] == 42
+    assert CONFIG['emails_sent'] == 7
+
+@test("filter_seen_event_ids() only queries the DB for cache misses")
+def _():
+    queried = []
+    real = state.db_filter_seen_event_ids
+
+    def recording(ids):
+        queried.append(sorted(ids))
+        return real(ids)
+
+    state.forget_seen_ids([5001, 5002])
+    state.db_filter_seen_event_ids = recording
+    try:
+        state.remember_seen_ids([5001])
+        assert state.filter_seen_event_ids([5001, 5002, 6000]) == {5001, 5002}
+        assert queried == [[5002, 6000]], queried
+        assert state.filter_seen_event_ids([5001, 5002]) == {5001, 5002}
+        assert len(queried) == 1  # Both now cached: no DB round trip
+    finally:
+        state.db_filter_seen_event_ids = real
+
+print()
+
+# =========================================================================
+# 5. INSTRUMENTED LOCKS
+# =========================================================================
+print("── 5. Instrumented Locks ─────────────────────")
+
+from metrics import InstrumentedLock, lock_stats
+
+
+@test("InstrumentedLock does not count RLock re-entry as a new acquisition")
+def _():
+    lock = InstrumentedLock('test_reentrant', reentrant=True)
+    with lock:
+        with lock:
+            with lock:
+                pass
+    snap = lock.snapshot()
+    assert snap['acquisitions'] == 1, snap
+    assert len(snap['sites']) == 1 and 'test_runtime.py' in snap['sites'][0]['site']
+    assert 'test_reentrant' in lock_stats()
+
+@test("InstrumentedLock records hold time on the outermost release only")
+def _():
+    lock = InstrumentedLock('test_hold', reentrant=True)
+    lock.acquire()
+    lock.acquire()
+    time.sleep(0.03)
+    lock.release()
+    assert lock.snapshot()['hold_total_ms'] == 0  # Still held by the outer acquire
+    time.sleep(0.02)
+    lock.release()
+    snap = lock.snapshot()
+    assert snap['hold_total_ms'] >= 50, snap
+    assert snap['sites'][0]['hold_max_ms'] == snap['hold_total_ms']
+
+@test("InstrumentedLock failed non-blocking acquire is not counted")
+def _():
+    lock = InstrumentedLock('test_nonblocking')
+    held = threading.Event()
+    release = threading.Event()
+
+    def holder():
+        with lock:
+            held.set()
+            release.wait(5)
+
+    t = threading.Thread(target=holder)
+    t.start()
+    assert held.wait(5)
+    assert lock.acquire(blocking=False) is False
+    assert lock.acquire(timeout=0.01) is False
+    release.set()
+    t.join(5)
+    snap = lock.snapshot()
+    assert snap['acquisitions'] == 1, snap
+    assert lock.acquire(blocking=False) is True  # Free again
+    lock.release()
+    assert lock.snapshot()['acquisitions'] == 2
+
+print()
+
+# =========================================================================
+# 6. LOG SINK
+# =========================================================================
+print("── 6. Log Sink ───────────────────────────────")
+
+import glob
+import gzip
+import logsink
+from logsink import LogSink
+
+
+def _sink(name, keep_segments=5):
+    return LogSink(os.path.join(TEST_DATA_DIR, name), max_bytes=1_000_000,
+                   rotate_seconds=3600, keep_segments=keep_segments)
+
+
+def _rotate_now(sink, *records):
+    """Write ``(ts, kind, message)`` records and rotate them into a segment."""
+    for ts, kind, message in records:
+        sink.write(kind, 'info', message, ts=ts)
+    sink.max_bytes = 1
+    sink.flush()
+    sink.max_bytes = 1_000_000
+
+
+@test("LogSink rotates on size and gzips the rotated segment")
+def _():
+    sink = _sink('logs_rotate')
+    sink.max_bytes = 150
+    sink.write('console', 'info', 'x' * 40)
+    sink.flush()
+    assert os.path.exists(sink.active_path) and not sink.segments()
+    sink.write('console', 'info', 'y' * 120)
+    sink.flush()
+    segments = sink.segments()
+    assert len(segments) == 1 and segments[0].endswith('.ndjson.gz'), segments
+    assert not os.path.exists(sink.active_path)
+    with gzip.open(segments[0], 'rt', encoding='utf-8') as f:
+        assert [json.loads(line)['message'][0] for line in f] == ['x', 'y']
+    assert sink.snapshot()['rotations'] == 1
+
+@test("LogSink keeps only the newest keep_segments segments")
+def _():
+    sink = _sink('logs_prune', keep_segments=2)
+    for n in range(4):
+        _rotate_now(sink, (time.time(), 'console', f"segment {n}"))
+    assert len(sink.segments()) == 2
+    assert [r['message'] for r in sink.read()] == ['segment 2', 'segment 3']
+
+@test("LogSink read() filters by since/until/kind across segments and the active file")
+def _():
+    sink = _sink('logs_read')
+    base = time.time() - 60
+    _rotate_now(sink, (base, 'console', 'old console'), (base + 10, 'activity', 'old activity'))
+    _rotate_now(sink, (base + 20, 'audit', 'audit entry'))
+    sink.write('console', 'warning', 'new console', ts=base + 30)  # Stays in the active file
+    sink.flush()
+    assert len(sink.segments()) == 2 and os.path.exists(sink.active_path)
+
+    def messages(**filters):
+        return [r['message'] for r in sink.read(**filters)]
+
+    assert messages() == ['old console', 'old activity', 'audit entry', 'new console']
+    assert messages(kinds={'console'}) == ['old console', 'new console']
+    assert messages(since=logsink._iso(base + 10)) == ['old activity', 'audit entry', 'new console']
+    assert messages(until=logsink._iso(base + 20)) == ['old console', 'old activity', 'audit entry']
+    assert messages(since=logsink._iso(base + 5), until=logsink._iso(base + 25),
+                    kinds={'activity', 'console'}) == ['old activity']
+    assert messages(levels={'warning'}) == ['new console']
+
+@test("LogSink keeps a segment readable and prunable when gzip fails")
+def _():
+    sink = _sink('logs_gzip_fail', keep_segments=2)
+    real_open = gzip.open
+
+    def failing_open(*args, **kwargs):
+        raise OSError("disk full")
+
+    gzip.open = failing_open
+    try:
+        _rotate_now(sink, (time.time(), 'console', 'plain segment'))
+    finally:
+        gzip.open = real_open
+    plain = glob.glob(os.path.join(sink.directory, 'app-*.ndjson'))
+    assert len(plain) == 1 and sink.segments() == plain
+    assert not glob.glob(os.path.join(sink.directory, '*.gz'))
+    snap = sink.snapshot()
+    assert snap['rotations'] == 1 and snap['errors'] == 1 and 'disk full' in snap['last_error']
+    assert [r['message'] for r in sink.read()] == ['plain segment']
+
+    _rotate_now(sink, (time.time(), 'console', 'second'))
+    _rotate_now(sink, (time.time(), 'console', 'third'))
+    assert not os.path.exists(plain[0])  # Pruned like any other segment
+    assert [r['message'] for r in sink.read()] == ['second', 'third']
+
+print()
+
+# =========================================================================
+# 7. RATE LIMITER
+# =========================================================================
+print("── 7. Rate Limiter ───────────────────────────")
+
+from flask import Flask
+import utils
+from ratelimit import RateLimiter
+
+T0 = 1_000_000.0
+
+
+@test("RateLimiter allows a full burst and blocks the request past it")
+def _():
+    limiter = RateLimiter({'public': (5, 10)}, block_seconds=300)  # 1 per 2s, burst 5
+    for n in range(5):
+        assert limiter.hit('public', 'ip', now=T0) == (True, 0.0, False), n
+    assert limiter.hit('public', 'ip', now=T0) == (False, 300, True)
+    stats = limiter.snapshot()
+    assert stats['allowed'] == 5 and stats['rejected'] == 1 and stats['blocks'] == 1
+    assert stats['limits']['public'] == {'max_requests': 5, 'window_seconds': 10}
+
+@test("RateLimiter refills one request per emission interval")
+def _():
+    limiter = RateLimiter({'public': (5, 10)})
+    for _n in range(5):
+        limiter.hit('public', 'ip', now=T0)
+    assert limiter.hit('public', 'ip', now=T0 + 1.9)[0] is False  # Not refilled yet
+    limiter = RateLimiter({'public': (5, 10)})
+    for _n in range(5):
+        limiter.hit('public', 'ip', now=T0)
+    assert limiter.hit('public', 'ip', now=T0 + 2)[0] is True
+    assert limiter.hit('public', 'ip', now=T0 + 2)[0] is False
+
+@test("RateLimiter retry-after counts down the block, then the client starts fresh")
+def _():
+    limiter = RateLimiter({'public': (2, 60)}, block_seconds=300)
+    for _n in range(3):
+        limiter.hit('public', 'ip', now=T0)
+    allowed, retry_after, newly_blocked = limiter.hit('public', 'ip', now=T0 + 100)
+    assert not allowed and not newly_blocked and retry_after == 200
+    assert limiter.hit('public', 'other', now=T0 + 100)[0] is True  # Per client
+    assert limiter.hit('public', 'ip', now=T0 + 300) == (True, 0.0, False)
+    assert limiter.hit('public', 'ip', now=T0 + 300)[0] is True  # Full burst again
+
+@test("RateLimiter evicts idle keys first and caps tracked keys at max_keys")
+def _():
+    limiter = RateLimiter({'public': (5, 10)}, max_keys=3)
+    for n in range(5):
+        limiter.hit('public', f"k{n}", now=T0)  # All still throttled: LRU cap applies
+    assert limiter.snapshot()['tracked_keys'] == 3
+    assert list(limiter._tat) == ['public|k2', 'public|k3', 'public|k4']
+    limiter.hit('public', 'late', now=T0 + 60)  # Idle keys swept, EVICT_PER_HIT at a time
+    assert 'public|late' in limiter._tat and limiter.snapshot()['evicted'] == 4
+
+@test("RateLimiter keeps route classes separate and falls back to public")
+def _():
+    limiter = RateLimiter({'public': (1, 60), 'admin': (3, 60)})
+    assert limiter.hit('public', 'ip', now=T0)[0]
+    assert not limiter.hit('public', 'ip', now=T0)[0]
+    assert all(limiter.hit('admin', 'ip', now=T0)[0] for _n in range(3))
+    assert limiter.hit('unknown', 'ip', now=T0)[0]
+    assert not limiter.hit('unknown', 'ip', now=T0)[0]  # Public limit, own bucket
+
+@test("rate_limit picks admin/public/webhook classes and sets Retry-After on 429")
+def _():
+    class RecordingLimiter(RateLimiter):
+        def hit(self, route_class, key, now=None):
+            seen.append(route_class)
+            return super().hit(route_class, key, now)
+
+    seen = []
+    flask_app = Flask('rate_limit_test')
+    real = utils.LIMITER
+    utils.LIMITER = RecordingLimiter({'public': (2, 60), 'admin': (5, 60), 'webhook': (5, 60)},
+                                     block_seconds=120)
+    try:
+        public = utils.rate_limit(lambda: 'ok')
+        admin = utils.rate_limit(utils.require_admin(lambda: 'ok'))
+        password = utils.rate_limit(utils.require_password(lambda: 'ok'))
+        webhook = utils.rate_limit('webhook')(lambda: 'ok')
+        with flask_app.test_request_context('/api/test', method='POST', json={},
+                                            environ_base={'REMOTE_ADDR': '10.0.0.9'}):
+            admin()
+            password()
+            webhook()
+            assert public() == 'ok' and public() == 'ok'
+            response, status = public()
+            assert status == 429 and response.headers['Retry-After'] == '120'
+            response, status = public()
+            assert status == 429 and 1 <= int(response.headers['Retry-After']) <= 120
+        assert seen == ['admin', 'admin', 'webhook'] + ['public'] * 4, seen
+    finally:
+        utils.LIMITER = real
+
+print()
+
+# =========================================================================
+# 8. EMAIL RETRY QUEUE
+# =========================================================================
+print("── 8. Email Retry Queue ──────────────────────")
+
+from datetime import datetime, timedelta, timezone
+from retry_queue import EmailRetryQueue
+
+
+def _ago(seconds):
+    return datetime.now(timezone.utc) - timedelta(seconds=seconds)
+
+
+@test("EmailRetryQueue pops due items high priority first, then earliest due")
+def _():
+    q = EmailRetryQueue()
+    ids = {name: q.add(f"Subject {name}", 'body', f"{name}@test.com", priority)
+           for name, priority in (('a', 'normal'), ('b', 'normal'), ('c', 'high'), ('later', 'normal'))}
+    for name, seconds in (('a', 30), ('b', 60), ('c', 10)):
+        q.reschedule(q.get(ids[name]), 1, _ago(seconds))
+    due = q.pop_due()
+    assert [item['id'] for item in due] == [ids['c'], ids['b'], ids['a']], due
+    assert len(q) == 1 and q.pop_due() == []  # 'later' is not due; popped items left the queue
+    q.clear()
+
+@test("EmailRetryQueue reschedule/remove leave stale heap entries that are skipped")
+def _():
+    q = EmailRetryQueue()
+    kept = q.add('Kept', 'body', 'kept@test.com')
+    gone = q.add('Gone', 'body', 'gone@test.com')
+    q.reschedule(q.get(kept), 1, _ago(5))
+    q.reschedule(q.get(kept), 2, _ago(1))  # Second entry supersedes the first
+    q.reschedule(q.get(gone), 1, _ago(5))
+    assert q.remove(gone)
+    due = q.pop_due()
+    assert [(item['id'], item['attempts']) for item in due] == [(kept, 2)], due
+    assert q.seconds_until_next() is None and len(q) == 0
+    q.clear()
+
+@test("EmailRetryQueue seconds_until_next tracks the earliest live item")
+def _():
+    q = EmailRetryQueue()
+    assert q.seconds_until_next() is None
+    item_id = q.add('Soon', 'body', 'soon@test.com')
+    q.reschedule(q.get(item_id), 1, datetime.now(timezone.utc) + timedelta(seconds=120))
+    assert 115 < q.seconds_until_next() <= 120
+    q.reschedule(q.get(item_id), 2, _ago(10))
+    assert q.seconds_until_next() == 0.0
+    q.clear()
+    assert q.seconds_until_next() is None
+
+@test("EmailRetryQueue listener pulls the queue_retry job forward, never back")
+def _():
+    import events
+    notified = []
+    q = EmailRetryQueue()
+    q.set_listener(lambda seconds: (notified.append(seconds), events._on_retry_queue_change(seconds)))
+    events.SCHEDULER.schedule(events.JOB_QUEUE_RETRY, 3600)
+    item_id = q.add('Retry', 'body', 'retry@test.com')
+    assert notified and notified[-1] is not None
+    assert events.SCHEDULER.seconds_until(events.JOB_QUEUE_RETRY) < 3600
+    q.reschedule(q.get(item_id), 1, _ago(1))
+    assert events.SCHEDULER.seconds_until(events.JOB_QUEUE_RETRY) == 0.0
+    q.reschedule(q.get(item_id), 2, datetime.now(timezone.utc) + timedelta(hours=2))
+    assert events.SCHEDULER.seconds_until(events.JOB_QUEUE_RETRY) == 0.0  # Not pushed back
+    q.clear()
+    assert notified[-1] is None
+    events.SCHEDULER.cancel(events.JOB_QUEUE_RETRY)
+
+print()
+
+# =========================================================================
+# 9. TELEGRAM COMMAND QUEUE
+# =========================================================================
+print("── 9. Telegram Command Queue ─────────────────")
+
+import telegram_bot
+from telegram_bot import CommandQueue
+
+
+class _IdleCommandQueue(CommandQueue):
+    """CommandQueue whose workers never start, so queued commands stay put."""
+
+    def start(self):
+        pass
+
+
+def _update(update_id, text='/status', chat_id=1000):
+    return {'update_id': update_id, 'message': {'chat': {'id': chat_id}, 'from': {'first_name': 'T'},
+                                                'text': text}}
+
+
+@test("CommandQueue drops a redelivered update_id")
+def _():
+    commands = _IdleCommandQueue(maxsize=10, workers=1)
+    assert commands.submit(_update(1)) == 'queued'
+    assert commands.submit(_update(1)) == 'duplicate'
+    assert commands.submit(_update(2)) == 'queued'
+    stats = commands.snapshot()
+    assert stats['queued'] == 2 and stats['duplicates'] == 1 and stats['depth'] == 2
+
+@test("CommandQueue ignores updates without a command")
+def _():
+    commands = _IdleCommandQueue(maxsize=10, workers=1)
+    assert commands.submit({'update_id': 1, 'edited_message': {}}) == 'ignored'
+    assert commands.submit(_update(2, text='')) == 'ignored'
+    assert commands.snapshot()['ignored'] == 2 and commands.depth() == 0
+
+@test("CommandQueue does not remember an update rejected as full")
+def _():
+    commands = _IdleCommandQueue(maxsize=1, workers=1)
+    assert commands.submit(_update(1)) == 'queued'
+    assert commands.submit(_update(2)) == 'full'
+    commands._queue.get_nowait()  # A worker drains the queue...
+    assert commands.submit(_update(2)) == 'queued'  # ...and the redelivery is accepted
+    assert commands.snapshot()['rejected_full'] == 1
+
+@test("CommandQueue workers run the handler and record per-command latency")
+def _():
+    handled = []
+    real = telegram_bot.COMMAND_HANDLERS['/myid']
+    telegram_bot.COMMAND_HANDLERS['/myid'] = lambda chat_id, first_name, username: handled.append(chat_id)
+    try:
+        commands = CommandQueue(maxsize=10, workers=2)
+        for n in range(3):
+            commands.submit(_update(n + 1, text='/myid@dfm_bot', chat_id=500 + n))
+        commands._queue.join()
+    finally:
+        telegram_bot.COMMAND_HANDLERS['/myid'] = real
+    assert sorted(handled) == ['500', '501', '502'], handled
+    stats = commands.snapshot()
+    assert stats['processed'] == 3 and stats['command_latency']['/myid']['count'] == 3
+
+print()
+
+# =========================================================================
+# 10. TELEGRAM UPDATE POLLER
+# =========================================================================
+print("── 10. Telegram Update Poller ────────────────")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench'))
+from fake_telegram import FakeTelegram
+from telegram_bot import UpdatePoller, TelegramAPIError, OFFSET_STATUS_KEY
+
+FAKE_TELEGRAM = FakeTelegram().start()
+config.TELEGRAM_API_BASE = FAKE_TELEGRAM.base_url
+
+
+@test("UpdatePoller advances and persists the offset past handed-over updates")
+def _():
+    commands = _IdleCommandQueue(maxsize=10, workers=1)
+    poller = UpdatePoller(commands, timeout=0, limit=100)
+    first = FAKE_TELEGRAM.push_update('/status')
+    last = FAKE_TELEGRAM.push_update('/next')
+    assert poller.poll_once() == 2
+    assert poller.snapshot()['offset'] == last + 1
+    assert db_module.db_get_status(OFFSET_STATUS_KEY) == str(last + 1)
+    assert poller.poll_once() == 0  # The offset confirmed both updates
+    assert commands.depth() == 2 and first < last
+
+@test("UpdatePoller stops at a full queue and re-fetches the rest next poll")
+def _():
+    commands = _IdleCommandQueue(maxsize=1, workers=1)
+    poller = UpdatePoller(commands, timeout=0, limit=100)
+    poller._offset = int(db_module.db_get_status(OFFSET_STATUS_KEY))
+    telegram_bot.QUEUE_FULL_PAUSE, real_pause = 0, telegram_bot.QUEUE_FULL_PAUSE
+    try:
+        first = FAKE_TELEGRAM.push_update('/status')
+        second = FAKE_TELEGRAM.push_update('/uptime')
+        assert poller.poll_once() == 1
+        assert poller.snapshot()['offset'] == first + 1
+        commands._queue.get_nowait()
+        assert poller.poll_once() == 1  # 'second' was not confirmed, so it comes back
+        assert poller.snapshot()['offset'] == second + 1
+    finally:
+        telegram_bot.QUEUE_FULL_PAUSE = real_pause
+
+@test("UpdatePoller removes a registered webhook when getUpdates answers 409")
+def _():
+    poller = UpdatePoller(_IdleCommandQueue(maxsize=10, workers=1), timeout=0, limit=100)
+    poller._offset = int(db_module.db_get_status(OFFSET_STATUS_KEY))
+    FAKE_TELEGRAM.webhook_url = 'https://example.com/telegram-webhook'
+    try:
+        poller.poll_once()
+        assert False, "Expected TelegramAPIError"
+    except TelegramAPIError as e:
+        assert '409' in str(e)
+    assert FAKE_TELEGRAM.webhook_url == ''
+    assert poller.poll_once() == 0
+
+FAKE_TELEGRAM.stop()
+
+print()
+
+# =========================================================================
+# CLEANUP & RESULTS
+# =========================================================================
+print("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+print(f"  RESULTS: {passed} passed, {failed} failed, {passed + failed} total")
+print("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+
+if errors:
+    print("\n  ❌ FAILED TESTS:")
+    for name, err in errors:
+        print(f"     • {name}: {err}")
+
+# Cleanup test data dir (no exit-time snapshot save into it afterwards)
+config.STATE_SNAPSHOT_PATH = ''
+shutil.rmtree(TEST_DATA_DIR, ignore_errors=True)
+
+print()
+sys.exit(0 if failed == 0 else 1)
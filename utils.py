@@ -4,28 +4,33 @@
 =============================================================================
 """
 
+import atexit
 import html
+import os
 import re
 import secrets
-import smtplib
 import socket
-import time
+import sys
 import threading
+import time
+from collections import deque
 from functools import wraps
 from datetime import datetime, timezone, timedelta
+from itertools import islice
 
 from flask import request, session, jsonify, redirect, url_for
 
 import config
 from config import (
-    app, CONFIG, ADMIN_PASSWORD,
+    app, CONFIG, ADMIN_PASSWORD, METRICS_TOKEN,
     SMTP_SERVER, SMTP_PORT, SMTP_USE_IPV4,
-    MAX_CONSOLE_LOGS, MAX_LOGS, MAX_ADMIN_AUDIT,
-    rate_limit_data, RATE_LIMIT_WINDOW, RATE_LIMIT_MAX_REQUESTS,
-    BLOCKED_IPS, BLOCK_DURATION,
+    MAX_LOGS, MAX_ADMIN_AUDIT,
+    BLOCK_DURATION,
     _data_lock,
 )
 from db import db_add_log, db_add_audit_log
+from ratelimit import LIMITER
+from logsink import LOG_SINK
 
 
 # ===== Rate Limiting =====
@@ -38,39 +43,42 @@ def get_client_ip():
     return request.remote_addr or '127.0.0.1'
 
 
-def is_rate_limited():
-    """Check if client is rate limited."""
+def is_rate_limited(route_class: str = 'public') -> tuple:
+    """Check if client is rate limited. Returns (limited, retry_after_seconds)."""
     ip = get_client_ip()
-    now = time.time()
+    allowed, retry_after, newly_blocked = LIMITER.hit(route_class, ip)
+    if allowed:
+        return False, 0
 
-    if ip in BLOCKED_IPS:
+    if newly_blocked:
+        log_activity(f"⚠️ Rate limit exceeded - IP blocked: {ip[:10]}...", "warning")
+        console_log(f"🔒 RATE LIMIT TRIGGERED: {ip[:15]}... blocked for {BLOCK_DURATION}s ({route_class})", "warning")
+    else:
         console_log(f"🚫 RATE LIMIT: Blocked IP attempted access: {ip[:15]}...", "warning")
-        return True
+    return True, retry_after
 
-    rate_limit_data[ip] = [t for t in rate_limit_data[ip] if now - t < RATE_LIMIT_WINDOW]
-    current_count = len(rate_limit_data[ip])
 
-    # Debug log every 10 requests to avoid spam
-    if current_count > 0 and current_count % 10 == 0:
-        console_log(f"📊 RATE LIMIT: {ip[:15]}... has {current_count}/{RATE_LIMIT_MAX_REQUESTS} requests in window", "debug")
+def rate_limit(f=None, route_class: str | None = None):
+    """Rate limiting decorator.
 
-    if current_count >= RATE_LIMIT_MAX_REQUESTS:
-        BLOCKED_IPS.add(ip)
-        threading.Timer(BLOCK_DURATION, lambda: BLOCKED_IPS.discard(ip)).start()
-        log_activity(f"⚠️ Rate limit exceeded - IP blocked: {ip[:10]}...", "warning")
-        console_log(f"🔒 RATE LIMIT TRIGGERED: {ip[:15]}... blocked for {BLOCK_DURATION}s ({current_count} requests)", "warning")
-        return True
-
-    rate_limit_data[ip].append(now)
-    return False
+    Use bare (``@rate_limit``) or with a route class (``@rate_limit('webhook')``).
+    Bare use picks 'admin' when wrapping ``require_admin``/``require_password``
+    and 'public' otherwise.
+    """
+    if isinstance(f, str):
+        return lambda fn: rate_limit(fn, route_class=f)
+    if f is None:
+        return lambda fn: rate_limit(fn, route_class=route_class)
 
+    limit_class = route_class or getattr(f, '_route_class', 'public')
 
-def rate_limit(f):
-    """Rate limiting decorator."""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if is_rate_limited():
-            return jsonify({'error': 'Too many requests. Please wait.'}), 429
+        limited, retry_after = is_rate_limited(limit_class)
+        if limited:
+            response = jsonify({'error': 'Too many requests. Please wait.'})
+            response.headers['Retry-After'] = str(max(1, int(retry_after)))
+            return response, 429
         return f(*args, **kwargs)
     return decorated_function
 
@@ -135,6 +143,16 @@ def verify_password(password: str) -> bool:
     return secrets.compare_digest(password, ADMIN_PASSWORD)
 
 
+def verify_metrics_token() -> bool:
+    """Whether the request carries ``Authorization: Bearer <METRICS_TOKEN>``."""
+    if not METRICS_TOKEN:
+        return False
+    auth = request.headers.get('Authorization', '')
+    if not auth.startswith('Bearer '):
+        return False
+    return secrets.compare_digest(auth[7:].strip(), METRICS_TOKEN)
+
+
 def require_password(f):
     """Decorator to require password for actions."""
     @wraps(f)
@@ -163,9 +181,11 @@ def require_password(f):
             return f(*args, **kwargs)
         except Exception as e:
             console_log(f"❌ AUTH ERROR: {str(e)[:80]}", "error")
-            import traceback
-            console_log(f"   └─ Traceback: {traceback.format_exc()[:200]}", "debug")
+            if console_log_enabled("debug"):
+                import traceback
+                console_log(f"   └─ Traceback: {traceback.format_exc()[:200]}", "debug")
             return jsonify({'error': 'Authentication error', 'details': str(e)[:100]}), 500
+    decorated_function._route_class = 'admin'
     return decorated_function
 
 
@@ -192,6 +212,7 @@ def require_admin(f):
         if request.path.startswith('/api/'):
             return jsonify({'error': 'Unauthorized'}), 401
         return redirect(url_for('admin_login', next=request.path))
+    decorated_function._route_class = 'admin'
     return decorated_function
 
 
@@ -209,28 +230,104 @@ def add_security_headers(response):
 
 
 # ===== Console Logging =====
+# Producers only append to deques (atomic under the GIL, so no lock). The
+# dashboard buffer keeps raw (epoch, type, msg) tuples and timestamps are
+# formatted when read; stdout and the NDJSON log sink (logsink.py) are
+# written in batches by a background flusher.
+
+CONSOLE_LEVELS = {'debug': 10, 'api': 20, 'info': 20, 'success': 20, 'warning': 30, 'error': 40}
+CONSOLE_FLUSH_INTERVAL = 0.2  # Seconds between stdout / log sink flushes
+MAX_PENDING_STDOUT = 5000     # Lines waiting for the flusher; oldest dropped if stdout stalls
+CONSOLE_FLUSH_CHUNK = 256     # Lines per stdout write — bounds the memory a flush of a backlog needs
+
+_stdout_pending = deque(maxlen=MAX_PENDING_STDOUT)
+_flush_lock = threading.Lock()
+_flusher = None
+
+
+def console_log_enabled(log_type: str) -> bool:
+    """True if ``log_type`` passes CONSOLE_LOG_LEVEL — guard expensive debug messages with it."""
+    return CONSOLE_LEVELS.get(log_type, 20) >= CONSOLE_LEVELS.get(config.CONSOLE_LOG_LEVEL, 10)
+
 
 def console_log(message: str, log_type: str = "info") -> None:
     """Add detailed log to system console — terminal style. Thread-safe."""
-    now = datetime.now(timezone.utc)
-    timestamp = now.strftime('%b %d, %Y %I:%M:%S %p')
-    timestamp_short = now.strftime('%I:%M:%S %p')
-    entry = {
-        'time': timestamp,
-        'time_short': timestamp_short,
-        'type': log_type,  # info, success, error, warning, api, debug
-        'msg': message
-    }
-    with _data_lock:
-        config.SYSTEM_CONSOLE.insert(0, entry)
-        if len(config.SYSTEM_CONSOLE) > MAX_CONSOLE_LOGS:
-            config.SYSTEM_CONSOLE = config.SYSTEM_CONSOLE[:MAX_CONSOLE_LOGS]
-    try:
-        print(f"[CONSOLE][{log_type.upper()}] {message}")
-    except (UnicodeEncodeError, UnicodeDecodeError):
-        # Fallback for terminals that can't handle emoji (e.g. Windows cp1252)
-        safe_msg = message.encode('ascii', 'replace').decode('ascii')
-        print(f"[CONSOLE][{log_type.upper()}] {safe_msg}")
+    if CONSOLE_LEVELS.get(log_type, 20) < CONSOLE_LEVELS.get(config.CONSOLE_LOG_LEVEL, 10):
+        return
+    entry = (time.time(), log_type, message)  # type: info, success, error, warning, api, debug
+    config.SYSTEM_CONSOLE.append(entry)
+    _stdout_pending.append(entry)
+    if _flusher is None:
+        _start_console_flusher()
+
+
+def get_console_logs(limit: int = 100) -> list:
+    """Newest-first console entries as dicts for the dashboard/API."""
+    entries = list(islice(reversed(config.SYSTEM_CONSOLE), limit))
+    logs = []
+    for ts, log_type, message in entries:
+        when = datetime.fromtimestamp(ts, timezone.utc)
+        logs.append({
+            'time': when.strftime('%b %d, %Y %I:%M:%S %p'),
+            'time_short': when.strftime('%I:%M:%S %p'),
+            'type': log_type,
+            'msg': message,
+        })
+    return logs
+
+
+def flush_console_output() -> None:
+    """Write every pending console line to stdout (``CONSOLE_FLUSH_CHUNK`` per write) and queue it for the log sink."""
+    with _flush_lock:
+        if not _stdout_pending:
+            return
+        while _stdout_pending:
+            lines = []
+            while _stdout_pending and len(lines) < CONSOLE_FLUSH_CHUNK:
+                ts, log_type, message = _stdout_pending.popleft()
+                lines.append(f"[CONSOLE][{log_type.upper()}] {message}\n")
+                LOG_SINK.write('console', log_type, message, ts)
+            text = ''.join(lines)
+            try:
+                sys.stdout.write(text)
+            except (UnicodeEncodeError, UnicodeDecodeError):
+                # Fallback for terminals that can't handle emoji (e.g. Windows cp1252)
+                sys.stdout.write(text.encode('ascii', 'replace').decode('ascii'))
+        sys.stdout.flush()
+
+
+def _console_flusher_loop() -> None:
+    while True:
+        time.sleep(CONSOLE_FLUSH_INTERVAL)
+        try:
+            flush_console_output()
+        except Exception:
+            pass  # stdout closed or broken pipe — keep the dashboard buffer going
+        LOG_SINK.flush()  # Handles its own disk errors
+
+
+def _start_console_flusher() -> None:
+    global _flusher
+    with _flush_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_console_flusher_loop, name='log-flusher', daemon=True)
+            _flusher.start()
+
+
+def _reset_console_flusher() -> None:
+    """Forked workers start their own flusher on first log."""
+    global _flush_lock, _flusher
+    _flush_lock = threading.Lock()
+    _flusher = None
+
+
+def _flush_logs_at_exit() -> None:
+    flush_console_output()
+    LOG_SINK.close()
+
+
+atexit.register(_flush_logs_at_exit)
+os.register_at_fork(after_in_child=_reset_console_flusher)
 
 
 def set_last_smtp_error(message):
@@ -248,6 +345,7 @@ def get_smtp_connection(timeout=30):
     smtplib tries IPv6 first but IPv6 isn't properly configured, causing
     '[Errno 101] Network is unreachable' errors. This function forces IPv4.
     """
+    import smtplib  # Lazy import: only the SMTP path needs it (keeps cold start short)
     if SMTP_USE_IPV4:
         try:
             ipv4_addr = socket.gethostbyname(SMTP_SERVER)
@@ -342,8 +440,11 @@ def log_activity(message: str, level: str = "info") -> None:
         config.ACTIVITY_LOGS.insert(0, entry)
         if len(config.ACTIVITY_LOGS) > MAX_LOGS:
             config.ACTIVITY_LOGS = config.ACTIVITY_LOGS[:MAX_LOGS]
+    LOG_SINK.write('activity', level, entry['message'])
+    if _flusher is None:
+        _start_console_flusher()
     try:
-        db_add_log(sanitize_string(message, 200), level)
+        db_add_log(entry['message'], level)
     except Exception:
         pass  # DB write failed, in-memory copy still intact
     try:
@@ -365,6 +466,7 @@ def log_admin_action(action, details=None):
     config.ADMIN_AUDIT_LOGS.insert(0, entry)
     if len(config.ADMIN_AUDIT_LOGS) > MAX_ADMIN_AUDIT:
         config.ADMIN_AUDIT_LOGS = config.ADMIN_AUDIT_LOGS[:MAX_ADMIN_AUDIT]
+    LOG_SINK.write('audit', 'info', f"{entry['action']}: {entry['details']} [{entry['ip']}]")
     try:
         db_add_audit_log(
             sanitize_string(action, 120),